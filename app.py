@@ -1,13 +1,25 @@
 from goingfast import create_app
 from os import environ
+import socket
 
 APP_HOST = environ.get('APP_HOST', '0.0.0.0')
 APP_PORT = environ.get('APP_PORT', '8080')
 APP_DEBUG = True if environ.get('APP_DEBUG') == '1' else False
+# Lets the next process listen on the same port while this one hands its trades over
+REUSE_PORT = True if environ.get('REUSE_PORT') == '1' else False
+
+
+def reuse_port_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((APP_HOST, int(APP_PORT)))
+    return sock
 
 
 if __name__ == '__main__':
     app = create_app()
-    app.run(host=APP_HOST,
-            port=APP_PORT,
-            debug=APP_DEBUG)
+    if REUSE_PORT:
+        app.run(sock=reuse_port_socket(), debug=APP_DEBUG)
+    else:
+        app.run(host=APP_HOST, port=APP_PORT, debug=APP_DEBUG)
@@ -1,19 +1,50 @@
+import asyncio
+import hmac
 import logging
+import time
 
-import pyfiglet
 import ujson
 from os import environ
 
+from binance.enums import KLINE_INTERVAL_5MINUTE
 from sanic import Sanic
 from sanic.log import logger
 from sanic.request import Request
-from sanic.response import HTTPResponse, text
+from sanic.response import HTTPResponse, json, text
 
-from goingfast.traders.base import Actions, BaseTrader
-from goingfast.traders.binancefutures import BinanceFutures
+from goingfast import profiling
+from goingfast.analytics import ANALYTICS_JOURNAL, binance_futures_closes, get_analytics
+from goingfast.watchdog import LOOP_WATCHDOG_INTERVAL, get_watchdog
+from goingfast.coordination import (
+    ALERT_DEDUP_TTL,
+    ALERT_RETRANSMIT_WINDOW,
+    COORDINATION_URL,
+    LockTimeout,
+    get_coordinator,
+)
+from goingfast.handover import get_handover
+from goingfast.traders.accounts import fan_out, get_accounts
+from goingfast.traders.base import API_KEY, API_SECRET, Actions, BaseTrader
+from goingfast.traders.binancefutures import BinanceFutures, MAX_ENTRY_SLIPPAGE_BPS, SYMBOL
+from goingfast.traders.binancespot import BinanceSpot
+from goingfast.traders.armed import ArmedPlan, arm_plan, disarm_plan, find_plan, get_plans
 from goingfast.traders.bybit import BybitTrader
 from goingfast.traders.bitmex import BitmexTrader
+from goingfast.traders.bookticker import get_book_ticker
+from goingfast.traders.clock import CLOCK_SYNC_INTERVAL, ccxt_server_time, get_clock
+from goingfast.traders.execution import ENTRY_EXECUTION
+from goingfast.traders.health import BREAKER_QUEUE_TIMEOUT, CircuitOpenError, get_health, snapshot
+from goingfast.traders.marketdata import MARKET_DATA_CANDLES
+from goingfast.traders.helpers import get_binance_client, get_binance_clock, get_binance_spot_client, get_market_candles
+from goingfast.traders.ratelimit import get_scheduler
+from goingfast.traders.reconcile import RECONCILE_INTERVAL, run as reconcile_accounts
+from goingfast.traders.orderbook import get_order_book
+from goingfast.traders.orderids import alert_id, is_stamped
+from goingfast.traders.paper import PaperBinanceFutures, PaperBybitTrader, PaperBitmexTrader, price_stream
+from goingfast.traders.router import ROUTER, ROUTER_TRADERS, get_router
+from goingfast.traders.userstream import get_user_stream
 from goingfast.notifications.telegram import send_telegram_message
+from goingfast import status
 
 APP_DEBUG = True if environ.get('APP_DEBUG') == '1' else False
 log_level = logging.DEBUG if APP_DEBUG else logging.INFO
@@ -21,6 +52,24 @@ logger.setLevel(level=log_level)
 
 TRADER = environ.get('TRADER')
 CAPITAL_IN_USD = int(environ.get('CAPITAL_IN_USD'))
+ADMIN_TOKEN = environ.get('ADMIN_TOKEN')
+
+TRADERS = {
+    'bybit': BybitTrader,
+    'bitmex': BitmexTrader,
+    'binance-futures': BinanceFutures,
+    'binance': BinanceSpot,
+    'paper-bybit': PaperBybitTrader,
+    'paper-bitmex': PaperBitmexTrader,
+    'paper-binance-futures': PaperBinanceFutures,
+}
+BINANCE_FUTURES_TRADERS = ['binance-futures', 'paper-binance-futures']
+
+
+def trades_on(names: list) -> bool:
+    if TRADER == ROUTER:
+        return any(name.strip() in names for name in ROUTER_TRADERS.split(','))
+    return TRADER in names
 
 
 def is_valid_message(message: dict) -> bool:
@@ -34,9 +83,6 @@ def ok_response():
 
 
 def show_config(trader: BaseTrader):
-    title = pyfiglet.figlet_format('GoingFast')
-    print(title)
-
     logger.debug(f'Trader: {trader.__name__.capitalize()}')
     logger.debug(f'Direction: {trader.action}')
     logger.debug(f'Quantity: {trader.quantity}')
@@ -52,46 +98,112 @@ async def trade(message):
         raise NotImplementedError(f'Only Long and Short actions are supported, sent is: {action}')
     logger.debug(f'Trade direction is {action}')
 
-    traders = {'bybit': BybitTrader, 'bitmex': BitmexTrader, 'binance-futures': BinanceFutures}
-    trader_class = traders.get(TRADER)
+    received_at = time.time()
+    # Webhook retries and alerts delivered to several workers or replicas are traded once. Without its fire time an
+    # alert can't be told from a new one with the same payload, only a copy within the retransmit window is dropped.
+    stamped = is_stamped(message)
+    ttl = ALERT_DEDUP_TTL if stamped else ALERT_RETRANSMIT_WINDOW
+    dedup_key = alert_id(message)
+    if not await get_coordinator().claim(f'alert:{dedup_key}', ttl=ttl):
+        logger.info(f'Alert {dedup_key} was already received, ignoring')
+        return
+    # Orders are named after the alert, a retried request can always be matched to what reached the exchange
+    trade_id = alert_id(message, received_at=None if stamped else received_at)
+    profiling.mark('route', trade_id=trade_id)
+
+    async def run(trader: BaseTrader, payload: dict | None = None) -> bool:
+        try:
+            if payload is not None:
+                await trader.armed_entry(payload)
+            elif trader.action == Actions.LONG:
+                await trader.long_entry()
+            elif trader.action == Actions.SHORT:
+                await trader.short_entry()
+        except AssertionError as exc:
+            logger.info(exc.args[0])
+            logger.debug(f'There was no entry on {trader.account_name}, bailing')
+            return False
+        except (CircuitOpenError, LockTimeout) as exc:
+            logger.error(f'{trader.__name__} - {trader.account_name} - {exc}')
+            return False
+        except Exception as exc:
+            if TRADER == ROUTER:
+                get_router(TRADERS).record(trader=trader, ok=False, error=str(exc))
+            raise exc
+        finally:
+            get_handover().finished(trader)
+
+        # Send Notification
+        profiling.mark('notify')
+        logger.debug('Sending notifications via Telegram')
+        await send_telegram_message(trader=trader, tv_alert_message=message)
+        return True
+
+    trader_name = TRADER
+    if TRADER == ROUTER:
+        trader_name = get_router(TRADERS).pick(action=Actions.LONG if action == 'long' else Actions.SHORT)
+        if not trader_name:
+            logger.info('Router found no venue to trade, bailing')
+            return
+
+    trader_class = TRADERS.get(trader_name)
     if not trader_class:
         raise NotImplementedError('Trader chosen is not implemented yet')
-    logger.debug(f'Going to trade at {TRADER.capitalize()}')
+    logger.debug(f'Going to trade at {trader_name.capitalize()}')
 
+    health = get_health(trader_name)
+    if not health.allows():
+        logger.info(f'{trader_name} circuit is {health.state}, waiting up to {BREAKER_QUEUE_TIMEOUT}s')
+        if not await health.wait_allowed(timeout=BREAKER_QUEUE_TIMEOUT):
+            logger.error(f'{trader_name} circuit is {health.state}, last error: {health.last_error}, bailing')
+            return
+
+    # An armed plan has everything but the send ready, see `goingfast.traders.armed`
+    plan = find_plan(message) if TRADER in BINANCE_FUTURES_TRADERS else None
+    fired = plan.fire() if plan else None
+    if fired:
+        trader, payload = fired
+        trader.trade_id, trader.alert, trader.alert_received_at = trade_id, message, received_at
+        get_handover().trading([trader])
+        logger.debug(f'Firing armed plan {plan.id}')
+        await run(trader, payload=payload)
+        return
+
+    profiling.mark('build')
     metadata = message.get('metadata')
+    accounts = get_accounts()
 
     try:
-        trader = trader_class(
-            action=Actions.LONG if action == 'long' else Actions.SHORT,
-            quantity=CAPITAL_IN_USD,
-            logger=logger,
-            metadata=metadata,
-        )
+        traders = [
+            trader_class(
+                action=Actions.LONG if action == 'long' else Actions.SHORT,
+                quantity=(account.capital_in_usd or CAPITAL_IN_USD) if account else CAPITAL_IN_USD,
+                logger=logger,
+                metadata=metadata,
+                account=account,
+            )
+            for account in accounts or [None]
+        ]
     except NotImplementedError as e:
         logger.error(f'Exchange does not support the action: {action}')
         raise e
 
-    show_config(trader=trader)
+    for trader in traders:
+        trader.trade_id, trader.alert, trader.alert_received_at = trade_id, message, received_at
+    get_handover().trading(traders)
 
-    try:
-        if trader.action == Actions.LONG:
-            await trader.long_entry()
-        elif trader.action == Actions.SHORT:
-            await trader.short_entry()
-    except AssertionError as exc:
-        logger.info(exc.args[0])
-        logger.debug('There was no entry, bailing')
+    show_config(trader=traders[0])
+
+    if accounts:
+        logger.debug(f'Fanning out to {len(accounts)} accounts')
+        await fan_out(traders=traders, run=run)
         return
 
-    # Send Notification
-    logger.debug('Sending notifications via Telegram')
-    await send_telegram_message(trader=trader, tv_alert_message=message)
+    await run(traders[0])
 
 
 async def webhook_handler(request: Request) -> HTTPResponse:
-    if APP_DEBUG:
-        logger.debug('Request body below')
-        print(request.body)
+    logger.debug(f'Request body: {request.body}')
 
     text_body = request.body
     try:
@@ -104,16 +216,300 @@ async def webhook_handler(request: Request) -> HTTPResponse:
         logger.debug('Not a valid message, ignoring..')
         return ok_response()
 
+    if get_handover().draining:
+        # Shutting down, a proxy retrying on 503 delivers it to the process taking over
+        logger.info('Draining for a restart, turning the alert away')
+        return text('shutting down', status=503, headers={'Retry-After': '1'})
+
     logger.debug('Message is valid, starting to trade in the background')
-    await request.app.add_task(trade(message=message))
+    await request.app.add_task(get_handover().receive(trade(message=message)))
 
     logger.debug('Sending response to client and closes connection')
     return ok_response()
 
 
+def resume_trader(state: dict) -> BaseTrader:
+    """
+    A trader for an open trade another process handed over, built from its monitor state
+    """
+    name = state.get('trader')
+    if name not in TRADERS or not trades_on([name]):
+        raise NotImplementedError(f'{name} is not traded by this process')
+    accounts = {account.name: account for account in get_accounts()}
+    if accounts and state.get('account') not in accounts:
+        raise ValueError(f'Account {state.get("account")} is not configured in this process')
+
+    return TRADERS.get(name)(
+        action=Actions(state.get('action')),
+        quantity=state.get('quantity'),
+        logger=logger,
+        metadata=state.get('metadata'),
+        account=accounts.get(state.get('account')),
+    )
+
+
+def account_traders() -> list:
+    """
+    One trader per live venue and account, for work on an account rather than on a trade
+    """
+    names = [name for name in TRADERS if not name.startswith('paper-') and trades_on([name])]
+    return [
+        TRADERS.get(name)(action=Actions.LONG, quantity=0, logger=logger, account=account)
+        for name in names
+        for account in get_accounts() or [None]
+    ]
+
+
+def is_admin(request: Request) -> bool:
+    token = request.headers.get('authorization', '').removeprefix('Bearer ')
+    return hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+async def health_handler(request: Request) -> HTTPResponse:
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+    return json(snapshot())
+
+
+async def loop_handler(request: Request) -> HTTPResponse:
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+    if request.args.get('format') == 'prometheus':
+        return text(get_watchdog().prometheus())
+    return json(get_watchdog().to_dict())
+
+
+async def profile_handler(request: Request) -> HTTPResponse:
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+
+    if request.method == 'POST':
+        body = request.json or dict()
+        try:
+            session = profiling.start(
+                trades=int(body.get('trades')) if body.get('trades') else None,
+                seconds=float(body.get('seconds', profiling.PROFILE_MAX_SECONDS)),
+                interval_ms=float(body.get('interval_ms', profiling.PROFILE_INTERVAL_MS)),
+            )
+        except ValueError as exc:
+            return text(str(exc), status=409)
+        return json(session.to_dict(), status=201)
+
+    if request.method == 'DELETE':
+        profiling.stop()
+
+    session = profiling.get_session()
+    if not session:
+        return text('No profiling session yet', status=404)
+    if request.args.get('format') == 'json':
+        return json(session.to_dict())
+    return text(session.folded())
+
+
+async def analytics_handler(request: Request) -> HTTPResponse:
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+    analytics = get_analytics()
+    if request.method == 'GET':
+        # This worker's totals, or everything the workers sharing the journal recorded
+        if request.args.get('scope') == 'all' and analytics.journal:
+            return json(await analytics.merged())
+        return json(analytics.to_dict())
+
+    # Settle the closed trades of the last `days` from the exchange's fills
+    if not trades_on(['binance-futures']):
+        return text('Backfills read the trade history of a Binance futures account', status=400)
+    days = float((request.json or dict()).get('days', 7))
+    since_ms = int((time.time() - days * 86400) * 1000)
+    settled = 0
+    for account in get_accounts() or [None]:
+        client = account.binance_client() if account else get_binance_client()
+        try:
+            records = await binance_futures_closes(
+                client, symbol=SYMBOL, since_ms=since_ms, account=account.name if account else 'default'
+            )
+        finally:
+            if not account:
+                await client.close_connection()
+        settled += sum(analytics.close_trade(record) for record in records)
+    return json(dict(analytics.to_dict(), settled=settled))
+
+
+async def state_handler(request: Request) -> HTTPResponse:
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+    return json(status.snapshot())
+
+
+async def state_stream_handler(request: Request):
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+
+    response = await request.respond(content_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    current = status.snapshot()
+    await response.send(f'event: snapshot\ndata: {ujson.dumps(current)}\n\n')
+    sent_at = time.monotonic()
+    while True:
+        await asyncio.sleep(status.ADMIN_STREAM_INTERVAL)
+        previous, current = current, status.snapshot()
+        changed = status.diff(previous, current)
+        if changed:
+            await response.send(f'event: change\ndata: {ujson.dumps(dict(changed, time=current.get("time")))}\n\n')
+            sent_at = time.monotonic()
+        elif time.monotonic() - sent_at >= status.ADMIN_STREAM_HEARTBEAT:
+            await response.send(': heartbeat\n\n')
+            sent_at = time.monotonic()
+
+
+async def plans_handler(request: Request) -> HTTPResponse:
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+    if request.method == 'GET':
+        return json([plan.to_dict() for plan in get_plans()])
+
+    if TRADER not in BINANCE_FUTURES_TRADERS or get_accounts():
+        return text('Armed plans need a Binance futures trader and a single account', status=400)
+
+    body = request.json or dict()
+    action = str(body.get('action', '')).lower()
+    metadata = body.get('metadata')
+    if not body.get('indicator') or not body.get('pair') or action not in ['long', 'short']:
+        return text('indicator, pair and action (Long or Short) are required', status=400)
+    if ((metadata or dict()).get('execution') or ENTRY_EXECUTION).lower() != 'market':
+        return text('Armed plans enter with a single market order', status=400)
+
+    trader_class = TRADERS.get(TRADER)
+    plan = ArmedPlan(
+        indicator=body.get('indicator'),
+        pair=body.get('pair'),
+        action=Actions(action),
+        metadata=metadata,
+        factory=lambda: trader_class(action=Actions(action), quantity=CAPITAL_IN_USD, logger=logger, metadata=metadata),
+    )
+    try:
+        arm_plan(plan)
+    except ValueError as exc:
+        await plan.stop()
+        return text(str(exc), status=409)
+    return json(plan.to_dict(), status=201)
+
+
+async def plan_handler(request: Request, key: str) -> HTTPResponse:
+    if not is_admin(request):
+        return text('unauthorized', status=401)
+    if not await disarm_plan(key):
+        return text('not found', status=404)
+    return ok_response()
+
+
 def create_app():
     app = Sanic('GoingFast')
 
     app.add_route(webhook_handler, '/webhook', methods=['POST'])
+    if ADMIN_TOKEN:
+        app.add_route(health_handler, '/admin/health', methods=['GET'])
+        app.add_route(plans_handler, '/admin/plans', methods=['GET', 'POST'])
+        app.add_route(profile_handler, '/admin/profile', methods=['GET', 'POST', 'DELETE'])
+        app.add_route(loop_handler, '/admin/loop', methods=['GET'])
+        app.add_route(analytics_handler, '/admin/analytics', methods=['GET', 'POST'])
+        app.add_route(state_handler, '/admin/state', methods=['GET'])
+        app.add_route(state_stream_handler, '/admin/state/stream', methods=['GET'])
+        app.add_route(plan_handler, '/admin/plans/<key>', methods=['DELETE'])
+
+    @app.before_server_stop
+    async def hand_over_trades(app, loop):
+        # Entries in flight get their exit legs out before the open trades are handed to the next process
+        handed = await get_handover().drain()
+        logger.info(f'Handed over {handed} open trades')
+
+    if not COORDINATION_URL.startswith('memory://'):
+
+        @app.after_server_start
+        async def adopt_trades(app, loop):
+            handover = get_handover()
+            app.add_task(handover.run(build=resume_trader, spawn=lambda resume: app.add_task(handover.receive(resume))))
+
+    live_traders = [name for name in TRADERS if not name.startswith('paper-') and trades_on([name])]
+    if RECONCILE_INTERVAL and live_traders:
+
+        @app.after_server_start
+        async def start_reconciler(app, loop):
+            # Orphaned exit legs are cleaned up and pre-entry checks go by what it last saw
+            app.add_task(reconcile_accounts(probes=account_traders))
+
+    if LOOP_WATCHDOG_INTERVAL:
+
+        @app.after_server_start
+        async def start_watchdog(app, loop):
+            get_watchdog().start()
+
+    if ANALYTICS_JOURNAL:
+
+        @app.after_server_start
+        async def load_analytics(app, loop):
+            # Replay the journal before the first report or trade needs it
+            get_analytics()
+
+    if ENTRY_EXECUTION == 'chase' and trades_on(BINANCE_FUTURES_TRADERS):
+
+        @app.after_server_start
+        async def start_book_ticker(app, loop):
+            # Warm the book before the first alert instead of on it
+            get_book_ticker(SYMBOL).start()
+
+    if MAX_ENTRY_SLIPPAGE_BPS and trades_on(BINANCE_FUTURES_TRADERS):
+
+        @app.after_server_start
+        async def start_order_book(app, loop):
+            get_order_book(SYMBOL).start()
+
+    markets = {'binance-futures': BINANCE_FUTURES_TRADERS, 'binance': ['binance']}
+    candle_markets = [name for name, traders in markets.items() if trades_on(traders)]
+    if MARKET_DATA_CANDLES and candle_markets:
+
+        @app.after_server_start
+        async def start_candles(app, loop):
+            # The first alert reads its candles from memory instead of loading two days of them
+            for name in candle_markets:
+                get_market_candles(name=name, symbol=SYMBOL, timeframe=KLINE_INTERVAL_5MINUTE).start()
+
+    if CLOCK_SYNC_INTERVAL and live_traders:
+
+        @app.after_server_start
+        async def start_clocks(app, loop):
+            # Signed requests are stamped with the exchange's time from the first alert on
+            for name in live_traders:
+                if name in BINANCE_FUTURES_TRADERS:
+                    get_binance_clock().start()
+                elif name == 'binance':
+                    get_binance_clock('binance').start()
+                else:
+                    get_clock(name, server_time=ccxt_server_time(name), scheduler=get_scheduler(name)).start()
+
+    if trades_on(['binance']):
+
+        @app.after_server_start
+        async def start_user_streams(app, loop):
+            # Spot exits are heard of on the user data stream, one per account
+            keys = [(a.api_key, a.api_secret) for a in get_accounts()] or [(API_KEY, API_SECRET)]
+            for api_key, api_secret in keys:
+                get_user_stream(get_binance_spot_client(api_key=api_key, api_secret=api_secret)).start()
+
+    if TRADER and TRADER.startswith('paper-') and TRADER in TRADERS:
+
+        @app.after_server_start
+        async def start_paper_price_stream(app, loop):
+            app.add_task(price_stream(TRADERS.get(TRADER)))
+
+    if TRADER == ROUTER:
+
+        @app.after_server_start
+        async def start_router(app, loop):
+            # Routing decisions only read these caches, keep them warm from the start
+            router = get_router(TRADERS)
+            router.start()
+            for name in router.traders:
+                if name.startswith('paper-'):
+                    app.add_task(price_stream(TRADERS.get(name)))
 
     return app
@@ -0,0 +1,306 @@
+"""
+Incremental trade analytics.
+
+Every trade is folded into running aggregates as it closes: overall, per strategy (`metadata.strategy` of the alert)
+and per indicator. Win rate, expectancy, fees, entry slippage against the alert's `close` and alert to fill latency
+percentiles are read straight off those counters, so a report costs the same after a day or after months of trades.
+Trades come from the bot's own records as they happen, or from the exchange's trade history through a backfill whose
+fills replace the bot's numbers. With `ANALYTICS_JOURNAL` set every record is appended to that file and replayed on
+start. Every worker keeps totals of the trades it saw, the journal they share has all of them.
+"""
+import asyncio
+import bisect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from typing import Dict, List, Tuple
+
+import ujson
+from sanic.log import logger
+
+from goingfast.traders.orderids import parse_client_order_id
+
+ANALYTICS_JOURNAL = environ.get('ANALYTICS_JOURNAL')
+
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+ENTRY_TAGS = ('e', 'c')
+# Longest span Binance answers order and trade history queries for
+HISTORY_WINDOW_MS = 7 * 86400 * 1000
+HISTORY_LIMIT = 1000
+
+
+class Aggregate:
+    def __init__(self):
+        self.trades = 0
+        self.wins = 0
+        self.pnl_percent = 0.0
+        self.win_percent = 0.0
+        self.loss_percent = 0.0
+        self.pnl = 0.0
+        self.fees = 0.0
+        self.slippage_bps = 0.0
+        self.slipped = 0
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.timed = 0
+
+    def add(self, trade: dict, sign: int = 1):
+        """
+        Fold a closed trade in, or back out with `sign=-1` when a better record of it arrives
+        """
+        pnl_percent = trade.get('pnl_percent')
+        self.trades += sign
+        self.pnl_percent += sign * pnl_percent
+        if pnl_percent > 0:
+            self.wins += sign
+            self.win_percent += sign * pnl_percent
+        else:
+            self.loss_percent += sign * pnl_percent
+        self.pnl += sign * (trade.get('pnl') or 0.0)
+        self.fees += sign * trade.get('fees')
+
+        if trade.get('slippage_bps') is not None:
+            self.slippage_bps += sign * trade.get('slippage_bps')
+            self.slipped += sign
+        if trade.get('latency_ms') is not None:
+            self.latency_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, trade.get('latency_ms'))] += sign
+            self.timed += sign
+
+    def percentile(self, quantile: float) -> float | str | None:
+        """
+        Upper bound of the latency bucket holding `quantile` of the trades
+        """
+        if not self.timed:
+            return None
+        seen = 0
+        for bound, count in zip([*LATENCY_BUCKETS_MS, '+Inf'], self.latency_counts):
+            seen += count
+            if seen >= quantile * self.timed:
+                return bound
+        return '+Inf'
+
+    def to_dict(self) -> dict:
+        def average(total: float, count: int) -> float | None:
+            return round(total / count, 4) if count else None
+
+        return {
+            'trades': self.trades,
+            'win_rate': average(self.wins, self.trades),
+            'expectancy_percent': average(self.pnl_percent, self.trades),
+            'average_win_percent': average(self.win_percent, self.wins),
+            'average_loss_percent': average(self.loss_percent, self.trades - self.wins),
+            'pnl': round(self.pnl, 4),
+            'fees': round(self.fees, 4),
+            'average_slippage_bps': average(self.slippage_bps, self.slipped),
+            'latency_ms': {f'p{int(q * 100)}': self.percentile(q) for q in (0.5, 0.9, 0.99)},
+        }
+
+
+def trade_key(record: dict) -> str:
+    # Fan-out accounts share the alert's trade id
+    return f'{record.get("account")}:{record.get("trade_id")}'
+
+
+def merge(context: dict, record: dict) -> dict | None:
+    """
+    A closed trade from what was known at entry and what the exit record says
+    """
+    entry_price = record.get('entry_price') or context.get('entry_price')
+    exit_price = record.get('exit_price')
+    direction = 1 if (context.get('action') or record.get('action')) == 'long' else -1
+
+    pnl_percent = record.get('pnl_percent')
+    if pnl_percent is None:
+        if not entry_price or not exit_price:
+            return None
+        pnl_percent = direction * (exit_price - entry_price) / entry_price * 100 * (context.get('leverage') or 1)
+
+    # Positive when the entry filled worse than the price the alert fired at
+    close = context.get('close')
+    slippage_bps = direction * (entry_price - close) / close * 10000 if entry_price and close else None
+
+    return dict(
+        context,
+        trade_id=record.get('trade_id'),
+        account=record.get('account'),
+        strategy=context.get('strategy') or 'unknown',
+        indicator=context.get('indicator') or 'unknown',
+        entry_price=entry_price,
+        exit_price=exit_price,
+        pnl_percent=pnl_percent,
+        pnl=record.get('pnl'),
+        fees=record.get('fees') or 0.0,
+        slippage_bps=slippage_bps,
+        source=record.get('source', 'bot'),
+        closed_at=record.get('closed_at'),
+    )
+
+
+class Analytics:
+    def __init__(self, journal: str | None = ANALYTICS_JOURNAL):
+        self.journal = journal
+        self.opened: Dict[str, dict] = dict()
+        self.closed: Dict[str, dict] = dict()
+        self.aggregates: Dict[Tuple[str, str], Aggregate] = dict()
+        # A single writer keeps the journal in order and its file IO off the event loop
+        self.executor = None
+
+    def groups(self, trade: dict) -> List[Aggregate]:
+        keys = [('all', 'all'), ('strategy', trade.get('strategy')), ('indicator', trade.get('indicator'))]
+        return [self.aggregates.setdefault(key, Aggregate()) for key in keys]
+
+    def open_trade(self, record: dict, persist: bool = True):
+        """
+        What is known at entry: the alert, the entry price and how long the entry took
+        """
+        self.opened[trade_key(record)] = record
+        if persist:
+            self.append('open', record)
+
+    def close_trade(self, record: dict, persist: bool = True) -> bool:
+        key = trade_key(record)
+        previous = self.closed.get(key)
+        if previous and previous.get('source') == 'exchange':
+            # Settled from the exchange's fills, nothing is more accurate and a second backfill changes nothing
+            return False
+
+        trade = merge(self.opened.get(key) or previous or dict(), record)
+        if trade is None:
+            return False
+        if previous:
+            for aggregate in self.groups(previous):
+                aggregate.add(previous, sign=-1)
+        for aggregate in self.groups(trade):
+            aggregate.add(trade)
+
+        self.opened.pop(key, None)
+        self.closed[key] = trade
+        if persist:
+            self.append('close', record)
+        return True
+
+    def writer(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics')
+        return self.executor
+
+    def append(self, kind: str, record: dict):
+        if not self.journal:
+            return
+        self.writer().submit(self.write, ujson.dumps(dict(record, kind=kind)) + '\n')
+
+    def write(self, line: str):
+        try:
+            with open(self.journal, 'a') as f:
+                f.write(line)
+        except OSError as exc:
+            logger.error(f'Analytics journal write failed: {exc!r}')
+
+    async def merged(self) -> dict:
+        """
+        Totals of every worker appending to the journal, read back once this worker's own records are written
+        """
+        replay = Analytics(journal=self.journal)
+        await asyncio.get_running_loop().run_in_executor(self.writer(), replay.load)
+        return replay.to_dict()
+
+    def load(self):
+        if not self.journal:
+            return
+        try:
+            with open(self.journal) as f:
+                for line in f:
+                    record = ujson.loads(line)
+                    if record.pop('kind') == 'open':
+                        self.open_trade(record, persist=False)
+                    else:
+                        self.close_trade(record, persist=False)
+        except FileNotFoundError:
+            return
+        logger.info(f'Analytics loaded {len(self.closed)} closed and {len(self.opened)} open trades')
+
+    def to_dict(self) -> dict:
+        report = {
+            'open_trades': len(self.opened),
+            'all': self.aggregates.get(('all', 'all'), Aggregate()).to_dict(),
+            'strategy': dict(),
+            'indicator': dict(),
+        }
+        for (kind, name), aggregate in self.aggregates.items():
+            if kind != 'all':
+                report[kind][name] = aggregate.to_dict()
+        return report
+
+
+async def binance_futures_closes(client, symbol: str, since_ms: int, account: str) -> List[dict]:
+    """
+    Close records of the bot's trades on a Binance futures account from its fills: entry and exit prices, fees in the
+    quote asset and realized PnL net of them. Trades still holding a position are left out.
+    """
+    orders, fills = list(), list()
+    now = int(time.time() * 1000)
+    for start in range(since_ms, now, HISTORY_WINDOW_MS):
+        end = min(start + HISTORY_WINDOW_MS, now)
+        window_orders = await client.futures_get_all_orders(
+            symbol=symbol, startTime=start, endTime=end, limit=HISTORY_LIMIT
+        )
+        window_fills = await client.futures_account_trades(
+            symbol=symbol, startTime=start, endTime=end, limit=HISTORY_LIMIT
+        )
+        if len(window_orders) == HISTORY_LIMIT or len(window_fills) == HISTORY_LIMIT:
+            logger.info(f'Analytics backfill hit the history limit between {start} and {end}, some trades are missing')
+        orders += window_orders
+        fills += window_fills
+
+    tags = {order.get('orderId'): parse_client_order_id(order.get('clientOrderId')) for order in orders}
+    trades: Dict[str, dict] = dict()
+    for fill in fills:
+        parsed = tags.get(fill.get('orderId'))
+        if not parsed:
+            continue
+        trade_id, tag = parsed
+        trade = trades.setdefault(trade_id, {'entry': [0.0, 0.0], 'exit': [0.0, 0.0], 'fees': 0.0, 'pnl': 0.0})
+        if tag.startswith(ENTRY_TAGS):
+            side = trade['entry']
+            trade.setdefault('action', 'long' if fill.get('side') == 'BUY' else 'short')
+        else:
+            side = trade['exit']
+        quantity = float(fill.get('qty'))
+        side[0] += quantity
+        side[1] += quantity * float(fill.get('price'))
+        trade['pnl'] += float(fill.get('realizedPnl') or 0)
+        if symbol.endswith(fill.get('commissionAsset')):
+            trade['fees'] += float(fill.get('commission'))
+        trade['closed_at'] = max(trade.get('closed_at', 0), fill.get('time') / 1000)
+
+    records = list()
+    for trade_id, trade in trades.items():
+        (entry_quantity, entry_notional), (exit_quantity, exit_notional) = trade['entry'], trade['exit']
+        if not entry_quantity or exit_quantity < entry_quantity * (1 - 1e-9):
+            continue
+        records.append(
+            {
+                'trade_id': trade_id,
+                'account': account,
+                'exchange': 'binance-futures',
+                'symbol': symbol,
+                'action': trade.get('action'),
+                'entry_price': entry_notional / entry_quantity,
+                'exit_price': exit_notional / exit_quantity,
+                'fees': trade['fees'],
+                'pnl': trade['pnl'] - trade['fees'],
+                'closed_at': trade['closed_at'],
+                'source': 'exchange',
+            }
+        )
+    return records
+
+
+_analytics: Analytics | None = None
+
+
+def get_analytics() -> Analytics:
+    global _analytics
+    if _analytics is None:
+        _analytics = Analytics()
+        _analytics.load()
+    return _analytics
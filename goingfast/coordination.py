@@ -0,0 +1,214 @@
+"""
+State shared by every worker and replica: per-symbol locks, the alert dedup cache and the open trade registry.
+
+Sanic workers and replicas each have their own memory, so the open position check in `pre_entry` and the entry after
+it only hold one position per symbol when they run under a lock every process sees. `COORDINATION_URL` picks the
+backend:
+
+    memory://                          single process, the default
+    sqlite:///var/lib/goingfast.db     every worker and process on the host sharing one SQLite file
+
+Networked stores implement `Coordinator` and register their URL scheme with `register_coordinator`. Locks expire
+after their TTL so a crashed worker cannot hold a symbol forever.
+"""
+import asyncio
+import sqlite3
+import time
+import uuid
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from os import environ
+from typing import AsyncIterator, Dict
+
+import ujson
+
+COORDINATION_URL = environ.get('COORDINATION_URL', 'memory://')
+LOCK_TTL = float(environ.get('LOCK_TTL', '120'))
+LOCK_TIMEOUT = float(environ.get('LOCK_TIMEOUT', '30'))
+LOCK_POLL_INTERVAL = float(environ.get('LOCK_POLL_INTERVAL', '0.01'))
+ALERT_DEDUP_TTL = float(environ.get('ALERT_DEDUP_TTL', '300'))
+ALERT_RETRANSMIT_WINDOW = float(environ.get('ALERT_RETRANSMIT_WINDOW', '10'))
+OPEN_TRADE_TTL = float(environ.get('OPEN_TRADE_TTL', '86400'))
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class Coordinator:
+    @abstractmethod
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        """
+        Take the lock unless someone else holds it and it has not expired, without waiting
+        """
+        pass
+
+    @abstractmethod
+    async def release(self, key: str, token: str):
+        pass
+
+    @abstractmethod
+    async def claim(self, key: str, ttl: float) -> bool:
+        """
+        True for the first caller only until `ttl` passes
+        """
+        pass
+
+    @abstractmethod
+    async def open_trade(self, key: str, trade: dict, ttl: float = OPEN_TRADE_TTL):
+        pass
+
+    @abstractmethod
+    async def close_trade(self, key: str):
+        pass
+
+    @abstractmethod
+    async def open_trades(self) -> Dict[str, dict]:
+        pass
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = LOCK_TTL, timeout: float = LOCK_TIMEOUT) -> AsyncIterator[str]:
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while not await self.acquire(key, token, ttl):
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f'Lock {key} is still held after {timeout}s')
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield token
+        finally:
+            await self.release(key, token)
+
+
+class MemoryCoordinator(Coordinator):
+    def __init__(self):
+        self.locks: Dict[str, tuple] = dict()
+        self.claims: Dict[str, float] = dict()
+        self.trades: Dict[str, tuple] = dict()
+
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        holder = self.locks.get(key)
+        if holder and holder[1] > now:
+            return False
+        self.locks[key] = (token, now + ttl)
+        return True
+
+    async def release(self, key: str, token: str):
+        holder = self.locks.get(key)
+        if holder and holder[0] == token:
+            del self.locks[key]
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        if self.claims.get(key, 0) > now:
+            return False
+        self.claims = {k: expires_at for k, expires_at in self.claims.items() if expires_at > now}
+        self.claims[key] = now + ttl
+        return True
+
+    async def open_trade(self, key: str, trade: dict, ttl: float = OPEN_TRADE_TTL):
+        self.trades[key] = (trade, time.time() + ttl)
+
+    async def close_trade(self, key: str):
+        self.trades.pop(key, None)
+
+    async def open_trades(self) -> Dict[str, dict]:
+        now = time.time()
+        return {key: trade for key, (trade, expires_at) in self.trades.items() if expires_at > now}
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS claims (key TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS trades (key TEXT PRIMARY KEY, trade TEXT NOT NULL, expires_at REAL NOT NULL);
+"""
+
+
+class SqliteCoordinator(Coordinator):
+    """
+    Every statement is a single atomic upsert or delete, SQLite's file lock orders them across processes. Statements
+    run on one thread per process so a busy database never blocks the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='coordination')
+        self.connection = None
+
+    def execute(self, sql: str, params: tuple = ()) -> tuple[int, list]:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, isolation_level=None)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(SQLITE_SCHEMA)
+        cursor = self.connection.execute(sql, params)
+        return cursor.rowcount, cursor.fetchall()
+
+    async def run(self, sql: str, params: tuple = ()) -> tuple[int, list]:
+        """
+        Changed row count and rows of the statement
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.execute, sql, params)
+
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        changed, _ = await self.run(
+            'INSERT INTO locks (key, token, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at '
+            'WHERE locks.expires_at < ?',
+            (key, token, now + ttl, now),
+        )
+        return changed == 1
+
+    async def release(self, key: str, token: str):
+        await self.run('DELETE FROM locks WHERE key = ? AND token = ?', (key, token))
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        changed, _ = await self.run(
+            'INSERT INTO claims (key, expires_at) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at WHERE claims.expires_at < ?',
+            (key, now + ttl, now),
+        )
+        if changed:
+            await self.run('DELETE FROM claims WHERE expires_at < ?', (now,))
+        return changed == 1
+
+    async def open_trade(self, key: str, trade: dict, ttl: float = OPEN_TRADE_TTL):
+        await self.run(
+            'INSERT OR REPLACE INTO trades (key, trade, expires_at) VALUES (?, ?, ?)',
+            (key, ujson.dumps(trade), time.time() + ttl),
+        )
+
+    async def close_trade(self, key: str):
+        await self.run('DELETE FROM trades WHERE key = ?', (key,))
+
+    async def open_trades(self) -> Dict[str, dict]:
+        _, rows = await self.run('SELECT key, trade FROM trades WHERE expires_at > ?', (time.time(),))
+        return {key: ujson.loads(trade) for key, trade in rows}
+
+
+COORDINATORS = {'memory': lambda path: MemoryCoordinator(), 'sqlite': lambda path: SqliteCoordinator(path)}
+
+
+def register_coordinator(scheme: str, factory):
+    COORDINATORS[scheme] = factory
+
+
+def create_coordinator(url: str) -> Coordinator:
+    scheme, _, path = url.partition('://')
+    if scheme not in COORDINATORS:
+        raise NotImplementedError(f'No coordination backend for {scheme}://')
+    return COORDINATORS.get(scheme)(path)
+
+
+_coordinator: Coordinator | None = None
+
+
+def get_coordinator() -> Coordinator:
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = create_coordinator(COORDINATION_URL)
+    return _coordinator
@@ -0,0 +1,142 @@
+"""
+Zero-downtime restarts that hand open trades over to the next process.
+
+A stopping process turns new alerts away with a 503, gives alerts already in flight up to `HANDOVER_GRACE` seconds to
+finish their entry and place their exit legs, then stops following its open trades and writes each trade's monitor
+state, order ids, TP legs, trailing stop and the like, into the coordinator's open trade registry. Every running
+process looks for handed over trades every `HANDOVER_POLL_INTERVAL` seconds, claims them and resumes their monitors
+where the old process stopped. The exit legs rest on the exchange the whole time, only the watching moves. Handing
+over needs a coordinator both processes share, see `goingfast.coordination`.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Awaitable, Callable, Dict, List, Set
+
+from sanic.log import logger
+
+from goingfast.coordination import OPEN_TRADE_TTL, MemoryCoordinator, get_coordinator
+
+HANDOVER_GRACE = float(environ.get('HANDOVER_GRACE', '30'))
+HANDOVER_POLL_INTERVAL = float(environ.get('HANDOVER_POLL_INTERVAL', '1'))
+DRAIN_POLL_INTERVAL = 0.1
+
+
+class Handover:
+    def __init__(self):
+        self.draining = False
+        # Trade task of every alert in flight and its traders, empty until they are built
+        self.alerts: Dict[asyncio.Task, List] = dict()
+        # Traders following an open trade with a monitor loop or a trailing stop
+        self.followed: Set = set()
+
+    async def receive(self, trade: Awaitable):
+        task = asyncio.current_task()
+        self.alerts[task] = list()
+        try:
+            return await trade
+        finally:
+            del self.alerts[task]
+
+    def trading(self, traders: list):
+        """
+        The alert's traders are built, from here on they say whether the alert is still busy
+        """
+        task = asyncio.current_task()
+        if task in self.alerts:
+            self.alerts[task] = list(traders)
+
+    def finished(self, trader):
+        for traders in self.alerts.values():
+            if trader in traders:
+                traders.remove(trader)
+
+    def follow(self, trader):
+        self.followed.add(trader)
+
+    def forget(self, trader):
+        self.followed.discard(trader)
+
+    def traders(self) -> list:
+        """
+        Traders with an alert in flight or an open trade to follow
+        """
+        traders = [t for alert in self.alerts.values() for t in alert]
+        return traders + [t for t in self.followed if t not in traders]
+
+    @property
+    def busy(self) -> int:
+        """
+        Alerts not yet at their traders, or with a trader still entering, placing its exit or reporting it
+        """
+        return sum(1 for traders in self.alerts.values() if not traders or any(not t.monitor for t in traders))
+
+    async def drain(self, grace: float = HANDOVER_GRACE) -> int:
+        """
+        Stop taking alerts, let the ones in flight place their exit legs and hand every open trade over
+        """
+        self.draining = True
+        deadline = time.monotonic() + grace
+        while self.busy and time.monotonic() < deadline:
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+        if self.busy:
+            logger.error(f'{self.busy} alerts are still entering after {grace}s, their exits are not handed over')
+
+        coordinator = get_coordinator()
+        followed = [t for t in self.followed if not t.__name__.startswith('paper-')]
+        if isinstance(coordinator, MemoryCoordinator):
+            for trader in followed:
+                logger.error(f'{trader.__name__} - {trader.account_name} - Trade {trader.trade_id} is left unwatched')
+            return 0
+
+        records = await coordinator.open_trades()
+        for trader in followed:
+            state = await trader.hand_over()
+            record = records.get(trader.trade_key) or {'trade_id': trader.trade_id, 'action': trader.action.value}
+            await coordinator.open_trade(trader.trade_key, dict(record, handover=state))
+            logger.info(f'{trader.__name__} - {trader.account_name} - Handed over trade {trader.trade_id}')
+        return len(followed)
+
+    async def adopt(self, build: Callable, spawn: Callable[[Awaitable], None]) -> int:
+        """
+        Resume every trade a stopping process handed over, `build` makes a trader from its state
+        """
+        coordinator = get_coordinator()
+        adopted = 0
+        for key, record in (await coordinator.open_trades()).items():
+            state = record.get('handover')
+            if not state:
+                continue
+            try:
+                trader = build(state)
+            except Exception as exc:
+                # Maybe another process trades it
+                logger.debug(f'Unable to resume trade {record.get("trade_id")} here: {exc!r}')
+                continue
+            if not await coordinator.claim(f'handover:{key}:{state.get("handed_over_at")}', ttl=OPEN_TRADE_TTL):
+                continue
+
+            await coordinator.open_trade(key, {k: v for k, v in record.items() if k != 'handover'})
+            logger.info(f'{trader.__name__} - {state.get("account")} - Resuming trade {state.get("trade_id")}')
+            spawn(trader.resume(state))
+            adopted += 1
+        return adopted
+
+    async def run(self, build: Callable, spawn: Callable[[Awaitable], None]):
+        # The old process hands over after this one started, keep looking until this one stops in turn
+        while not self.draining:
+            try:
+                await self.adopt(build=build, spawn=spawn)
+            except Exception as exc:
+                logger.error(f'Looking for handed over trades failed: {exc!r}')
+            await asyncio.sleep(HANDOVER_POLL_INTERVAL)
+
+
+_handover: Handover | None = None
+
+
+def get_handover() -> Handover:
+    global _handover
+    if _handover is None:
+        _handover = Handover()
+    return _handover
@@ -0,0 +1,87 @@
+"""
+Lock contention benchmark for the coordination backends.
+
+Every worker process takes the lock of one of `--keys` symbols in a loop, holds it for `--hold-ms` and records how long
+it waited. The critical sections of all workers are checked for overlap afterwards, so the run fails loudly if the
+backend ever let two processes hold the same symbol.
+
+    $ python -m goingfast.lockbench --url sqlite:///tmp/lockbench.db --workers 8 --iterations 200 --keys 1
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from typing import List, Tuple
+
+import numpy as np
+
+from goingfast.coordination import create_coordinator
+
+# Key, acquired and released wall clock times, seconds waited for the lock
+Sample = Tuple[str, float, float, float]
+
+
+async def contend(url: str, worker: int, iterations: int, keys: int, hold: float) -> List[Sample]:
+    coordinator = create_coordinator(url)
+    samples = list()
+    for i in range(iterations):
+        key = f'bench:{(worker + i) % keys}'
+        started = time.perf_counter()
+        async with coordinator.lock(key, ttl=60, timeout=600):
+            acquired = time.time()
+            waited = time.perf_counter() - started
+            if hold:
+                await asyncio.sleep(hold)
+            samples.append((key, acquired, time.time(), waited))
+    return samples
+
+
+def run_worker(url: str, worker: int, iterations: int, keys: int, hold: float) -> List[Sample]:
+    return asyncio.run(contend(url, worker, iterations, keys, hold))
+
+
+def overlaps(samples: List[Sample]) -> int:
+    count = 0
+    by_key = dict()
+    for key, acquired, released, _ in samples:
+        by_key.setdefault(key, list()).append((acquired, released))
+    for intervals in by_key.values():
+        intervals.sort()
+        for (_, released), (acquired, _) in zip(intervals, intervals[1:]):
+            if acquired < released:
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure lock contention of a coordination backend')
+    parser.add_argument('--url', default='sqlite:///tmp/lockbench.db')
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    parser.add_argument('--iterations', type=int, default=200, help='Lock acquisitions per worker')
+    parser.add_argument('--keys', type=int, default=1, help='Symbols the workers spread over, 1 is worst case')
+    parser.add_argument('--hold-ms', type=float, default=0.0, help='Time spent holding the lock')
+    args = parser.parse_args()
+
+    print(f'{args.workers} workers x {args.iterations} locks over {args.keys} keys on {args.url}')
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(run_worker, args.url, worker, args.iterations, args.keys, args.hold_ms / 1000)
+            for worker in range(args.workers)
+        ]
+        samples = [sample for future in futures for sample in future.result()]
+    elapsed = time.perf_counter() - started
+
+    waits = np.array([sample[3] for sample in samples]) * 1000
+    p50, p99 = np.percentile(waits, [50, 99])
+    print(f'{len(samples) / elapsed:.0f} locks/s, wait p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {waits.max():.2f} ms')
+
+    violations = overlaps(samples)
+    if violations:
+        raise SystemExit(f'{violations} critical sections overlapped, the backend is not exclusive')
+    print('No overlapping critical sections')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+On-demand sampling profiler for the trade pipeline.
+
+Nothing runs until a session is started from the admin endpoint, `mark()` is a global lookup while disabled. A
+session samples from a background thread every `PROFILE_INTERVAL_MS`: the task currently on the event loop is walked
+from the thread's live frame, every other trade task from its chain of awaited coroutines, so time spent waiting on
+the exchange shows up next to time spent computing. Stacks are rooted at the trade id and the pipeline stage last
+marked by the task and returned in the folded format read by `flamegraph.pl`, speedscope and friends.
+"""
+import asyncio
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from os import environ, path
+
+PROFILE_INTERVAL_MS = float(environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_MAX_SECONDS = float(environ.get('PROFILE_MAX_SECONDS', '300'))
+
+_trade_id: ContextVar[str | None] = ContextVar('profile_trade_id', default=None)
+
+
+def frame_name(frame) -> str:
+    module = path.splitext(path.basename(frame.f_code.co_filename))[0]
+    return f'{module}:{frame.f_code.co_name}'
+
+
+def coroutine_stack(coro) -> list:
+    """
+    Root first stack of a suspended task, following what every coroutine awaits
+    """
+    stack = list()
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            if not hasattr(coro, 'cr_frame') and not hasattr(coro, 'gi_frame'):
+                # A future, e.g. a network read or a gather
+                stack.append('<future>')
+            break
+        stack.append(frame_name(frame))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return stack
+
+
+def thread_stack(frame, root) -> list:
+    """
+    Root first stack of the running task, the event loop's own frames below its coroutine are left out
+    """
+    stack = list()
+    while frame is not None:
+        stack.append(frame_name(frame))
+        if frame is root:
+            break
+        frame = frame.f_back
+    return stack[::-1]
+
+
+class Session:
+    def __init__(self, loop: asyncio.AbstractEventLoop, trades: int | None, seconds: float, interval_ms: float):
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        self.trades = trades
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + min(seconds, PROFILE_MAX_SECONDS)
+        self.interval = interval_ms / 1000
+
+        self.tasks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.trade_ids = set()
+        self.samples = Counter()
+        self.sample_count = 0
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+
+    @property
+    def is_running(self) -> bool:
+        return not self.stopped.is_set()
+
+    def track(self, task: asyncio.Task, trade_id: str, stage: str):
+        if trade_id not in self.trade_ids:
+            if self.trades is not None and len(self.trade_ids) >= self.trades:
+                return
+            self.trade_ids.add(trade_id)
+        self.tasks[task] = (trade_id, stage)
+
+    def is_done(self) -> bool:
+        if time.monotonic() >= self.deadline:
+            return True
+        if self.trades is None or len(self.trade_ids) < self.trades:
+            return False
+        return all(task.done() for task in list(self.tasks.keys()))
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if self.is_done():
+                self.stopped.set()
+                break
+            try:
+                self.sample()
+            except (RuntimeError, ValueError):
+                # Tasks are created and finished while we walk them, the next sample is as good
+                continue
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        running = asyncio.current_task(self.loop)
+        self.sample_count += 1
+        for task, (trade_id, stage) in list(self.tasks.items()):
+            if task.done():
+                continue
+            coro = task.get_coro()
+            if task is running:
+                stack = thread_stack(frame, root=getattr(coro, 'cr_frame', None))
+            else:
+                stack = coroutine_stack(coro)
+            self.samples[';'.join([f'trade {trade_id}', f'stage {stage}', *stack])] += 1
+
+    def stop(self):
+        self.stopped.set()
+
+    def folded(self) -> str:
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common())
+
+    def to_dict(self) -> dict:
+        return {
+            'running': self.is_running,
+            'trades': sorted(self.trade_ids),
+            'samples': self.sample_count,
+            'interval_ms': self.interval * 1000,
+            'elapsed': round(time.monotonic() - self.started_at, 3),
+        }
+
+
+_session: Session | None = None
+
+
+def start(trades: int | None = None, seconds: float = PROFILE_MAX_SECONDS, interval_ms: float = PROFILE_INTERVAL_MS):
+    """
+    Profile the next `trades` trades, or everything for `seconds`, must be called from the event loop
+    """
+    global _session
+    if _session and _session.is_running:
+        raise ValueError('A profiling session is already running')
+    _session = Session(loop=asyncio.get_running_loop(), trades=trades, seconds=seconds, interval_ms=interval_ms)
+    _session.thread.start()
+    return _session
+
+
+def stop():
+    if _session:
+        _session.stop()
+
+
+def get_session() -> Session | None:
+    return _session
+
+
+def mark(stage: str, trade_id: str | None = None):
+    """
+    Tag the current task's samples with its trade and pipeline stage, child tasks inherit the trade
+    """
+    if _session is None or not _session.is_running:
+        return
+    if trade_id:
+        _trade_id.set(trade_id)
+    task = asyncio.current_task()
+    if task is not None:
+        _session.track(task, trade_id or _trade_id.get() or 'untagged', stage)
@@ -0,0 +1,60 @@
+"""
+Live state of the bot for dashboards.
+
+A snapshot is put together from what the process already keeps in memory: trades in flight and the exit legs they
+follow, armed plans, freshness of the book tickers, order books, candles, clocks and user data streams, the rate
+limit queues, exchange health and what the last reconciliation of every account saw. Nothing is asked of an exchange
+or the coordinator, so polling it as often as a dashboard likes costs the trade path nothing. The stream sends the
+first snapshot whole and from then on only the entries that changed, every `ADMIN_STREAM_INTERVAL` seconds.
+"""
+import time
+from os import environ
+
+from goingfast.handover import get_handover
+from goingfast.traders import bookticker, clock, marketdata, orderbook, ratelimit, reconcile, userstream
+from goingfast.traders.armed import get_plans
+from goingfast.traders.health import snapshot as health_snapshot
+
+ADMIN_STREAM_INTERVAL = float(environ.get('ADMIN_STREAM_INTERVAL', '1'))
+# Comment lines keep idle proxies from closing a quiet stream
+ADMIN_STREAM_HEARTBEAT = 15
+
+
+def snapshot() -> dict:
+    handover = get_handover()
+    market_data = marketdata.snapshot()
+    return {
+        'time': round(time.time(), 3),
+        'draining': handover.draining,
+        'alerts_in_flight': len(handover.alerts),
+        'trades': {f'{t.account_name}:{t.trade_id}': t.to_dict() for t in handover.traders()},
+        'plans': {plan.id: plan.to_dict() for plan in get_plans()},
+        'health': health_snapshot(),
+        'rate_limits': ratelimit.snapshot(),
+        'book_tickers': bookticker.snapshot(),
+        'order_books': orderbook.snapshot(),
+        'streams': market_data.get('hubs'),
+        'candles': market_data.get('candles'),
+        'clocks': clock.snapshot(),
+        'user_streams': userstream.snapshot(),
+        'reconciliation': reconcile.snapshot(),
+    }
+
+
+def diff(previous: dict, current: dict) -> dict:
+    """
+    Sections of `current` that changed since `previous`, down to the entries of a section. Entries that went away
+    are sent as null.
+    """
+    changed = dict()
+    for section, value in current.items():
+        before = previous.get(section)
+        if section == 'time' or value == before:
+            continue
+        if isinstance(value, dict) and isinstance(before, dict):
+            value = {
+                **{key: entry for key, entry in value.items() if before.get(key) != entry},
+                **{key: None for key in before if key not in value},
+            }
+        changed[section] = value
+    return changed
@@ -0,0 +1,273 @@
+"""
+Parameter sweep runner for the bracket logic in `BaseTrader`.
+
+Candles are loaded once, turned into per-entry excursion matrices and placed in shared memory. Worker processes
+attach to those blocks by name so nothing but grid index ranges is ever pickled. Each worker evaluates a chunk of
+parameter combinations with batched NumPy reductions and results are streamed into a `.npy` file as chunks finish.
+
+    $ python -m goingfast.sweep --candles btcusdt-5m.npy --stop-delta 50:500:25 --tp-delta 50:1000:50 \
+        --rr 0,1,1.5,2,3 --min-atr-pct 0:0.5:0.05 --output sweep.npy
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from os import cpu_count
+from typing import Dict, List, Tuple
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+from goingfast.traders.helpers import atr
+
+RESULT_DTYPE = np.dtype(
+    [
+        ('stop_delta', 'f4'),
+        ('tp_delta', 'f4'),
+        ('rr', 'f4'),
+        ('min_atr_pct', 'f4'),
+        ('trades', 'u4'),
+        ('wins', 'u4'),
+        ('losses', 'u4'),
+        ('timeouts', 'u4'),
+        ('pnl', 'f8'),
+        ('pnl_pct', 'f8'),
+    ]
+)
+
+# Worker side views over the shared blocks, populated by `_attach`
+_shared: Dict[str, np.ndarray] = {}
+_handles: List[shared_memory.SharedMemory] = []
+
+
+def load_candles(path: str) -> np.ndarray:
+    """
+    Load candles shaped like `get_candles` output: open, high, low, close, volume
+    """
+    if path.endswith('.npy'):
+        candles = np.load(path)
+    else:
+        candles = np.loadtxt(path, delimiter=',', usecols=(0, 1, 2, 3, 4), ndmin=2)
+
+    return np.ascontiguousarray(candles[:, :5], dtype=np.float64)
+
+
+def parse_range(value: str) -> np.ndarray:
+    """
+    Either a comma separated list `1,1.5,2` or an inclusive `start:stop:step` range
+    """
+    if ':' in value:
+        start, stop, step = (float(x) for x in value.split(':'))
+        return np.arange(start, stop + step / 2, step)
+
+    return np.array([float(x) for x in value.split(',')])
+
+
+def build_grid(stop_deltas: np.ndarray, tp_deltas: np.ndarray, rrs: np.ndarray, min_atr_pcts: np.ndarray) -> np.ndarray:
+    mesh = np.meshgrid(stop_deltas, tp_deltas, rrs, min_atr_pcts, indexing='ij')
+    grid = np.stack([m.ravel() for m in mesh], axis=1).astype(np.float32)
+
+    # With a risk reward ratio the TP delta is ignored, keep only one of those rows
+    uses_rr = grid[:, 2] > 0
+    grid[uses_rr, 1] = 0
+    return np.unique(grid, axis=0)
+
+
+def build_excursions(candles: np.ndarray, horizon: int, signals: np.ndarray | None = None) -> Dict[str, np.ndarray]:
+    """
+    For every entry, the running max favourable rise and running max adverse drop over the next `horizon` bars.
+
+    Both matrices are monotonic along the horizon axis, so the first bar a bracket leg is touched equals the count of
+    bars whose excursion is still below that leg's delta.
+    """
+    highs, lows, closes = candles[:, 1], candles[:, 2], candles[:, 3]
+    n = len(closes)
+    atr_values = np.nan_to_num(atr(highs=highs, lows=lows, closes=closes, period=14))
+
+    if signals is None:
+        indexes = np.arange(n - horizon - 1)
+        directions = np.ones(len(indexes), dtype=np.int8)
+    else:
+        indexes = signals[:, 0].astype(np.int64)
+        directions = signals[:, 1].astype(np.int8)
+        keep = indexes < n - horizon - 1
+        indexes, directions = indexes[keep], directions[keep]
+
+    window = np.lib.stride_tricks.sliding_window_view
+    entries = closes[indexes]
+    forward_highs = window(highs[1:], horizon)[indexes]
+    forward_lows = window(lows[1:], horizon)[indexes]
+
+    rise = np.maximum.accumulate(forward_highs, axis=1) - entries[:, None]
+    drop = entries[:, None] - np.minimum.accumulate(forward_lows, axis=1)
+
+    # Long brackets are stopped by the drop and take profit on the rise, shorts are the mirror image
+    is_long = directions > 0
+    adverse = np.where(is_long[:, None], drop, rise).astype(np.float32)
+    favourable = np.where(is_long[:, None], rise, drop).astype(np.float32)
+    timeout_pnl = np.where(is_long, closes[indexes + horizon] - entries, entries - closes[indexes + horizon])
+
+    return {
+        'adverse': np.ascontiguousarray(adverse),
+        'favourable': np.ascontiguousarray(favourable),
+        'entries': entries.astype(np.float64),
+        'atr_ratio': (atr_values[indexes] / entries * 100).astype(np.float64),
+        'timeout_pnl': timeout_pnl.astype(np.float64),
+    }
+
+
+def share(arrays: Dict[str, np.ndarray]) -> Tuple[Dict[str, tuple], List[shared_memory.SharedMemory]]:
+    specs = dict()
+    blocks = list()
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        specs[name] = (block.name, array.shape, array.dtype.str)
+        blocks.append(block)
+
+    return specs, blocks
+
+
+def _attach(specs: Dict[str, tuple]):
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _handles.append(block)
+        _shared[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def evaluate_chunk(start: int, stop: int) -> Tuple[int, np.ndarray]:
+    grid = _shared['grid'][start:stop]
+    adverse = _shared['adverse']
+    favourable = _shared['favourable']
+    entries = _shared['entries']
+    atr_ratio = _shared['atr_ratio']
+    timeout_pnl = _shared['timeout_pnl']
+    horizon = adverse.shape[1]
+
+    # The grid is sorted by stop delta, neighbouring rows reuse the same first-touch counts
+    stop_hits: Dict[float, np.ndarray] = dict()
+    tp_hits: Dict[float, np.ndarray] = dict()
+
+    results = np.zeros(len(grid), dtype=RESULT_DTYPE)
+    for row, (stop_delta, tp_delta, rr, min_atr_pct) in enumerate(grid):
+        # Same priority as `BaseTrader.tp_delta`, a risk reward ratio wins over a fixed delta
+        tp_distance = stop_delta * rr if rr > 0 else tp_delta
+
+        if stop_delta not in stop_hits:
+            stop_hits[stop_delta] = np.count_nonzero(adverse < stop_delta, axis=1)
+        if tp_distance not in tp_hits:
+            tp_hits[tp_distance] = np.count_nonzero(favourable < tp_distance, axis=1)
+
+        active = atr_ratio > min_atr_pct
+        stop_hit = stop_hits[stop_delta][active]
+        tp_hit = tp_hits[tp_distance][active]
+
+        # A bar touching both legs is counted as stopped, the pessimistic fill
+        lost = (stop_hit <= tp_hit) & (stop_hit < horizon)
+        won = ~lost & (tp_hit < horizon)
+        timed_out = ~(lost | won)
+
+        pnl = np.where(lost, -stop_delta, np.where(won, tp_distance, timeout_pnl[active]))
+
+        result = results[row]
+        result['stop_delta'], result['tp_delta'], result['rr'], result['min_atr_pct'] = grid[row]
+        result['trades'] = len(pnl)
+        result['wins'] = np.count_nonzero(won)
+        result['losses'] = np.count_nonzero(lost)
+        result['timeouts'] = np.count_nonzero(timed_out)
+        result['pnl'] = pnl.sum()
+        result['pnl_pct'] = (pnl / entries[active]).sum() * 100
+
+    return start, results
+
+
+def open_results(path: str, rows: int):
+    """
+    Pre-size a `.npy` file so chunks can be written at their offsets in completion order
+    """
+    f = open(path, 'wb')
+    header = {'descr': npy_format.dtype_to_descr(RESULT_DTYPE), 'fortran_order': False, 'shape': (rows,)}
+    npy_format.write_array_header_1_0(f, header)
+    offset = f.tell()
+    f.truncate(offset + rows * RESULT_DTYPE.itemsize)
+    return f, offset
+
+
+def run_sweep(
+    candles: np.ndarray,
+    grid: np.ndarray,
+    output: str,
+    horizon: int = 288,
+    signals: np.ndarray | None = None,
+    workers: int | None = None,
+    chunk_size: int = 64,
+) -> float:
+    """
+    Evaluate every row of `grid` and return throughput in combinations per second
+    """
+    workers = workers or cpu_count()
+    arrays = build_excursions(candles=candles, horizon=horizon, signals=signals)
+    arrays['grid'] = grid
+    specs, blocks = share(arrays)
+
+    chunks = [(i, min(i + chunk_size, len(grid))) for i in range(0, len(grid), chunk_size)]
+    f, offset = open_results(output, rows=len(grid))
+
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as pool:
+            futures = [pool.submit(evaluate_chunk, start, stop) for start, stop in chunks]
+            for future in as_completed(futures):
+                start, results = future.result()
+                f.seek(offset + start * RESULT_DTYPE.itemsize)
+                results.tofile(f)
+    finally:
+        f.close()
+        for block in blocks:
+            block.close()
+            block.unlink()
+    elapsed = time.perf_counter() - started
+
+    return len(grid) / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep bracket parameters over historical candles')
+    parser.add_argument('--candles', required=True, help='.npy or .csv with open, high, low, close, volume columns')
+    parser.add_argument(
+        '--signals', help='Optional .npy of (candle index, direction) pairs, defaults to a long entry on every bar'
+    )
+    parser.add_argument('--stop-delta', required=True)
+    parser.add_argument('--tp-delta', default='0')
+    parser.add_argument('--rr', default='0', help='0 means the TP delta is used instead')
+    parser.add_argument('--min-atr-pct', default='0')
+    parser.add_argument('--horizon', type=int, default=288, help='Bars before an open bracket is closed at market')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--output', default='sweep.npy')
+    args = parser.parse_args()
+
+    candles = load_candles(args.candles)
+    signals = np.load(args.signals) if args.signals else None
+    grid = build_grid(
+        stop_deltas=parse_range(args.stop_delta),
+        tp_deltas=parse_range(args.tp_delta),
+        rrs=parse_range(args.rr),
+        min_atr_pcts=parse_range(args.min_atr_pct),
+    )
+
+    print(f'Sweeping {len(grid)} combinations over {len(candles)} candles')
+    throughput = run_sweep(
+        candles=candles,
+        grid=grid,
+        output=args.output,
+        horizon=args.horizon,
+        signals=signals,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+    print(f'Done, {throughput:.1f} combinations/s, results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
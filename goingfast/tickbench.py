@@ -0,0 +1,69 @@
+"""
+Micro benchmark of the stop and TP price math, integer ticks against the `Decimal` arithmetic it replaced.
+
+Both paths take the entry price as the exchange sends it and produce the wire strings of the stop trigger, stop limit,
+stop market and TP prices. Results are compared for every entry before anything is timed.
+
+    $ python -m goingfast.tickbench --tick-size 0.5 --entries 10000
+"""
+import argparse
+import random
+import timeit
+from decimal import Decimal
+
+from goingfast.traders.ticks import Grid, get_grid
+
+STOP_DELTA = '150'
+TP_DELTA = '300'
+DECIMAL_STOP_DELTA = Decimal(STOP_DELTA)
+DECIMAL_TP_DELTA = Decimal(TP_DELTA)
+
+
+def decimal_prices(entry: str, decimals: int) -> tuple:
+    """
+    A long's prices the way `BaseTrader` derived them with `Decimal`, every property starting over from the entry
+    """
+
+    def trigger():
+        return Decimal(entry) - DECIMAL_STOP_DELTA
+
+    prices = (trigger(), trigger() - Decimal(5), trigger() - Decimal(10), Decimal(entry) + DECIMAL_TP_DELTA)
+    return tuple('{:0.0{}f}'.format(price, decimals) for price in prices)
+
+
+def tick_prices(entry: str, grid: Grid) -> tuple:
+    def trigger():
+        return grid.parse(entry) - grid.parse(STOP_DELTA)
+
+    prices = (
+        trigger(),
+        trigger() - grid.parse(5),
+        trigger() - grid.parse(10),
+        grid.parse(entry) + grid.parse(TP_DELTA),
+    )
+    return tuple(grid.format(price) for price in prices)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare integer tick and Decimal price arithmetic')
+    parser.add_argument('--tick-size', default='0.5')
+    parser.add_argument('--entries', type=int, default=10000, help='Distinct entry prices, on the tick grid')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    grid = get_grid(args.tick_size)
+    rng = random.Random(0)
+    entries = [grid.format(rng.randrange(grid.parse(10000), grid.parse(60000))) for _ in range(args.entries)]
+
+    mismatches = [e for e in entries if tick_prices(e, grid) != decimal_prices(e, grid.decimals)]
+    if mismatches:
+        raise SystemExit(f'{len(mismatches)} entries priced differently, e.g. {mismatches[0]}')
+
+    paths = {'Decimal': lambda e: decimal_prices(e, grid.decimals), 'ticks': lambda e: tick_prices(e, grid)}
+    for name, prices in paths.items():
+        best = min(timeit.repeat(lambda: [prices(e) for e in entries], number=1, repeat=args.repeat))
+        print(f'{name:>8}: {best / len(entries) * 1e6:.2f} us per trade')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+One alert traded on several accounts.
+
+`ACCOUNTS` is a JSON list of accounts, each with its own credentials and sizing:
+
+    [{"name": "main", "capital_in_usd": 1000}, {"name": "alt", "api_key": "...", "api_secret": "...", "leverage": 5}]
+
+Credentials left out are read from `API_KEY_<NAME>` and `API_SECRET_<NAME>`. The alert's market data and order plan
+are computed once by the first account's trader and shared with the others, then every account enters concurrently on
+its own pooled client, so the fan-out costs about as much as a single account.
+"""
+import asyncio
+from os import environ
+from typing import Awaitable, Callable, List
+
+import ujson
+from sanic.log import logger
+
+from goingfast.traders.base import BaseTrader
+from goingfast.traders.helpers import get_binance_client
+from goingfast.traders.ratelimit import ScheduledBinanceClient
+
+ACCOUNTS = environ.get('ACCOUNTS')
+
+
+class Account:
+    def __init__(
+        self,
+        name: str,
+        api_key: str | None,
+        api_secret: str | None,
+        capital_in_usd: float | None = None,
+        leverage: int | None = None,
+    ):
+        self.name = name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.capital_in_usd = capital_in_usd
+        self.leverage = leverage
+
+        self._binance_client = None
+
+    def binance_client(self) -> ScheduledBinanceClient:
+        """
+        One client per account for the life of the process, its HTTP session is reused across trades
+        """
+        if self._binance_client is None:
+            self._binance_client = get_binance_client(api_key=self.api_key, api_secret=self.api_secret)
+        return self._binance_client
+
+
+def parse_accounts(raw) -> List[Account]:
+    if not raw:
+        return list()
+    configs = ujson.loads(raw) if isinstance(raw, str) else raw
+
+    accounts = list()
+    for config in configs:
+        name = config.get('name')
+        if not name:
+            raise ValueError(f'Account needs a name: {config}')
+        key = name.upper().replace('-', '_')
+        accounts.append(
+            Account(
+                name=name,
+                api_key=config.get('api_key') or environ.get(f'API_KEY_{key}'),
+                api_secret=config.get('api_secret') or environ.get(f'API_SECRET_{key}'),
+                capital_in_usd=config.get('capital_in_usd'),
+                leverage=config.get('leverage'),
+            )
+        )
+    if len({a.name for a in accounts}) != len(accounts):
+        raise ValueError('Account names must be unique')
+
+    return accounts
+
+
+_accounts: List[Account] | None = None
+
+
+def get_accounts() -> List[Account]:
+    global _accounts
+    if _accounts is None:
+        _accounts = parse_accounts(ACCOUNTS)
+    return _accounts
+
+
+async def fan_out(traders: List[BaseTrader], run: Callable[[BaseTrader], Awaitable[bool]]) -> List[BaseTrader]:
+    """
+    Prepare the plan on the first trader, share it and run every trader concurrently. Returns the traders that entered.
+    """
+    lead = traders[0]
+    await lead.prepare()
+    for trader in traders[1:]:
+        trader.share_plan(lead)
+
+    tasks = [asyncio.ensure_future(run(trader)) for trader in traders]
+    # The exits may take until the trades close, the entries are reported as soon as every account is past its own
+    await asyncio.gather(*(entry_settled(trader, task) for trader, task in zip(traders, tasks)))
+    entered = [trader for trader in traders if trader.entry_order]
+    logger.info(f'{lead.__name__} - {lead.action} - Entered on {len(entered)} of {len(traders)} accounts')
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for trader, result in zip(traders, results):
+        if isinstance(result, Exception):
+            logger.error(f'{trader.__name__} - {trader.account_name} - Failed: {result!r}')
+    return entered
+
+
+async def entry_settled(trader: BaseTrader, task: asyncio.Task):
+    waiter = asyncio.ensure_future(trader.entry_settled.wait())
+    await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+    waiter.cancel()
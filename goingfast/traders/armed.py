@@ -0,0 +1,181 @@
+"""
+Order plans armed ahead of the alert they expect.
+
+A plan names the alert by indicator, pair and action. While it is armed a standby Binance futures trader keeps its
+candles, ATR, position, open orders and leverage fresh every `ARMED_PLAN_REFRESH` seconds, and the entry order is
+rebuilt on every top of book change. When the alert arrives the standby trader sends the prebuilt order right away and
+a new standby takes its place. A plan whose book or checks went stale is not fired, the alert then takes the usual
+path.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Callable, Dict, List, Tuple
+
+from binance.enums import FUTURE_ORDER_TYPE_MARKET, SIDE_BUY, SIDE_SELL
+from sanic.log import logger
+
+from goingfast.traders.base import Actions
+from goingfast.traders.binancefutures import BinanceFutures
+from goingfast.traders.bookticker import get_book_ticker
+from goingfast.traders.orderids import alert_id
+
+ARMED_PLAN_REFRESH = float(environ.get('ARMED_PLAN_REFRESH', '30'))
+ARMED_PLAN_MAX_BOOK_AGE = float(environ.get('ARMED_PLAN_MAX_BOOK_AGE', '2'))
+
+
+def plan_key(indicator: str, pair: str, action: str) -> str:
+    return alert_id({'indicator': indicator.strip().lower(), 'pair': pair.strip().lower(), 'action': action.lower()})
+
+
+class ArmedPlan:
+    def __init__(
+        self, indicator: str, pair: str, action: Actions, metadata: dict | None, factory: Callable[[], BinanceFutures]
+    ):
+        self.id = plan_key(indicator, pair, action.value)
+        self.indicator = indicator
+        self.pair = pair
+        self.action = action
+        self.metadata = metadata
+        self.factory = factory
+
+        self.trader = factory()
+        self.ticker = get_book_ticker(self.trader.symbol)
+        self.payload = None
+        self.is_flat = False
+        self.refreshed_at = 0.0
+        self.fired = 0
+        self.tasks = list()
+
+    @property
+    def is_armed(self) -> bool:
+        return (
+            self.payload is not None
+            and self.is_flat
+            and self.ticker.age <= ARMED_PLAN_MAX_BOOK_AGE
+            and time.monotonic() - self.refreshed_at <= 2 * ARMED_PLAN_REFRESH
+        )
+
+    def matches(self, message: dict) -> bool:
+        # Alerts carrying their own bracket need the usual path
+        return not message.get('metadata') or message.get('metadata') == self.metadata
+
+    def arm(self):
+        """
+        Rebuild the entry from the latest top of book
+        """
+        trader = self.trader
+        if trader is None or not self.ticker.is_ready or trader.atr is None:
+            self.payload = None
+            return
+
+        is_long = self.action == Actions.LONG
+        trader.last_price = self.ticker.ask if is_long else self.ticker.bid
+        if trader.atr[-1] <= trader.minimum_atr_value:
+            self.payload = None
+            return
+
+        self.payload = {
+            'side': SIDE_BUY if is_long else SIDE_SELL,
+            'type': FUTURE_ORDER_TYPE_MARKET,
+            'quantity': trader.quantity_in_asset,
+        }
+
+    async def refresh(self):
+        trader = self.trader
+        if trader is None:
+            return
+        await trader.prepare()
+        state = await trader.exchange_state()
+        await trader.set_leverage()
+        if trader is not self.trader:
+            # Fired meanwhile, the position and open orders are already outdated
+            return
+
+        self.is_flat = not state.get('position') and len(state.get('orders')) == 0
+        self.refreshed_at = time.monotonic()
+        self.arm()
+
+    async def keep_fresh(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:
+                self.is_flat = False
+                logger.info(f'Armed plan {self.id} - Refresh failed: {exc!r}')
+            await asyncio.sleep(ARMED_PLAN_REFRESH)
+
+    async def follow_book(self):
+        self.ticker.start()
+        while True:
+            await self.ticker.wait_change(timeout=ARMED_PLAN_MAX_BOOK_AGE)
+            self.arm()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self.tasks = [loop.create_task(self.keep_fresh()), loop.create_task(self.follow_book())]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.trader:
+            await self.trader.close_client()
+
+    def fire(self) -> Tuple[BinanceFutures, dict] | None:
+        if not self.is_armed:
+            return None
+
+        trader, payload = self.trader, self.payload
+        # The position just opened has to show in a refresh before the plan fires again
+        self.trader, self.payload, self.is_flat = None, None, False
+        self.fired += 1
+        # The next standby trader is built after the order went out
+        asyncio.get_running_loop().call_soon(self.rearm, trader)
+        return trader, payload
+
+    def rearm(self, fired: BinanceFutures):
+        self.trader = self.factory()
+        self.trader.share_plan(fired)
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'indicator': self.indicator,
+            'pair': self.pair,
+            'action': self.action.value,
+            'metadata': self.metadata,
+            'is_armed': self.is_armed,
+            'payload': self.payload,
+            'book_age': round(self.ticker.age, 3) if self.ticker.is_ready else None,
+            'fired': self.fired,
+        }
+
+
+_plans: Dict[str, ArmedPlan] = dict()
+
+
+def arm_plan(plan: ArmedPlan) -> ArmedPlan:
+    if plan.id in _plans:
+        raise ValueError(f'A plan for {plan.indicator} {plan.pair} {plan.action.value} is already armed')
+    _plans[plan.id] = plan
+    plan.start()
+    logger.info(f'Armed plan {plan.id} - {plan.indicator} {plan.pair} {plan.action.value}')
+    return plan
+
+
+async def disarm_plan(key: str) -> bool:
+    plan = _plans.pop(key, None)
+    if not plan:
+        return False
+    await plan.stop()
+    logger.info(f'Disarmed plan {key}')
+    return True
+
+
+def find_plan(message: dict) -> ArmedPlan | None:
+    plan = _plans.get(plan_key(message.get('indicator'), message.get('pair'), message.get('action')))
+    return plan if plan and plan.matches(message) else None
+
+
+def get_plans() -> List[ArmedPlan]:
+    return list(_plans.values())
@@ -1,14 +1,53 @@
 from abc import abstractmethod
-from decimal import Decimal
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
 from os import environ
 from logging import Logger
+from typing import Awaitable
 import enum
+import math
+import time
+import uuid
 import ccxt
 
-STOP_DELTA = Decimal(environ.get('STOP_DELTA'))
-TP_DELTA = Decimal(environ.get('TP_DELTA'))
+from goingfast import profiling
+from goingfast.analytics import get_analytics
+from goingfast.coordination import get_coordinator
+from goingfast.handover import get_handover
+from goingfast.traders import trailing
+from goingfast.traders.clock import get_clock
+from goingfast.traders.execution import ENTRY_EXECUTION, aggregate, get_slicer
+from goingfast.traders.health import get_health, record
+from goingfast.traders.ladder import (
+    LEG_CANCELED,
+    TP_LADDER,
+    TP_LADDER_POLL_INTERVAL,
+    build_legs,
+    filled_quantity,
+    missing_legs,
+    open_legs,
+    parse_ladder,
+    update_legs,
+)
+from goingfast.traders.orderids import ORDER_TIMEOUT, client_order_id, submit
+from goingfast.traders.ratelimit import RATE_LIMIT_BACKOFF, Priority, get_scheduler
+from goingfast.traders.reconcile import get_exchange_state, open_order
+from goingfast.traders.ticks import ROUND_FLOOR, ROUND_HALF_EVEN, Grid, get_grid
+from goingfast.traders.trailing import TRAILING_STOP_BY, CcxtMarkPriceFeed, PriceFeed, TrailingStop, get_feed
+
+STOP_DELTA = environ.get('STOP_DELTA')
+TP_DELTA = environ.get('TP_DELTA')
+# Distance in price of the stop limit and the backup stop market order beyond the stop trigger
+STOP_LIMIT_OFFSET = 5
+STOP_MARKET_OFFSET = 10
 API_KEY = environ.get('API_KEY')
 API_SECRET = environ.get('API_SECRET')
+# Monitor loops a restarted process can resume
+MONITORS = ['post_exit', 'post_exit_ladder', 'monitor_tp_ladder', 'monitor_trailing_stop']
+
+# ccxt clients live as long as the process so their rate limiting and connections carry over between trades
+_clients = dict()
 
 
 class Actions(enum.Enum):
@@ -20,112 +59,397 @@ class BaseTrader:
     __name__ = 'base'
     symbol = ''
     normalized_symbol = ''
-
-    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None):
+    tick_size = 0.5
+    qty_step = 1
+    # What a monitor needs to carry on in another process, see `goingfast.handover`
+    handover_fields = [
+        'trade_id',
+        'quantity',
+        'metadata',
+        'alert',
+        'leverage',
+        'entry_order',
+        'exit_order',
+        'exit_stop_limit_order',
+        'exit_stop_market_order',
+        'tp_legs',
+        'order_tags',
+    ]
+
+    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None, account=None):
         self.action = action
         self.quantity = quantity
         self.logger = logger
         self.metadata = metadata
 
+        # Fan-out account, None for the single account configured by API_KEY/API_SECRET
+        self.account = account
+        self.api_key = account.api_key if account else API_KEY
+        self.api_secret = account.api_secret if account else API_SECRET
+
         self.entry_order = dict()
         self.exit_order = dict()
         self.exit_stop_limit_order = dict()
         self.exit_stop_market_order = dict()
 
         self.leverage = None
+        self.trailing_stop = None
+        self.tp_legs = list()
+
+        # Replaced with the alert's id by `trade()`, client order ids are derived from it
+        self.trade_id = uuid.uuid4().hex[:12]
+        self.order_tags = dict()
+
+        # Set by `trade()` as well, the alert and when it arrived, for the analytics
+        self.alert = dict()
+        self.alert_received_at = None
+
+        # Set once the entry went out or bailed, the exit may take a lot longer
+        self.entry_settled = asyncio.Event()
+
+        # Name of the monitor loop following the open trade, and its task
+        self.monitor = None
+        self.monitor_task = None
+
+    @property
+    def prices(self) -> Grid:
+        return get_grid(self.tick_size)
+
+    @property
+    def quantities(self) -> Grid:
+        return get_grid(self.qty_step)
+
+    def format_price(self, price, rounding: str = ROUND_HALF_EVEN) -> str:
+        return self.prices.round(price, rounding)
+
+    def format_quantity(self, quantity, rounding: str = ROUND_FLOOR) -> str:
+        return self.quantities.round(quantity, rounding)
 
     @property
     def tp_using_risk_reward_ratio(self):
         return self.metadata and self.metadata.get('rr') is not None
 
     @property
-    def risk_reward_ratio(self):
+    def risk_reward_ratio(self) -> float | None:
         if self.tp_using_risk_reward_ratio:
-            return Decimal(self.metadata.get('rr'))
+            return float(self.metadata.get('rr'))
 
         return None
 
     @property
-    def stop_delta(self):
+    def stop_delta_ticks(self) -> int:
         if self.metadata and self.metadata.get('stop_delta') is not None:
-            return Decimal(self.metadata.get('stop_delta')).__round__(0)
+            return self.prices.parse(self.metadata.get('stop_delta'))
 
-        return STOP_DELTA
+        return self.prices.parse(STOP_DELTA)
 
     @property
-    def tp_delta(self):
-        # First Priority
-        if self.tp_using_risk_reward_ratio and self.stop_limit_trigger_price != Decimal(0):
-            tp_stop_delta = Decimal(abs(self.entry_price - self.stop_limit_trigger_price))
-            tp_delta = Decimal(tp_stop_delta * self.risk_reward_ratio)
-            if self.action == Actions.LONG:
-                return (self.entry_price + tp_delta).__round__(0)
-            elif self.action == Actions.SHORT:
-                return (self.entry_price - tp_delta).__round__(0)
+    def stop_delta(self) -> str:
+        return self.prices.format(self.stop_delta_ticks)
+
+    @property
+    def tp_delta_ticks(self) -> int:
+        # First Priority, a multiple of the distance to the stop
+        if self.tp_using_risk_reward_ratio and self.stop_trigger_ticks != 0:
+            risk = abs(self.entry_ticks - self.stop_trigger_ticks)
+            return self.prices.scaled(risk, self.metadata.get('rr'))
 
         # Second Priority
         if self.metadata and self.metadata.get('tp_delta') is not None:
-            return Decimal(self.metadata.get('tp_delta')).__round__(0)
+            return self.prices.parse(self.metadata.get('tp_delta'))
 
         # Last Priority
-        return TP_DELTA
+        return self.prices.parse(TP_DELTA)
+
+    @property
+    def tp_delta(self) -> str:
+        return self.prices.format(self.tp_delta_ticks)
 
     @property
-    def entry_price(self) -> Decimal:
+    def entry_ticks(self) -> int:
         if not self.entry_order:
-            return Decimal(0)
-        return Decimal(self.entry_order.get('price'))
+            return 0
+        return self.prices.parse(self.entry_order.get('price'))
 
     @property
-    def stop_limit_trigger_price(self) -> Decimal:
+    def entry_price(self) -> str:
+        return self.prices.format(self.entry_ticks)
+
+    @property
+    def stop_trigger_ticks(self) -> int:
         if self.metadata and self.metadata.get('stop_limit_trigger_price') is not None:
-            return Decimal(self.metadata.get('stop_limit_trigger_price')).__round__(0)
+            return self.prices.parse(self.metadata.get('stop_limit_trigger_price'))
 
         if self.action == Actions.LONG:
-            return self.entry_price - self.stop_delta
+            return self.entry_ticks - self.stop_delta_ticks
         elif self.action == Actions.SHORT:
-            return self.entry_price + self.stop_delta
+            return self.entry_ticks + self.stop_delta_ticks
         else:
-            return Decimal(0)
+            return 0
+
+    @property
+    def stop_limit_trigger_price(self) -> str:
+        return self.prices.format(self.stop_trigger_ticks)
 
     @property
-    def stop_limit_price(self) -> Decimal:
+    def stop_limit_ticks(self) -> int:
+        offset = self.prices.parse(STOP_LIMIT_OFFSET)
         if self.action == Actions.LONG:
-            return self.stop_limit_trigger_price - Decimal(5)
+            return self.stop_trigger_ticks - offset
         elif self.action == Actions.SHORT:
-            return self.stop_limit_trigger_price + Decimal(5)
+            return self.stop_trigger_ticks + offset
         else:
-            return Decimal(0)
+            return 0
+
+    @property
+    def stop_limit_price(self) -> str:
+        return self.prices.format(self.stop_limit_ticks)
 
     @property
-    def stop_price(self) -> Decimal | None:
+    def stop_price(self) -> str | None:
         return None
 
     @property
-    def stop_market_price(self) -> Decimal:
+    def stop_market_ticks(self) -> int:
+        offset = self.prices.parse(STOP_MARKET_OFFSET)
         if self.action == Actions.LONG:
-            return self.stop_limit_trigger_price - Decimal(10)
+            return self.stop_trigger_ticks - offset
         elif self.action == Actions.SHORT:
-            return self.stop_limit_trigger_price + Decimal(10)
+            return self.stop_trigger_ticks + offset
         else:
-            return Decimal(0)
+            return 0
 
     @property
-    def tp_price(self):
+    def stop_market_price(self) -> str:
+        return self.prices.format(self.stop_market_ticks)
+
+    @property
+    def tp_ticks(self) -> int:
         if self.action == Actions.LONG:
-            return self.entry_price + self.tp_delta
+            return self.entry_ticks + self.tp_delta_ticks
         elif self.action == Actions.SHORT:
-            return self.entry_price - self.tp_delta
+            return self.entry_ticks - self.tp_delta_ticks
         else:
-            return Decimal(0)
+            return 0
+
+    @property
+    def tp_price(self) -> str:
+        return self.prices.format(self.tp_ticks)
+
+    @property
+    def trailing_stop_by(self) -> float | None:
+        if self.metadata and self.metadata.get('trailing_stop_by'):
+            return float(self.metadata.get('trailing_stop_by'))
+
+        if TRAILING_STOP_BY:
+            return float(TRAILING_STOP_BY)
+
+        return None
+
+    @property
+    def trailing_stop_trigger_price(self) -> float | None:
+        if self.metadata and self.metadata.get('trailing_stop_trigger_price'):
+            return float(self.metadata.get('trailing_stop_trigger_price'))
+
+        return None
+
+    @property
+    def tp_ladder(self) -> list | None:
+        if self.metadata and self.metadata.get('tp_ladder'):
+            return parse_ladder(self.metadata.get('tp_ladder'))
+
+        return parse_ladder(TP_LADDER)
+
+    @property
+    def execution(self) -> str:
+        if self.metadata and self.metadata.get('execution') is not None:
+            return self.metadata.get('execution').lower()
+
+        return ENTRY_EXECUTION
+
+    @property
+    def exit_order_id(self):
+        return self.exit_order.get('id') if self.exit_order else None
+
+    @property
+    def stop_order_id(self):
+        return self.exit_stop_limit_order.get('id') if self.exit_stop_limit_order else None
+
+    @property
+    def entry_filled_quantity(self):
+        if not self.entry_order or not self.entry_order.get('filled'):
+            return self.quantity
+        return self.entry_order.get('filled')
 
     @property
     def client(self):
+        key = f'{self.__name__}:{self.api_key}'
+        if key in _clients:
+            return _clients[key]
+
         exc_class = getattr(ccxt, self.__name__)
         if not exc_class:
             raise NotImplementedError('This exchange is not implemented yet')
 
-        return exc_class({'apiKey': API_KEY, 'secret': API_SECRET, 'timeout': 30000, 'enableRateLimit': True})
+        # Short timeouts are safe, orders whose outcome is unknown are looked up by client id before a retry
+        _clients[key] = exc_class(
+            {
+                'apiKey': self.api_key,
+                'secret': self.api_secret,
+                'timeout': int(ORDER_TIMEOUT * 1000),
+                'enableRateLimit': True,
+            }
+        )
+        return _clients[key]
+
+    def client_order_id(self, tag: str) -> str:
+        """
+        Deterministic per trade, the n-th order of a kind always gets the same id
+        """
+        count = self.order_tags.get(tag, 0)
+        self.order_tags[tag] = count + 1
+        return client_order_id(trade_id=self.trade_id, tag=f'{tag}{count}')
+
+    async def submit_order(self, tag: str, create, lookup=None) -> dict:
+        """
+        `create` takes the client order id and sends the order, retried only once `lookup` says the id does not exist
+        """
+        client_id = self.client_order_id(tag)
+        lookup = lookup or self.find_order
+        return await submit(
+            name=f'{self.__name__} - {self.action}',
+            client_id=client_id,
+            create=lambda: create(client_id),
+            lookup=lambda: lookup(client_id),
+        )
+
+    async def find_order(self, client_id: str) -> dict | None:
+        raise NotImplementedError()
+
+    async def find_unified_order(self, client_id: str) -> dict | None:
+        order = await self.find_order(client_id)
+        return self.client.parse_order(order) if order else None
+
+    async def call(self, priority: Priority, method, *args, **kwargs):
+        """
+        Run a blocking ccxt call once the exchange's scheduler lets it through
+        """
+        scheduler = get_scheduler(self.__name__)
+        costs = {'rest': 1, 'orders': 1 if priority == Priority.ORDER else 0}
+        await scheduler.acquire(priority, costs)
+
+        # Fail fast once the venue is known to be down, unless there is a position to look after
+        if not self.entry_order:
+            get_health(self.__name__).check()
+
+        # ccxt stamps signed requests with its local clock less `timeDifference`
+        clock = get_clock(self.__name__)
+        options = getattr(self.client, 'options', None)
+        if clock.is_synced and options is not None:
+            options['timeDifference'] = -clock.offset_ms
+
+        endpoint = priority.name.lower()
+        started = time.monotonic()
+        try:
+            response = await self.run_blocking(method, *args, **kwargs)
+        except ccxt.DDoSProtection as exc:
+            scheduler.pause(RATE_LIMIT_BACKOFF)
+            record(self.__name__, endpoint, ok=False, latency=time.monotonic() - started, error=str(exc))
+            raise exc
+        except (ccxt.NetworkError, ccxt.ExchangeNotAvailable) as exc:
+            record(self.__name__, endpoint, ok=False, latency=time.monotonic() - started, error=str(exc))
+            raise exc
+        finally:
+            scheduler.observe_ccxt(getattr(self.client, 'last_response_headers', None))
+
+        record(self.__name__, endpoint, ok=True, latency=time.monotonic() - started)
+        return response
+
+    async def run_blocking(self, method, *args, **kwargs):
+        # ccxt blocks on its requests, on the executor the accounts of a fan-out and other trades keep going meanwhile
+        return await asyncio.get_running_loop().run_in_executor(None, partial(method, *args, **kwargs))
+
+    @property
+    def trade_key(self) -> str:
+        return f'{self.__name__}:{self.account_name}:{self.symbol}'
+
+    @asynccontextmanager
+    async def entry_lock(self):
+        """
+        Held from the open position check to the entry by every worker and replica, one position per symbol
+        """
+        coordinator = get_coordinator()
+        async with coordinator.lock(self.trade_key):
+            try:
+                yield
+                if self.entry_order:
+                    await coordinator.open_trade(
+                        self.trade_key,
+                        {'trade_id': self.trade_id, 'action': self.action.value, 'opened_at': time.time()},
+                    )
+                    get_analytics().open_trade(self.entry_record())
+            finally:
+                self.entry_settled.set()
+
+    async def close_trade(self):
+        await get_coordinator().close_trade(self.trade_key)
+
+    def entry_record(self) -> dict:
+        # Binance answers an ACK with an average of "0.00000"
+        prices = (self.entry_order.get(key) for key in ('avgPrice', 'average', 'price'))
+        price = next((float(p) for p in prices if p and float(p)), None)
+        close = self.alert.get('close')
+        received_at = self.alert_received_at
+        return {
+            'trade_id': self.trade_id,
+            'account': self.account_name,
+            'exchange': self.__name__,
+            'strategy': (self.metadata or dict()).get('strategy'),
+            'indicator': self.alert.get('indicator'),
+            'action': self.action.value,
+            'close': float(close) if close else None,
+            'entry_price': price,
+            'leverage': self.leverage or 1,
+            'latency_ms': round((time.time() - received_at) * 1000, 1) if received_at else None,
+            'opened_at': time.time(),
+        }
+
+    def record_exit(self, pnl_percent: float, exit_price: float | None = None, fees: float = 0.0):
+        """
+        The trade's outcome as the bot saw it, a backfill from the exchange's fills takes precedence
+        """
+        get_analytics().close_trade(
+            {
+                'trade_id': self.trade_id,
+                'account': self.account_name,
+                'exchange': self.__name__,
+                'action': self.action.value,
+                'exit_price': exit_price,
+                'pnl_percent': pnl_percent,
+                'fees': fees,
+                'closed_at': time.time(),
+                'source': 'bot',
+            }
+        )
+
+    @property
+    def account_name(self) -> str:
+        return self.account.name if self.account else 'default'
+
+    def account_leverage(self, leverage: int) -> int:
+        if self.account and self.account.leverage:
+            return int(self.account.leverage)
+        return leverage
+
+    async def prepare(self):
+        """
+        Alert level work that does not depend on the account, done once when fanning out to several accounts
+        """
+
+    def share_plan(self, lead: 'BaseTrader'):
+        """
+        Take over what `prepare` computed on the lead trader
+        """
 
     @abstractmethod
     async def long_entry(self):
@@ -143,26 +467,348 @@ class BaseTrader:
     async def short_exit(self):
         raise NotImplementedError()
 
+    async def unified_order(self, tag: str, method, *args) -> dict:
+        async def create(client_id: str) -> dict:
+            return await self.call(Priority.ORDER, method, self.normalized_symbol, *args, {'clientOrderId': client_id})
+
+        return await self.submit_order(tag=tag, create=create, lookup=self.find_unified_order)
+
     async def market_buy_order(self, quantity):
         if not self.client.has['createMarketOrder']:
             raise AttributeError('The selected exchange does not support market orders')
-        order = self.client.create_market_buy_order(symbol=self.normalized_symbol, amount=quantity)
+        order = await self.unified_order('e', self.client.create_market_buy_order, quantity)
         return order
 
     async def market_sell_order(self, quantity):
         if not self.client.has['createMarketOrder']:
             raise AttributeError('The selected exchange does not support market orders')
-        order = self.client.create_market_sell_order(symbol=self.normalized_symbol, amount=quantity)
+        order = await self.unified_order('e', self.client.create_market_sell_order, quantity)
         return order
 
     async def limit_buy_order(self, amount, price):
-        order = self.client.create_limit_buy_order(self.normalized_symbol, amount, price)
+        order = await self.unified_order('l', self.client.create_limit_buy_order, amount, price)
         return order
 
     async def limit_sell_order(self, amount, price):
-        order = self.client.create_limit_sell_order(self.normalized_symbol, amount, price)
+        order = await self.unified_order('l', self.client.create_limit_sell_order, amount, price)
         return order
 
+    async def execute_entry(self, quantity) -> dict:
+        """
+        Market entry for `quantity`, sliced by the configured execution algorithm into one aggregated order
+        """
+        profiling.mark('execute_entry')
+        if self.execution == 'market':
+            return await self.place_entry_child(quantity)
+
+        slicer = get_slicer(name=self.execution, exchange=self.__name__)
+        self.logger.info(f'{self.__name__} - {self.action} - Executing entry of {quantity} with {slicer.name}')
+        children = await slicer.execute(
+            place=self.place_entry_child,
+            quantity=float(quantity),
+            round_quantity=self.round_quantity,
+            market_volume=self.market_volume,
+        )
+        return self.aggregate_entry(children)
+
+    async def place_entry_child(self, quantity) -> dict:
+        if self.action == Actions.LONG:
+            return await self.market_buy_order(quantity=quantity)
+        return await self.market_sell_order(quantity=quantity)
+
+    def child_fill(self, order: dict) -> dict:
+        quantity = order.get('filled') or order.get('amount')
+        price = order.get('average') or order.get('price')
+        return {'quantity': float(quantity), 'price': float(price)}
+
+    def aggregate_entry(self, children: list) -> dict:
+        total = aggregate([self.child_fill(o) for o in children])
+        return {
+            'id': children[0].get('id'),
+            'price': total.get('price'),
+            'average': total.get('price'),
+            'amount': self.round_quantity(total.get('quantity')),
+            'filled': self.round_quantity(total.get('quantity')),
+            'children': children,
+        }
+
+    def round_quantity(self, quantity: float):
+        # Contracts are whole numbers on the inverse exchanges
+        return math.floor(quantity)
+
+    async def market_volume(self) -> float | None:
+        candles = await self.call(Priority.INFO, self.client.fetch_ohlcv, self.normalized_symbol, '1m', limit=1)
+        if not candles:
+            return None
+        return float(candles[-1][5])
+
+    def round_price(self, price: float) -> float:
+        return self.prices.to_float(self.prices.parse(price))
+
+    async def place_tp_ladder(self, stop_price):
+        # Legs priced off an unknown fill would sit on the wrong side of the market
+        if not float(self.entry_price) or not float(self.entry_filled_quantity):
+            raise ValueError(f'{self.__name__} - {self.action} - The entry fill is unknown, no TP ladder placed')
+        self.tp_legs = build_legs(
+            ladder=self.tp_ladder,
+            is_long=self.action == Actions.LONG,
+            entry_price=float(self.entry_price),
+            stop_price=float(stop_price),
+            quantity=float(self.entry_filled_quantity),
+            round_price=self.round_price,
+            round_quantity=self.round_quantity,
+        )
+        await self.place_tp_legs(self.tp_legs)
+
+        legs = ', '.join(f'{leg.get("quantity")} at {leg.get("price")}' for leg in self.tp_legs)
+        self.logger.info(f'{self.__name__} - {self.action} - Sent {len(self.tp_legs)} TP legs: {legs}')
+
+    async def place_tp_legs(self, legs: list):
+        """
+        One request per leg, exchanges with a batch endpoint override this
+        """
+        for leg in legs:
+            if self.action == Actions.LONG:
+                order = await self.limit_sell_order(amount=leg.get('quantity'), price=leg.get('price'))
+            else:
+                order = await self.limit_buy_order(amount=leg.get('quantity'), price=leg.get('price'))
+            leg['order_id'] = order.get('id')
+
+    async def amend_stop_quantity(self, quantity) -> bool:
+        raise NotImplementedError()
+
+    async def has_position(self) -> bool:
+        raise NotImplementedError()
+
+    async def exchange_state(self) -> dict:
+        """
+        Position and open orders on the symbol, what the reconciler compares the bot's trades with
+        """
+        orders = await self.call(Priority.MONITOR, self.client.fetch_open_orders, self.normalized_symbol)
+        return {
+            'position': await self.has_position(),
+            'orders': [open_order(o.get('id'), o.get('clientOrderId')) for o in orders],
+        }
+
+    async def has_open_trade(self, with_orders: bool = True) -> bool | None:
+        """
+        Whether the symbol is taken, from the open trade registry and the last reconciliation. None when the exchange
+        has to be asked: the reconciliation is too old to go by, or it saw the symbol taken by a trade that may have
+        closed since. Open orders take it as well unless `with_orders` is off, for venues that cancel them before
+        every entry.
+        """
+        state = get_exchange_state(self.trade_key)
+        if state is None:
+            return None
+        if self.trade_key in await get_coordinator().open_trades():
+            return True
+        is_taken = state.is_taken if with_orders else bool(state.position)
+        return None if is_taken else False
+
+    async def close_client(self):
+        """
+        Let go of a client made for this trader alone, shared clients stay open
+        """
+
+    async def cancel_order(self, order_id: str):
+        await self.call(Priority.ORDER, self.client.cancel_order, order_id, self.normalized_symbol)
+
+    async def order_status(self, order_id: str) -> str | None:
+        """
+        Status of a single order, None when the exchange could not tell
+        """
+        try:
+            order = await self.call(Priority.MONITOR, self.client.fetch_order, order_id, self.normalized_symbol)
+        except ccxt.BaseError as exc:
+            self.logger.info(f'{self.__name__} - {self.action} - Looking up order {order_id} failed: {exc!r}')
+            return None
+        return order.get('status')
+
+    async def settle_legs(self, open_ids: set) -> list:
+        """
+        Look up the legs that left the open orders, only the ones that were filled count as such
+        """
+        missing = missing_legs(self.tp_legs, open_ids)
+        statuses = {leg.get('order_id'): await self.order_status(leg.get('order_id')) for leg in missing}
+        filled = update_legs(self.tp_legs, statuses)
+        for leg in missing:
+            if leg.get('status') == LEG_CANCELED:
+                self.logger.error(f'{self.__name__} - {self.action} - TP leg {leg.get("order_id")} ended unfilled')
+        return filled
+
+    async def monitor_tp_ladder(self):
+        """
+        Follows every leg with a single open orders request per poll and re-sizes the stop to what is left
+        """
+        self.start_monitor('monitor_tp_ladder')
+        while open_legs(self.tp_legs):
+            await asyncio.sleep(TP_LADDER_POLL_INTERVAL)
+
+            open_orders = await self.call(Priority.MONITOR, self.client.fetch_open_orders, self.normalized_symbol)
+            open_ids = {o.get('id') for o in open_orders}
+            filled = await self.settle_legs(open_ids)
+            if filled:
+                remaining = float(self.entry_filled_quantity) - filled_quantity(self.tp_legs)
+                self.logger.info(f'{self.__name__} - {self.action} - {len(filled)} TP legs filled, {remaining} left')
+                if remaining > 0:
+                    await self.amend_stop_quantity(quantity=self.round_quantity(remaining))
+                continue
+
+            if not await self.has_position():
+                # Stopped out, the remaining legs have nothing left to close
+                self.logger.info(f'{self.__name__} - {self.action} - Position closed, cancelling TP legs')
+                for leg in open_legs(self.tp_legs):
+                    await self.cancel_order(order_id=leg.get('order_id'))
+                    leg['status'] = LEG_CANCELED
+
+        self.finish_monitor()
+        self.stop_trailing_stop()
+        await self.close_trade()
+
+    async def monitor_trailing_stop(self):
+        """
+        Follows a trail without a TP ladder until the position is gone, the stop has nothing left to protect after that
+        """
+        self.start_monitor('monitor_trailing_stop')
+        while self.trailing_stop and self.trailing_stop.feed:
+            await asyncio.sleep(TP_LADDER_POLL_INTERVAL)
+            try:
+                if not await self.has_position():
+                    self.logger.info(f'{self.__name__} - {self.action} - Position closed, the trailing stop ends')
+                    break
+            except ccxt.BaseError as exc:
+                self.logger.info(f'{self.__name__} - {self.action} - Checking the position failed: {exc!r}')
+
+        self.finish_monitor()
+        self.stop_trailing_stop()
+        await self.close_trade()
+
+    def price_feed(self) -> PriceFeed:
+        return get_feed(
+            key=f'{self.__name__}:{self.normalized_symbol}',
+            factory=lambda: CcxtMarkPriceFeed(symbol=self.normalized_symbol, exchange=self.__name__),
+        )
+
+    async def amend_stop(self, stop_price: float) -> bool:
+        """
+        Move the resting stop to `stop_price`, False when there is no stop left to move
+        """
+        raise NotImplementedError()
+
+    def start_trailing_stop(self, stop_price):
+        if self.trailing_stop_by is None:
+            return
+
+        activation_price = self.trailing_stop_trigger_price
+        self.trailing_stop = TrailingStop(
+            name=f'{self.__name__} - {self.action}',
+            is_long=self.action == Actions.LONG,
+            stop_price=float(stop_price),
+            trail_by=float(self.trailing_stop_by),
+            tick_size=self.tick_size,
+            amend=self.amend_stop,
+            activation_price=float(activation_price) if activation_price is not None else None,
+        )
+        trailing.start(self.trailing_stop, self.price_feed())
+        get_handover().follow(self)
+
+    def stop_trailing_stop(self):
+        if self.trailing_stop:
+            trailing.stop(self.trailing_stop)
+        if not self.monitor:
+            get_handover().forget(self)
+
+    def spawn_monitor(self, monitor: Awaitable):
+        """
+        Follow the open trade in the background, the task is kept on the trader and its failure reported
+        """
+        self.monitor_task = asyncio.get_running_loop().create_task(monitor)
+        self.monitor_task.add_done_callback(self.monitor_done)
+
+    def monitor_done(self, task: asyncio.Task):
+        if task.cancelled() or task.exception() is None:
+            return
+        self.logger.error(f'{self.__name__} - {self.action} - Monitor {self.monitor} failed: {task.exception()!r}')
+        if self.monitor_task is task:
+            self.finish_monitor()
+
+    def start_monitor(self, monitor: str):
+        self.monitor = monitor
+        self.monitor_task = asyncio.current_task()
+        get_handover().follow(self)
+
+    def finish_monitor(self):
+        """
+        The exit is known, what is left is cleaning up and reporting it
+        """
+        self.monitor = None
+        self.monitor_task = None
+        if not self.trailing_stop or not self.trailing_stop.feed:
+            get_handover().forget(self)
+
+    def to_dict(self) -> dict:
+        """
+        The trade as this process knows it, without asking the exchange
+        """
+        trail = self.trailing_stop if self.trailing_stop and self.trailing_stop.feed else None
+        return {
+            'trade_id': self.trade_id,
+            'trader': self.__name__,
+            'account': self.account_name,
+            'symbol': self.symbol,
+            'action': self.action.value,
+            'stage': self.monitor or ('trailing' if trail else 'exiting' if self.entry_order else 'entering'),
+            'entry_price': float(self.entry_price) if self.entry_order else None,
+            'exit_order_id': self.exit_order_id,
+            'stop_order_id': self.stop_order_id,
+            'tp_legs': self.tp_legs,
+            'trailing_stop': trail.stop_price if trail else None,
+        }
+
+    def monitor_state(self) -> dict:
+        state = {field: getattr(self, field) for field in self.handover_fields}
+        return dict(state, trader=self.__name__, account=self.account_name, action=self.action.value)
+
+    async def hand_over(self) -> dict:
+        """
+        Stop following the trade and return what another process needs to pick it up
+        """
+        trail = self.trailing_stop if self.trailing_stop and self.trailing_stop.feed else None
+        if trail:
+            trailing.stop(trail)
+            # An amend on its way finishes first, the state has to name the stop that is resting
+            if trail.pending:
+                await asyncio.wait([trail.pending])
+        monitor = self.monitor
+        if self.monitor_task:
+            self.monitor_task.cancel()
+        get_handover().forget(self)
+
+        return dict(
+            self.monitor_state(),
+            monitor=monitor,
+            trailing_stop={'stop_price': trail.stop_price, 'watermark': trail.watermark} if trail else None,
+            handed_over_at=time.time(),
+        )
+
+    async def resume(self, state: dict):
+        """
+        Carry on following a trade handed over by a process that shut down
+        """
+        get_handover().trading([self])
+        for field in self.handover_fields:
+            if field in state:
+                setattr(self, field, state.get(field))
+
+        trail = state.get('trailing_stop')
+        if trail:
+            self.start_trailing_stop(stop_price=trail.get('stop_price'))
+            self.trailing_stop.watermark = trail.get('watermark')
+
+        monitor = state.get('monitor')
+        if monitor in MONITORS:
+            await getattr(self, monitor)()
+
     @staticmethod
     def format_number(number, precision: int = 2) -> str:
         return '{:0.0{}f}'.format(number, precision)
@@ -3,11 +3,12 @@ from logging import Logger
 from os import environ
 
 import numpy as np
-import pyfiglet
 from binance.enums import (
+    KLINE_INTERVAL_1MINUTE,
     KLINE_INTERVAL_5MINUTE,
     SIDE_BUY,
     SIDE_SELL,
+    FUTURE_ORDER_TYPE_LIMIT,
     FUTURE_ORDER_TYPE_MARKET,
     FUTURE_ORDER_TYPE_STOP_MARKET,
     ORDER_RESP_TYPE_RESULT,
@@ -19,9 +20,22 @@ from binance.enums import (
 from binance.exceptions import BinanceAPIException
 from functional import seq
 
-from goingfast import BaseTrader, Actions
+from goingfast import profiling
+from goingfast.coordination import get_coordinator
 from goingfast.notifications.telegram import send_exit_message
+from goingfast.traders.base import Actions, BaseTrader
+from goingfast.traders.bookticker import get_book_ticker
+from goingfast.traders.chaser import PostOnlyChaser
+from goingfast.traders.execution import aggregate
+from goingfast.traders.health import CircuitOpenError, get_health
+from goingfast.traders.orderbook import get_order_book
+from goingfast.traders.ticks import ROUND_FLOOR
+from goingfast.traders.trailing import BinanceMarkPriceFeed, PriceFeed, get_feed
 from goingfast.traders.helpers import get_candles, get_binance_client, atr
+from goingfast.traders.orderids import ORDER_TIMEOUT, UNKNOWN_OUTCOME
+from goingfast.traders.ratelimit import ScheduledBinanceClient
+from goingfast.traders.reconcile import open_order
+from goingfast.traders.ladder import LEG_CANCELED, LEG_FILLED, filled_quantity, open_legs
 
 MINIMUM_ATR_VALUE = environ.get('MINIMUM_ATR_VALUE')
 MINIMUM_ATR_IN_PERCENT = environ.get('MINIMUM_ATR_IN_PERCENT')
@@ -29,12 +43,25 @@ SYMBOL = environ.get('SYMBOL', 'BTCUSDT')
 PRICE_PRECISION = int(environ.get('PRICE_PRECISION', '1'))
 QTY_PRECISION = int(environ.get('QTY_PRECISION', '3'))
 LEVERAGE = int(environ.get('LEVERAGE', '100'))
+MAX_ENTRY_SLIPPAGE_BPS = environ.get('MAX_ENTRY_SLIPPAGE_BPS')
+ENTRY_SLIPPAGE_ACTION = environ.get('ENTRY_SLIPPAGE_ACTION', 'reject')
 
 FINAL_ORDER_STATUSES = [ORDER_STATUS_FILLED, ORDER_STATUS_CANCELED, ORDER_STATUS_REJECTED]
+ORDER_DOES_NOT_EXIST = -2013
+BATCH_ORDERS_LIMIT = 5
+# Seconds between attempts to put a stop back on an unprotected position
+STOP_RETRY_DELAY = 1
 
 
 class BinanceFutures(BaseTrader):
     __name__ = 'binance-futures'
+    handover_fields = BaseTrader.handover_fields + [
+        'symbol',
+        'last_price',
+        'stop_order',
+        'price_precision',
+        'qty_precision',
+    ]
 
     def __init__(
         self,
@@ -46,8 +73,9 @@ class BinanceFutures(BaseTrader):
         price_precision: int = PRICE_PRECISION,
         qty_precision: int = QTY_PRECISION,
         leverage: int = LEVERAGE,
+        account=None,
     ):
-        super().__init__(action, quantity, logger, metadata)
+        super().__init__(action, quantity, logger, metadata, account)
 
         self.last_price = None
         self.atr = None
@@ -56,16 +84,29 @@ class BinanceFutures(BaseTrader):
         self.symbol = symbol
         self.price_precision = price_precision
         self.qty_precision = qty_precision
-        self.leverage = leverage
-        self.binance_client = get_binance_client()
+        self.leverage = self.account_leverage(leverage)
+        self.binance_client = self.make_binance_client()
 
         # Misc
         self.stop_order = None
+        self.stop_lock = asyncio.Lock()
+
+    def make_binance_client(self) -> ScheduledBinanceClient:
+        # Fan-out accounts keep one pooled client each, a single account gets a client per trade
+        return self.account.binance_client() if self.account else get_binance_client()
+
+    @property
+    def tick_size(self) -> float:
+        return 10**-self.price_precision
+
+    @property
+    def qty_step(self) -> float:
+        return 10**-self.qty_precision
 
     @property
     def quantity_in_asset(self) -> str:
         q = float(self.quantity) / float(self.last_price)
-        return self.format_number(q, precision=self.qty_precision)
+        return self.format_quantity(q)
 
     @property
     def minimum_atr_value(self) -> float:
@@ -81,17 +122,17 @@ class BinanceFutures(BaseTrader):
     @property
     def stop_price(self) -> str | None:
         if self.action == Actions.LONG:
-            return self.format_number(number=self.last_price - self.minimum_atr_value, precision=self.price_precision)
+            return self.format_price(self.last_price - self.minimum_atr_value)
         elif self.action == Actions.SHORT:
-            return self.format_number(number=self.last_price + self.minimum_atr_value, precision=self.price_precision)
+            return self.format_price(self.last_price + self.minimum_atr_value)
         return None
 
     @property
     def tp_price(self) -> str | None:
         if self.action == Actions.LONG:
-            return self.format_number(number=self.last_price + self.minimum_atr_value, precision=self.price_precision)
+            return self.format_price(self.last_price + self.minimum_atr_value)
         elif self.action == Actions.SHORT:
-            return self.format_number(number=self.last_price - self.minimum_atr_value, precision=self.price_precision)
+            return self.format_price(self.last_price - self.minimum_atr_value)
         return None
 
     @property
@@ -106,6 +147,20 @@ class BinanceFutures(BaseTrader):
             return None
         return float(self.entry_order.get('executedQty'))
 
+    @property
+    def entry_ticks(self) -> int:
+        # A RESULT response carries the fill in `avgPrice`, its `price` is "0" for market orders. An ACK has "0.00000".
+        if not self.entry_order:
+            return 0
+        average = self.entry_order.get('avgPrice')
+        return self.prices.parse(average if average and float(average) else self.entry_order.get('price'))
+
+    @property
+    def entry_filled_quantity(self) -> float:
+        if not self.entry_order or not float(self.entry_order.get('executedQty') or 0):
+            return float(self.quantity_in_asset)
+        return float(self.entry_order.get('executedQty'))
+
     @property
     def stop_order_id(self) -> str | None:
         if not self.stop_order:
@@ -118,10 +173,7 @@ class BinanceFutures(BaseTrader):
             return None
         return self.exit_order.get('orderId')
 
-    async def pre_entry(self):
-        title = pyfiglet.figlet_format(f'{self.__name__.title()}')
-        print(title)
-
+    async def prepare(self):
         # Get Candles
         self.ohlcv, self.hl2 = await get_candles(
             client=self.binance_client, symbol=self.symbol, timeframe=KLINE_INTERVAL_5MINUTE
@@ -136,7 +188,20 @@ class BinanceFutures(BaseTrader):
         # Last Price
         self.last_price = closes[-1]
 
+    def share_plan(self, lead: 'BinanceFutures'):
+        self.ohlcv, self.hl2, self.atr, self.last_price = lead.ohlcv, lead.hl2, lead.atr, lead.last_price
+
+    async def close_client(self):
+        if not self.account:
+            await self.binance_client.close_connection()
+
+    async def pre_entry(self):
+        profiling.mark('pre_entry')
+        if self.last_price is None:
+            await self.prepare()
+
         self.logger.info(f'{self.__name__} - {self.action} - Initializing..')
+        self.logger.info(f'{self.__name__} - {self.action} - Account: {self.account_name}')
         self.logger.info(f'{self.__name__} - {self.action} - Symbol: {self.symbol}')
         self.logger.info(f'{self.__name__} - {self.action} - Quantity: {self.quantity}')
         self.logger.info(f'{self.__name__} - {self.action} - Quantity (Asset): {self.quantity_in_asset}')
@@ -146,18 +211,33 @@ class BinanceFutures(BaseTrader):
         self.logger.info(f'{self.__name__} - {self.action} - ATR: {self.atr[-1]}')
         self.logger.info(f'{self.__name__} - {self.action} - Minimum ATR Value: {self.minimum_atr_value}')
 
-        # Check if there's an open position
-        orders = await self.binance_client.futures_get_open_orders(symbol=self.symbol)
-        print(orders)
+        # Preparing may just have tripped the breaker, bail before walking into more timeouts
+        try:
+            get_health(self.__name__).check()
+        except CircuitOpenError as exc:
+            await self.close_client()
+            raise exc
+
+        # Check if there's an open position, a recent reconciliation answers without asking the exchange
+        is_taken = await self.has_open_trade()
+        if is_taken is None:
+            state = await self.exchange_state()
+            self.logger.debug(f'{self.__name__} - {self.action} - Exchange state: {state}')
+            is_taken = state.get('position') or len(state.get('orders')) > 0
 
         try:
-            assert len(orders) == 0, f'{self.__name__} - {self.action} - There is an open position, bailed out..'
+            assert not is_taken, f'{self.__name__} - {self.action} - There is an open position, bailed out..'
             assert self.atr[-1] > self.minimum_atr_value, f'{self.__name__} - {self.action} - ATR is too small'
+            self.check_slippage()
         except AssertionError as exc:
-            await self.binance_client.close_connection()
+            await self.close_client()
             raise exc
 
-        # Set Leverage
+        await self.set_leverage()
+
+        self.logger.info(f'{self.__name__} - {self.action} - Pre-entry passed, ready to trade')
+
+    async def set_leverage(self):
         try:
             await self.binance_client.futures_change_margin_type(symbol=self.symbol, marginType='CROSSED')
             await self.binance_client.futures_change_leverage(symbol=self.symbol, leverage=self.leverage)
@@ -166,106 +246,439 @@ class BinanceFutures(BaseTrader):
                 f'{self.__name__} - {self.action} - Margin is already CROSSED and leverage is {self.leverage}'
             )
 
-        self.logger.info(f'{self.__name__} - {self.action} - Pre-entry passed, ready to trade')
+    def check_slippage(self):
+        """
+        Reject or downsize the entry when the local book says it would fill too far from the touch
+        """
+        if not MAX_ENTRY_SLIPPAGE_BPS:
+            return
+
+        book = get_order_book(self.symbol)
+        if not book.is_ready:
+            self.logger.info(f'{self.__name__} - {self.action} - Order book is not synced, skipping slippage check')
+            return
+
+        max_bps = float(MAX_ENTRY_SLIPPAGE_BPS)
+        is_buy = self.action == Actions.LONG
+        slippage = book.slippage_bps(is_buy=is_buy, notional=float(self.quantity))
+        self.logger.info(f'{self.__name__} - {self.action} - Estimated slippage: {slippage} bps')
+        if slippage is not None and slippage <= max_bps:
+            return
+
+        assert (
+            ENTRY_SLIPPAGE_ACTION == 'downsize'
+        ), f'{self.__name__} - {self.action} - Estimated slippage is over {max_bps} bps, bailed out..'
+
+        notional = book.max_notional_within(is_buy=is_buy, max_bps=max_bps)
+        assert notional > 0, f'{self.__name__} - {self.action} - No size fits within {max_bps} bps, bailed out..'
+        self.logger.info(f'{self.__name__} - {self.action} - Downsizing from {self.quantity} to {notional:.2f}')
+        self.quantity = notional
 
     async def long_entry(self):
-        await self.pre_entry()
+        async with self.entry_lock():
+            await self.pre_entry()
 
-        # Create Entry Order
-        self.entry_order = await self.binance_client.futures_create_order(
-            symbol=self.symbol,
-            side=SIDE_BUY,
-            type=FUTURE_ORDER_TYPE_MARKET,
-            quantity=self.quantity_in_asset,
-            newOrderRespType=ORDER_RESP_TYPE_RESULT,
-        )
+            # Create Entry Order
+            self.entry_order = await self.execute_entry(quantity=float(self.quantity_in_asset))
         self.logger.info(f'{self.__name__} - {self.action} - Entry Order ID: {self.entry_order_id}')
         self.logger.info(f'{self.__name__} - {self.action} - Executed Qty: {self.entry_executed_qty}')
 
         await self.long_exit()
 
     async def long_exit(self):
+        profiling.mark('exit')
         # Create Stop Order
-        self.stop_order = await self.binance_client.futures_create_order(
-            symbol=self.symbol,
-            side=SIDE_SELL,
-            type=FUTURE_ORDER_TYPE_STOP_MARKET,
-            closePosition=True,
-            stopPrice=self.stop_price,
-            newOrderRespType=ORDER_RESP_TYPE_RESULT,
+        self.stop_order = await self.create_order(
+            tag='s', side=SIDE_SELL, type=FUTURE_ORDER_TYPE_STOP_MARKET, closePosition=True, stopPrice=self.stop_price
         )
         self.logger.info(f'{self.__name__} - {self.action} - Stop Order ID: {self.stop_order_id}')
+        self.start_trailing_stop(stop_price=self.stop_price)
 
         # Create TP Order
-        self.exit_order = await self.binance_client.futures_create_order(
-            symbol=self.symbol,
+        if self.tp_ladder:
+            await self.place_tp_ladder(stop_price=self.stop_price)
+            await self.post_exit_ladder()
+            return
+
+        self.exit_order = await self.create_order(
+            tag='t',
             side=SIDE_SELL,
             type='TAKE_PROFIT',
-            quantity=self.format_number(self.entry_executed_qty, precision=self.qty_precision),
+            quantity=self.format_quantity(self.entry_executed_qty),
             price=self.tp_price,
             stopPrice=self.stop_price,
-            newOrderRespType=ORDER_RESP_TYPE_RESULT,
             timeInForce=TIME_IN_FORCE_GTC,
         )
         self.logger.info(f'{self.__name__} - {self.action} - Exit Order ID: {self.exit_order_id}')
 
         await self.post_exit()
 
+    async def armed_entry(self, payload: dict):
+        """
+        Entry of an armed plan, the checks of `pre_entry` already ran in the background and the order is prebuilt
+        """
+        profiling.mark('armed_entry')
+        async with self.entry_lock():
+            # The plan saw the symbol flat at its last refresh, a trade may have opened since
+            is_taken = await self.has_open_trade()
+            if is_taken is None:
+                # Without a recent reconciliation to go by, the registry knows of every trade the bot opened since
+                is_taken = self.trade_key in await get_coordinator().open_trades()
+            if is_taken:
+                await self.close_client()
+                raise AssertionError(f'{self.__name__} - {self.action} - There is an open position, bailed out..')
+            if MAX_ENTRY_SLIPPAGE_BPS:
+                try:
+                    self.check_slippage()
+                except AssertionError as exc:
+                    await self.close_client()
+                    raise exc
+                payload = dict(payload, quantity=self.quantity_in_asset)
+            self.entry_order = await self.create_order(tag='e', **payload)
+        self.logger.info(f'{self.__name__} - {self.action} - Armed Entry Order ID: {self.entry_order_id}')
+        self.logger.info(f'{self.__name__} - {self.action} - Executed Qty: {self.entry_executed_qty}')
+
+        if self.action == Actions.LONG:
+            await self.long_exit()
+        else:
+            await self.short_exit()
+
     async def short_entry(self):
-        await self.pre_entry()
+        async with self.entry_lock():
+            await self.pre_entry()
 
-        # Create Entry Order
-        self.entry_order = await self.binance_client.futures_create_order(
-            symbol=self.symbol,
-            side=SIDE_SELL,
-            type=FUTURE_ORDER_TYPE_MARKET,
-            quantity=self.format_number(self.quantity, precision=self.qty_precision),
-            newOrderRespType=ORDER_RESP_TYPE_RESULT,
-        )
+            # Create Entry Order
+            self.entry_order = await self.execute_entry(quantity=float(self.quantity_in_asset))
         self.logger.info(f'{self.__name__} - {self.action} - Entry Order ID: {self.entry_order_id}')
         self.logger.info(f'{self.__name__} - {self.action} - Executed Qty: {self.entry_executed_qty}')
 
         await self.short_exit()
 
     async def short_exit(self):
+        profiling.mark('exit')
         # Create Stop Order
-        self.stop_order = await self.binance_client.futures_create_order(
-            symbol=self.symbol,
-            side=SIDE_BUY,
-            type=FUTURE_ORDER_TYPE_STOP_MARKET,
-            closePosition=True,
-            stopPrice=self.stop_price,
-            newOrderRespType=ORDER_RESP_TYPE_RESULT,
+        self.stop_order = await self.create_order(
+            tag='s', side=SIDE_BUY, type=FUTURE_ORDER_TYPE_STOP_MARKET, closePosition=True, stopPrice=self.stop_price
         )
         self.logger.info(f'{self.__name__} - {self.action} - Stop Order ID: {self.stop_order_id}')
+        self.start_trailing_stop(stop_price=self.stop_price)
 
         # Create TP Order
-        self.exit_order = await self.binance_client.futures_create_order(
-            symbol=self.symbol,
+        if self.tp_ladder:
+            await self.place_tp_ladder(stop_price=self.stop_price)
+            await self.post_exit_ladder()
+            return
+
+        self.exit_order = await self.create_order(
+            tag='t',
             side=SIDE_BUY,
             type='TAKE_PROFIT',
-            quantity=self.format_number(self.entry_executed_qty, precision=self.qty_precision),
+            quantity=self.format_quantity(self.entry_executed_qty),
             price=self.tp_price,
             stopPrice=self.stop_price,
-            newOrderRespType=ORDER_RESP_TYPE_RESULT,
         )
         self.logger.info(f'{self.__name__} - {self.action} - Exit Order ID: {self.exit_order_id}')
 
         await self.post_exit()
 
+    async def execute_entry(self, quantity) -> dict:
+        profiling.mark('execute_entry')
+        if self.execution != 'chase':
+            return await super().execute_entry(quantity)
+
+        chaser = PostOnlyChaser(
+            binance_client=self.binance_client,
+            create_order=self.create_order,
+            ticker=get_book_ticker(self.symbol),
+            symbol=self.symbol,
+            side=SIDE_BUY if self.action == Actions.LONG else SIDE_SELL,
+            price_precision=self.price_precision,
+            qty_precision=self.qty_precision,
+            logger=self.logger,
+        )
+        return self.aggregate_entry(await chaser.execute(quantity=float(quantity)))
+
+    async def create_order(self, tag: str, **params) -> dict:
+        async def create(client_id: str) -> dict:
+            return await self.binance_client.futures_create_order(
+                symbol=self.symbol, newClientOrderId=client_id, newOrderRespType=ORDER_RESP_TYPE_RESULT, **params
+            )
+
+        return await self.submit_order(tag=tag, create=create)
+
+    async def find_order(self, client_id: str) -> dict | None:
+        try:
+            order = await self.binance_client.futures_get_order(symbol=self.symbol, origClientOrderId=client_id)
+        except BinanceAPIException as exc:
+            if exc.code == ORDER_DOES_NOT_EXIST:
+                return None
+            raise exc
+
+        return order or None
+
+    async def place_entry_child(self, quantity) -> dict:
+        return await self.create_order(
+            tag='e',
+            side=SIDE_BUY if self.action == Actions.LONG else SIDE_SELL,
+            type=FUTURE_ORDER_TYPE_MARKET,
+            quantity=self.format_quantity(quantity),
+        )
+
+    def child_fill(self, order: dict) -> dict:
+        return {'quantity': float(order.get('executedQty')), 'price': float(order.get('avgPrice'))}
+
+    def aggregate_entry(self, children: list) -> dict:
+        total = aggregate([self.child_fill(o) for o in children])
+        average = self.format_price(total.get('price'))
+        return {
+            'orderId': children[0].get('orderId'),
+            'executedQty': self.format_quantity(total.get('quantity')),
+            'avgPrice': average,
+            'price': average,
+            'children': children,
+        }
+
+    def round_quantity(self, quantity: float) -> float:
+        return self.quantities.to_float(self.quantities.parse(quantity, ROUND_FLOOR))
+
+    async def market_volume(self) -> float | None:
+        klines = await self.binance_client.futures_klines(symbol=self.symbol, interval=KLINE_INTERVAL_1MINUTE, limit=1)
+        if not klines:
+            return None
+        return float(klines[-1][5])
+
+    def price_feed(self) -> PriceFeed:
+        return get_feed(key=f'{self.__name__}:{self.symbol}', factory=lambda: BinanceMarkPriceFeed(symbol=self.symbol))
+
+    @property
+    def exit_side(self) -> str:
+        return SIDE_SELL if self.action == Actions.LONG else SIDE_BUY
+
+    async def place_stop(self, stop_price: str) -> dict:
+        return await self.create_order(
+            tag='s', side=self.exit_side, type=FUTURE_ORDER_TYPE_STOP_MARKET, closePosition=True, stopPrice=stop_price
+        )
+
+    async def close_at_market(self) -> dict:
+        return await self.create_order(
+            tag='x',
+            side=self.exit_side,
+            type=FUTURE_ORDER_TYPE_MARKET,
+            quantity=self.format_quantity(self.entry_executed_qty),
+            reduceOnly=True,
+        )
+
+    async def cancel_stop(self) -> bool:
+        """
+        Cancel the resting stop, False when it is not there to cancel any more because it went through
+        """
+        try:
+            await self.binance_client.futures_cancel_order(symbol=self.symbol, orderId=self.stop_order_id)
+            return True
+        except (BinanceAPIException, *UNKNOWN_OUTCOME) as exc:
+            error = exc
+
+        # Rejected or unanswered, the stop itself says whether it is gone
+        order = await self.binance_client.futures_get_order(symbol=self.symbol, orderId=self.stop_order_id)
+        if order.get('status') == ORDER_STATUS_CANCELED:
+            return True
+        if order.get('status') in FINAL_ORDER_STATUSES:
+            return False
+        raise error
+
+    async def protect(self, stop_price: str | None) -> bool:
+        """
+        Rest a stop at `stop_price` once the last one is cancelled, or close at market when that fails too. Leaves
+        `stop_order` empty and returns False when the position is still unprotected.
+        """
+        attempts = [self.close_at_market]
+        if stop_price is not None:
+            attempts.insert(0, lambda: self.place_stop(stop_price))
+        for attempt in attempts:
+            try:
+                self.stop_order = await attempt()
+                return True
+            except (BinanceAPIException, *UNKNOWN_OUTCOME) as exc:
+                self.logger.error(f'{self.__name__} - {self.action} - Protecting the position failed: {exc!r}')
+        self.stop_order = None
+        return False
+
+    async def ensure_stop(self) -> bool:
+        """
+        Put a stop back when a failed amend left none, False while the position is still unprotected
+        """
+        if self.stop_order is not None:
+            return True
+        trailed = self.trailing_stop.stop_price if self.trailing_stop else None
+        return await self.protect(stop_price=self.format_price(trailed) if trailed else self.stop_price)
+
+    async def amend_stop(self, stop_price: float) -> bool:
+        # Only one closePosition stop may rest per side, so the old one has to go first
+        async with self.stop_lock:
+            if not await self.ensure_stop():
+                raise RuntimeError('There is no stop to amend')
+            if not await self.cancel_stop():
+                return False
+
+            last_stop_price = self.stop_order.get('stopPrice')
+            try:
+                self.stop_order = await self.place_stop(self.format_price(stop_price))
+            except BinanceAPIException as exc:
+                # Price already went through the new stop, close at market rather than sit unprotected
+                self.logger.error(f'{self.__name__} - {self.action} - Stop rejected ({exc}), closing at market')
+                await self.protect(stop_price=None)
+            except UNKNOWN_OUTCOME as exc:
+                # The old stop is gone and the new one may not exist, the last one goes back and the trail retries
+                self.logger.error(f'{self.__name__} - {self.action} - Stop outcome unknown ({exc!r}), restoring it')
+                await self.protect(stop_price=last_stop_price)
+                raise exc
+
+        return True
+
+    async def place_tp_legs(self, legs: list):
+        side = SIDE_SELL if self.action == Actions.LONG else SIDE_BUY
+        orders = [
+            {
+                'symbol': self.symbol,
+                'side': side,
+                'type': FUTURE_ORDER_TYPE_LIMIT,
+                'timeInForce': TIME_IN_FORCE_GTC,
+                'quantity': self.format_quantity(leg.get('quantity')),
+                'price': self.format_price(leg.get('price')),
+                'reduceOnly': 'true',
+                'newOrderRespType': ORDER_RESP_TYPE_RESULT,
+                'newClientOrderId': self.client_order_id('t'),
+            }
+            for leg in legs
+        ]
+
+        # The batch endpoint takes at most 5 orders per request
+        for start in range(0, len(orders), BATCH_ORDERS_LIMIT):
+            batch = orders[start : start + BATCH_ORDERS_LIMIT]
+            try:
+                response = await asyncio.wait_for(
+                    self.binance_client.futures_place_batch_order(batchOrders=batch), timeout=ORDER_TIMEOUT
+                )
+            except UNKNOWN_OUTCOME as exc:
+                # Keep the legs that made it and send the others one by one
+                self.logger.info(f'{self.__name__} - {self.action} - Batch outcome unknown ({exc!r}), checking legs')
+                response = list()
+                for order in batch:
+                    found = await self.find_order(order.get('newClientOrderId'))
+                    response.append(found or await self.binance_client.futures_create_order(**order))
+            for leg, order in zip(legs[start : start + BATCH_ORDERS_LIMIT], response):
+                if order.get('code'):
+                    self.logger.error(f'{self.__name__} - {self.action} - TP leg rejected: {order.get("msg")}')
+                    leg['status'] = LEG_CANCELED
+                    continue
+                leg['order_id'] = order.get('orderId')
+
     async def cancel_order(self, order_id: str):
-        await self.binance_client.futures_cancel_order(orderId=order_id)
+        await self.binance_client.futures_cancel_order(symbol=self.symbol, orderId=order_id)
+
+    async def order_status(self, order_id: str) -> str | None:
+        try:
+            order = await self.binance_client.futures_get_order(symbol=self.symbol, orderId=order_id)
+        except BinanceAPIException as exc:
+            self.logger.info(f'{self.__name__} - {self.action} - Looking up order {order_id} failed: {exc!r}')
+            return None
+        return order.get('status')
+
+    async def exchange_state(self) -> dict:
+        positions = await self.binance_client.futures_position_information(symbol=self.symbol)
+        orders = await self.binance_client.futures_get_open_orders(symbol=self.symbol)
+        return {
+            'position': any(float(p.get('positionAmt') or 0) for p in positions),
+            'orders': [open_order(o.get('orderId'), o.get('clientOrderId')) for o in orders],
+        }
+
+    async def post_exit_ladder(self):
+        """
+        Polls every leg and the stop with one open orders request. The stop closes the whole position, so it
+        needs no re-sizing as legs fill.
+        """
+        profiling.mark('monitor')
+        if not open_legs(self.tp_legs):
+            self.logger.error(f'{self.__name__} - {self.action} - No TP leg was accepted, leaving the stop in place')
+            await self.close_trade()
+            await self.close_client()
+            return
+
+        self.start_monitor('post_exit_ladder')
+        stop_open = True
+        while open_legs(self.tp_legs) and stop_open:
+            await asyncio.sleep(30 if self.stop_order else STOP_RETRY_DELAY)
+
+            async with self.stop_lock:
+                if not await self.ensure_stop():
+                    continue
+                open_orders = await self.binance_client.futures_get_open_orders(symbol=self.symbol)
+                open_ids = {o.get('orderId') for o in open_orders}
+                stop_open = self.stop_order_id in open_ids
+
+            filled = await self.settle_legs(open_ids)
+            for leg in filled:
+                self.logger.info(
+                    f'{self.__name__} - {self.action} - TP leg filled: {leg.get("quantity")} at {leg.get("price")}'
+                )
+
+        self.finish_monitor()
+        self.stop_trailing_stop()
+        self.logger.info(f'{self.__name__} - {self.action} - Ladder finished, stop open: {stop_open}')
+        for leg in open_legs(self.tp_legs):
+            await self.cancel_order(order_id=leg.get('order_id'))
+            leg['status'] = LEG_CANCELED
+        if stop_open:
+            await self.cancel_order(order_id=self.stop_order_id)
+
+        # Weighted over the legs, whatever the legs did not close went out at the stop
+        entry_price = float(self.entry_price)
+        quantity = float(self.entry_executed_qty)
+        direction = 1 if self.action == Actions.LONG else -1
+        tp_quantity = filled_quantity(self.tp_legs)
+        profit = sum(
+            direction * (leg.get('price') - entry_price) * leg.get('quantity')
+            for leg in self.tp_legs
+            if leg.get('status') == LEG_FILLED
+        )
+        if not stop_open and quantity > tp_quantity:
+            stop_order = await self.binance_client.futures_get_order(orderId=self.stop_order_id, symbol=self.symbol)
+            stop_fill = float(stop_order.get('avgPrice') or self.stop_price)
+            profit += direction * (stop_fill - entry_price) * (quantity - tp_quantity)
+        pnl_percent = profit / (entry_price * quantity) * 100 * self.leverage
+        self.record_exit(pnl_percent=pnl_percent)
+
+        await send_exit_message(
+            action=self.action.value,
+            trader=self,
+            quantity=str(self.quantity),
+            entry_price=str(self.entry_price),
+            stop_price=self.stop_price,
+            tp_price=', '.join(str(leg.get('price')) for leg in self.tp_legs),
+            pnl=self.format_number(pnl_percent, precision=2),
+        )
+
+        await self.close_trade()
+        await self.close_client()
 
     async def post_exit(self):
+        profiling.mark('monitor')
+        self.start_monitor('post_exit')
         while True:
             self.logger.info(f'{self.__name__} - {self.action} - Polling for exit/stop order to be filled')
-            tp_order = await self.binance_client.futures_get_order(orderId=self.exit_order_id, symbol=self.symbol)
-            stop_order = await self.binance_client.futures_get_order(orderId=self.stop_order_id, symbol=self.symbol)
+            async with self.stop_lock:
+                if not await self.ensure_stop():
+                    await asyncio.sleep(STOP_RETRY_DELAY)
+                    continue
+                tp_order = await self.binance_client.futures_get_order(orderId=self.exit_order_id, symbol=self.symbol)
+                stop_order = await self.binance_client.futures_get_order(orderId=self.stop_order_id, symbol=self.symbol)
 
             has_exited_tp = tp_order.get('status') in FINAL_ORDER_STATUSES
             has_exited_stop = stop_order.get('status') in FINAL_ORDER_STATUSES
 
             if has_exited_tp or has_exited_stop:
+                self.finish_monitor()
+                self.stop_trailing_stop()
                 self.logger.info(f'{self.__name__} - {self.action} - Exit order filled')
                 self.logger.info(f'{self.__name__} - {self.action} - Has Exited TP: {has_exited_tp}')
                 self.logger.info(f'{self.__name__} - {self.action} - Has Exited Stop: {has_exited_stop}\n')
@@ -274,11 +687,17 @@ class BinanceFutures(BaseTrader):
                 await self.cancel_order(order_id=to_be_canceled_id)
 
                 # Send Telegram Messaage
-                exit_price = float(tp_order.get('price') if has_exited_tp else stop_order.get('avgPrice'))
-                entry_price = float(self.entry_order.get('avgPrice'))
-                delta = abs(exit_price - entry_price)
-                delta_percent = delta / entry_price * 100 * self.leverage
-                pnl = f'-{self.format_number(delta_percent, precision=2)}' if has_exited_stop else self.format_number(delta_percent, precision=2)
+                if has_exited_tp:
+                    exit_price = float(tp_order.get('price'))
+                else:
+                    exit_price = float(stop_order.get('avgPrice') or 0) or float(stop_order.get('stopPrice'))
+                # A stop trailed past the entry exits in profit
+                entry_price = float(self.entry_price)
+                direction = 1 if self.action == Actions.LONG else -1
+                pnl_percent = direction * (exit_price - entry_price) / entry_price * 100 * self.leverage
+                self.record_exit(pnl_percent=pnl_percent, exit_price=exit_price)
+
+                pnl = self.format_number(pnl_percent, precision=2)
                 await send_exit_message(
                     action=self.action.value,
                     trader=self,
@@ -293,4 +712,5 @@ class BinanceFutures(BaseTrader):
             self.logger.info(f'{self.__name__} - {self.action} - No exit detected, sleeping..')
             await asyncio.sleep(30)
 
-        await self.binance_client.close_connection()
+        await self.close_trade()
+        await self.close_client()
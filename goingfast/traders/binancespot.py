@@ -1,24 +1,361 @@
-from goingfast.traders.base import BaseTrader, Actions
+"""
+Binance spot, long only.
+
+Entries are market buys on the spot client pooled per API key. The stop loss and the take profit go out together as
+one OCO order, a single request instead of two, and whichever leg fills cancels the other on the exchange. The exit
+is followed on the account's user data stream, the order endpoint is only asked when the stream stayed quiet for
+`USER_STREAM_POLL_INTERVAL` seconds.
+"""
 from logging import Logger
+from typing import Dict
+
+import numpy as np
+from binance.enums import (
+    KLINE_INTERVAL_1MINUTE,
+    KLINE_INTERVAL_5MINUTE,
+    ORDER_RESP_TYPE_FULL,
+    ORDER_RESP_TYPE_RESULT,
+    ORDER_STATUS_FILLED,
+    ORDER_TYPE_MARKET,
+    SIDE_BUY,
+    SIDE_SELL,
+    HistoricalKlinesType,
+)
+from binance.exceptions import BinanceAPIException
+from functional import seq
+
+from goingfast import profiling
+from goingfast.notifications.telegram import send_exit_message
+from goingfast.traders.base import BaseTrader, Actions
+from goingfast.traders.binancefutures import MINIMUM_ATR_IN_PERCENT, MINIMUM_ATR_VALUE, ORDER_DOES_NOT_EXIST, SYMBOL
+from goingfast.traders.execution import aggregate
+from goingfast.traders.health import get_health
+from goingfast.traders.helpers import atr, get_binance_spot_client, get_candles
+from goingfast.traders.ratelimit import ScheduledBinanceClient
+from goingfast.traders.reconcile import open_order
+from goingfast.traders.ticks import ROUND_FLOOR
+from goingfast.traders.userstream import USER_STREAM_POLL_INTERVAL, get_user_stream
+
+STOP_LOSS_TYPES = ['STOP_LOSS', 'STOP_LOSS_LIMIT']
+
+# Price and lot filters of every symbol traded, they only change with exchange announcements
+_symbols: Dict[str, dict] = dict()
+
+
+async def get_symbol_filters(client: ScheduledBinanceClient, symbol: str) -> dict:
+    if symbol not in _symbols:
+        info = await client.get_symbol_info(symbol)
+        filters = {f.get('filterType'): f for f in info.get('filters')}
+        _symbols[symbol] = {
+            'base_asset': info.get('baseAsset'),
+            'tick_size': filters.get('PRICE_FILTER').get('tickSize'),
+            'step_size': filters.get('LOT_SIZE').get('stepSize'),
+        }
+    return _symbols[symbol]
 
 
 class BinanceSpot(BaseTrader):
     __name__ = 'binance'
+    handover_fields = BaseTrader.handover_fields + ['symbol', 'last_price', 'filters']
 
-    def __init__(self, action: Actions, quantity: int, logger: Logger):
+    def __init__(
+        self, action: Actions, quantity: int, logger: Logger, metadata: dict = None, symbol: str = SYMBOL, account=None
+    ):
         if action == Actions.SHORT:
             raise NotImplementedError('Unable to short in spot trading')
 
-        super().__init__(action, quantity, logger)
+        super().__init__(action, quantity, logger, metadata, account)
+
+        self.last_price = None
+        self.atr = None
+        self.hl2 = None
+        self.ohlcv = None
+        self.symbol = symbol
+        self.filters = _symbols.get(symbol)
+        self.leverage = 1
+        self.binance_client = get_binance_spot_client(api_key=self.api_key, api_secret=self.api_secret)
+
+    @property
+    def tick_size(self) -> str | float:
+        # The exchange's filters come with `prepare`, the config log before it shows the deltas on the default grid
+        return self.filters.get('tick_size') if self.filters else super().tick_size
+
+    @property
+    def qty_step(self) -> str | float:
+        return self.filters.get('step_size') if self.filters else super().qty_step
+
+    @property
+    def quantity_in_asset(self) -> str:
+        return self.format_quantity(float(self.quantity) / float(self.last_price))
+
+    @property
+    def minimum_atr_value(self) -> float:
+        if MINIMUM_ATR_VALUE:
+            return float(MINIMUM_ATR_VALUE)
+
+        if not MINIMUM_ATR_IN_PERCENT:
+            raise ValueError('MINIMUM_ATR_IN_PERCENT is not set')
+
+        return float(self.last_price) * float(MINIMUM_ATR_IN_PERCENT) / 100
+
+    @property
+    def stop_price(self) -> str:
+        return self.format_price(self.last_price - self.minimum_atr_value)
+
+    @property
+    def tp_price(self) -> str:
+        return self.format_price(self.last_price + self.minimum_atr_value)
+
+    @property
+    def entry_order_id(self) -> int | None:
+        if not self.entry_order:
+            return None
+        return self.entry_order.get('orderId')
+
+    @property
+    def entry_executed_qty(self) -> float | None:
+        """
+        What is left to sell once the fee was taken in the base asset
+        """
+        if not self.entry_order:
+            return None
+        return float(self.entry_order.get('sellableQty'))
+
+    def exit_leg(self, is_stop: bool) -> dict:
+        reports = self.exit_order.get('orderReports', list()) if self.exit_order else list()
+        return next((r for r in reports if (r.get('type') in STOP_LOSS_TYPES) == is_stop), dict())
+
+    @property
+    def stop_order_id(self) -> int | None:
+        return self.exit_leg(is_stop=True).get('orderId')
+
+    @property
+    def exit_order_id(self) -> int | None:
+        return self.exit_leg(is_stop=False).get('orderId')
+
+    async def prepare(self):
+        self.filters = await get_symbol_filters(self.binance_client, self.symbol)
+
+        self.ohlcv, self.hl2 = await get_candles(
+            client=self.binance_client,
+            symbol=self.symbol,
+            timeframe=KLINE_INTERVAL_5MINUTE,
+            klines_type=HistoricalKlinesType.SPOT,
+        )
+        highs = np.array(seq(self.ohlcv).map(lambda x: x[1]).to_list())
+        lows = np.array(seq(self.ohlcv).map(lambda x: x[2]).to_list())
+        closes = np.array(seq(self.ohlcv).map(lambda x: x[3]).to_list())
+        self.atr = atr(highs=highs, lows=lows, closes=closes, period=14)
+        self.last_price = closes[-1]
+
+    def share_plan(self, lead: 'BinanceSpot'):
+        self.ohlcv, self.hl2, self.atr, self.last_price = lead.ohlcv, lead.hl2, lead.atr, lead.last_price
+        self.filters = lead.filters
+
+    async def pre_entry(self):
+        profiling.mark('pre_entry')
+        if self.last_price is None:
+            await self.prepare()
+
+        self.logger.info(f'{self.__name__} - {self.action} - Account: {self.account_name}')
+        self.logger.info(f'{self.__name__} - {self.action} - Symbol: {self.symbol}')
+        self.logger.info(f'{self.__name__} - {self.action} - Quantity (Asset): {self.quantity_in_asset}')
+        self.logger.info(f'{self.__name__} - {self.action} - Last Price: {self.last_price}')
+        self.logger.info(f'{self.__name__} - {self.action} - Stop Price: {self.stop_price}')
+        self.logger.info(f'{self.__name__} - {self.action} - TP Price: {self.tp_price}')
+
+        get_health(self.__name__).check()
+
+        # A resting OCO means the last trade is still open, a recent reconciliation knows without asking
+        is_taken = await self.has_open_trade()
+        if is_taken is None:
+            is_taken = len((await self.exchange_state()).get('orders')) > 0
+        assert not is_taken, f'{self.__name__} - {self.action} - There is an open position, bailed out..'
+        assert self.atr[-1] > self.minimum_atr_value, f'{self.__name__} - {self.action} - ATR is too small'
+
+        # Fills are only heard of on the stream, it has to be up before the bracket goes out
+        if not await get_user_stream(self.binance_client).wait_ready():
+            self.logger.info(f'{self.__name__} - {self.action} - User data stream is down, the exit will be polled')
+
+        self.logger.info(f'{self.__name__} - {self.action} - Pre-entry passed, ready to trade')
 
     async def long_entry(self):
-        pass
+        async with self.entry_lock():
+            await self.pre_entry()
+            self.entry_order = await self.execute_entry(quantity=float(self.quantity_in_asset))
+        self.logger.info(f'{self.__name__} - {self.action} - Entry Order ID: {self.entry_order_id}')
+        self.logger.info(f'{self.__name__} - {self.action} - Sellable Qty: {self.entry_executed_qty}')
+
+        await self.long_exit()
 
     async def long_exit(self):
-        pass
+        profiling.mark('exit')
+        if self.tp_ladder:
+            self.logger.info(f'{self.__name__} - {self.action} - TP ladders are not supported on spot, using one TP')
+
+        try:
+            self.exit_order = await self.create_oco_order()
+        except BinanceAPIException as exc:
+            # Price already went through one of the legs, sell at market rather than hold unprotected
+            self.logger.error(f'{self.__name__} - {self.action} - OCO rejected ({exc}), selling at market')
+            order = await self.create_order(
+                tag='x', side=SIDE_SELL, type=ORDER_TYPE_MARKET, quantity=self.format_quantity(self.entry_executed_qty)
+            )
+            await self.report_exit(order)
+            return
+
+        self.logger.info(f'{self.__name__} - {self.action} - OCO Stop Order ID: {self.stop_order_id}')
+        self.logger.info(f'{self.__name__} - {self.action} - OCO TP Order ID: {self.exit_order_id}')
+
+        await self.post_exit()
 
     async def short_entry(self):
         raise NotImplementedError('Unable to short in spot trading')
 
     async def short_exit(self):
         raise NotImplementedError('Unable to short in spot trading')
+
+    async def execute_entry(self, quantity) -> dict:
+        profiling.mark('execute_entry')
+        if self.execution == 'market':
+            return self.aggregate_entry([await self.place_entry_child(quantity)])
+        return await super().execute_entry(quantity)
+
+    async def place_entry_child(self, quantity) -> dict:
+        # The full response lists the fills and the fee taken from each
+        return await self.create_order(
+            tag='e',
+            side=SIDE_BUY,
+            type=ORDER_TYPE_MARKET,
+            quantity=self.format_quantity(quantity),
+            newOrderRespType=ORDER_RESP_TYPE_FULL,
+        )
+
+    def child_fill(self, order: dict) -> dict:
+        quantity = float(order.get('executedQty'))
+        return {'quantity': quantity, 'price': float(order.get('cummulativeQuoteQty')) / quantity if quantity else 0.0}
+
+    def aggregate_entry(self, children: list) -> dict:
+        total = aggregate([self.child_fill(o) for o in children])
+        fee = sum(
+            float(fill.get('commission'))
+            for order in children
+            for fill in order.get('fills', list())
+            if fill.get('commissionAsset') == self.filters.get('base_asset')
+        )
+        average = self.format_price(total.get('price'))
+        return {
+            'orderId': children[0].get('orderId'),
+            'executedQty': self.format_quantity(total.get('quantity')),
+            'sellableQty': self.format_quantity(total.get('quantity') - fee),
+            'avgPrice': average,
+            'price': average,
+            'children': children,
+        }
+
+    def round_quantity(self, quantity: float) -> float:
+        return self.quantities.to_float(self.quantities.parse(quantity, ROUND_FLOOR))
+
+    async def market_volume(self) -> float | None:
+        klines = await self.binance_client.get_klines(symbol=self.symbol, interval=KLINE_INTERVAL_1MINUTE, limit=1)
+        if not klines:
+            return None
+        return float(klines[-1][5])
+
+    async def create_order(self, tag: str, **params) -> dict:
+        response_type = params.pop('newOrderRespType', ORDER_RESP_TYPE_RESULT)
+
+        async def create(client_id: str) -> dict:
+            return await self.binance_client.create_order(
+                symbol=self.symbol, newClientOrderId=client_id, newOrderRespType=response_type, **params
+            )
+
+        return await self.submit_order(tag=tag, create=create)
+
+    async def create_oco_order(self) -> dict:
+        """
+        Take profit limit and stop loss in one request, the legs are named after the list
+        """
+
+        async def create(client_id: str) -> dict:
+            return await self.binance_client.create_oco_order(
+                symbol=self.symbol,
+                listClientOrderId=client_id,
+                side=SIDE_SELL,
+                quantity=self.format_quantity(self.entry_executed_qty),
+                price=self.tp_price,
+                limitClientOrderId=f'{client_id}t',
+                stopPrice=self.stop_price,
+                stopClientOrderId=f'{client_id}s',
+                newOrderRespType=ORDER_RESP_TYPE_RESULT,
+            )
+
+        return await self.submit_order(tag='o', create=create, lookup=self.find_oco_order)
+
+    async def exchange_state(self) -> dict:
+        # Holding the asset says nothing about an open trade, only a resting OCO does
+        orders = await self.binance_client.get_open_orders(symbol=self.symbol)
+        return {'position': None, 'orders': [open_order(o.get('orderId'), o.get('clientOrderId')) for o in orders]}
+
+    async def find_order(self, client_id: str) -> dict | None:
+        try:
+            order = await self.binance_client.get_order(symbol=self.symbol, origClientOrderId=client_id)
+        except BinanceAPIException as exc:
+            if exc.code == ORDER_DOES_NOT_EXIST:
+                return None
+            raise exc
+
+        return order or None
+
+    async def find_oco_order(self, client_id: str) -> dict | None:
+        legs = [await self.find_order(f'{client_id}t'), await self.find_order(f'{client_id}s')]
+        if not all(legs):
+            return None
+        return {'orderListId': legs[0].get('orderListId'), 'listClientOrderId': client_id, 'orderReports': legs}
+
+    async def cancel_order(self, order_id: int):
+        await self.binance_client.cancel_order(symbol=self.symbol, orderId=order_id)
+
+    async def post_exit(self):
+        profiling.mark('monitor')
+        self.start_monitor('post_exit')
+        stream = get_user_stream(self.binance_client)
+        order_ids = [self.exit_order_id, self.stop_order_id]
+        while True:
+            order = await stream.wait_final(order_ids, timeout=USER_STREAM_POLL_INTERVAL)
+            if order:
+                break
+
+            # Nothing heard for a while, the stream may have missed it while reconnecting
+            self.logger.info(f'{self.__name__} - {self.action} - No exit on the user data stream, checking orders')
+            for order_id in order_ids:
+                stream.observe(await self.binance_client.get_order(symbol=self.symbol, orderId=order_id))
+
+        self.finish_monitor()
+        await self.report_exit(order)
+
+    async def report_exit(self, order: dict):
+        if order.get('status') != ORDER_STATUS_FILLED:
+            self.logger.error(f'{self.__name__} - {self.action} - Exit ended as {order.get("status")}, no fill')
+            await self.close_trade()
+            return
+
+        has_exited_stop = order.get('orderId') != self.exit_order_id
+        self.logger.info(f'{self.__name__} - {self.action} - Exit order filled, Has Exited Stop: {has_exited_stop}')
+
+        exit_price = float(order.get('cummulativeQuoteQty')) / float(order.get('executedQty'))
+        entry_price = float(self.entry_order.get('avgPrice'))
+        pnl_percent = (exit_price - entry_price) / entry_price * 100
+        self.record_exit(pnl_percent=pnl_percent, exit_price=exit_price)
+
+        await send_exit_message(
+            action=self.action.value,
+            trader=self,
+            quantity=str(self.quantity),
+            entry_price=str(self.entry_price),
+            stop_price=self.stop_price,
+            tp_price=self.tp_price,
+            pnl=self.format_number(pnl_percent, precision=2),
+        )
+
+        await self.close_trade()
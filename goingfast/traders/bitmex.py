@@ -1,7 +1,10 @@
+from goingfast import profiling
 from goingfast.traders.base import BaseTrader, Actions
+from goingfast.traders.orderids import UNKNOWN_OUTCOME
+from goingfast.traders.ratelimit import Priority
 from logging import Logger
 from os import environ
-from decimal import Decimal
+import ccxt
 import ujson
 
 LEVERAGE = int(environ.get('LEVERAGE'))
@@ -12,16 +15,19 @@ class BitmexTrader(BaseTrader):
     symbol = 'XBTUSD'
     normalized_symbol = 'XBT/USD'
 
-    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None):
-        super().__init__(action, quantity, logger, metadata)
+    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None, account=None):
+        super().__init__(action, quantity, logger, metadata, account)
 
-        self.leverage = LEVERAGE
+        self.leverage = self.account_leverage(LEVERAGE)
 
     async def pre_entry(self):
+        profiling.mark('pre_entry')
         self.logger.debug('Got long entry command')
 
         self.logger.debug('Checking if there is a running position')
-        has_position = await self.has_position()
+        has_position = await self.has_open_trade(with_orders=False)
+        if has_position is None:
+            has_position = await self.has_position()
         if has_position:
             self.logger.info('There is a running position, bailing..')
             raise AssertionError('Can only trade if there is no running position')
@@ -32,73 +38,101 @@ class BitmexTrader(BaseTrader):
         await self.set_leverage(leverage=self.leverage)
 
     async def long_entry(self):
-        await self.pre_entry()
+        async with self.entry_lock():
+            await self.pre_entry()
 
-        self.logger.debug('Going to market buy to bybit')
-        self.entry_order = await self.market_buy_order(quantity=self.quantity)
-        self.logger.info(f'Successfully bought {self.quantity} contracts with order id: {self.entry_order.get("id")}')
+            self.logger.debug('Going to market buy to bybit')
+            self.entry_order = await self.execute_entry(quantity=self.quantity)
+        self.logger.info(
+            f'Successfully bought {self.entry_filled_quantity} contracts with order id: {self.entry_order.get("id")}'
+        )
 
         self.client.verbose = True
 
         await self.long_exit()
 
     async def long_exit(self):
+        profiling.mark('exit')
         self.logger.debug('Got exit from long entry command')
 
-        self.logger.debug('Going to send limit sell order')
-        self.exit_order = await self.limit_sell_order(amount=self.quantity, price=self.tp_price)
-        self.logger.info(
-            f'Sucessfully sent limit sell order for {self.quantity} contracts '
-            + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
-        )
+        if self.tp_ladder:
+            await self.place_tp_ladder(stop_price=self.stop_limit_trigger_price)
+        else:
+            self.logger.debug('Going to send limit sell order')
+            self.exit_order = await self.limit_sell_order(amount=self.entry_filled_quantity, price=self.tp_price)
+            self.logger.info(
+                f'Sucessfully sent limit sell order for {self.entry_filled_quantity} contracts '
+                + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
+            )
 
         self.logger.debug('Going to send stop limit sell order')
         self.exit_stop_limit_order = await self.limit_stop_sell_order(
-            amount=self.quantity,
-            stop_price=self.format_number(number=self.stop_limit_trigger_price, precision=0),
+            amount=self.entry_filled_quantity,
+            stop_price=self.stop_limit_trigger_price,
             stop_action_price=self.stop_limit_price,
         )
         self.logger.info(
-            f'Successfully sent limit stop sell order for {self.quantity} contracts at trigger '
+            f'Successfully sent limit stop sell order for {self.entry_filled_quantity} contracts at trigger '
             + f'{self.stop_limit_trigger_price} selling at {self.stop_limit_price}'
         )
 
+        self.start_trailing_stop(stop_price=self.stop_limit_trigger_price)
+        if self.tp_legs:
+            self.spawn_monitor(self.monitor_tp_ladder())
+        elif self.trailing_stop:
+            self.spawn_monitor(self.monitor_trailing_stop())
+
     async def short_entry(self):
-        await self.pre_entry()
+        async with self.entry_lock():
+            await self.pre_entry()
 
-        self.logger.debug('Going to market sell to bybit')
-        self.entry_order = await self.market_sell_order(quantity=self.quantity)
-        self.logger.info(f'Successfully sold {self.quantity} contracts with order id: {self.entry_order.get("id")}')
+            self.logger.debug('Going to market sell to bybit')
+            self.entry_order = await self.execute_entry(quantity=self.quantity)
+        self.logger.info(
+            f'Successfully sold {self.entry_filled_quantity} contracts with order id: {self.entry_order.get("id")}'
+        )
 
         await self.short_exit()
 
     async def short_exit(self):
+        profiling.mark('exit')
         self.logger.debug('Got exit from short entry command')
 
-        self.logger.debug('Going to send limit buy order')
-        self.exit_order = await self.limit_buy_order(amount=self.quantity, price=str(self.tp_price))
-        self.logger.info(
-            f'Sucessfully sent limit buy order for {self.quantity} contracts '
-            + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
-        )
+        if self.tp_ladder:
+            await self.place_tp_ladder(stop_price=self.stop_limit_trigger_price)
+        else:
+            self.logger.debug('Going to send limit buy order')
+            self.exit_order = await self.limit_buy_order(amount=self.entry_filled_quantity, price=self.tp_price)
+            self.logger.info(
+                f'Sucessfully sent limit buy order for {self.entry_filled_quantity} contracts '
+                + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
+            )
 
         self.logger.debug('Going to send stop limit buy order')
         self.exit_stop_limit_order = await self.limit_stop_buy_order(
-            amount=self.quantity, stop_price=self.stop_limit_trigger_price, stop_action_price=self.stop_limit_price
+            amount=self.entry_filled_quantity,
+            stop_price=self.stop_limit_trigger_price,
+            stop_action_price=self.stop_limit_price,
         )
         self.logger.info(
-            f'Successfully sent limit buy sell order for {self.quantity} contracts at trigger '
+            f'Successfully sent limit buy sell order for {self.entry_filled_quantity} contracts at trigger '
             + f'{self.stop_limit_trigger_price} selling at {self.stop_limit_price}'
         )
 
+        self.start_trailing_stop(stop_price=self.stop_limit_trigger_price)
+        if self.tp_legs:
+            self.spawn_monitor(self.monitor_tp_ladder())
+        elif self.trailing_stop:
+            self.spawn_monitor(self.monitor_trailing_stop())
+
     async def set_leverage(self, leverage: int):
         post_name = 'privatePostPositionLeverage'
 
         # Set Leverage
         self.logger.debug(f'Setting leverage to {self.leverage}x')
         method = getattr(self.client, post_name)
-        response = method(params={'symbol': self.symbol, 'leverage': leverage})
-        if response.get('ret_code') != 0 or response.get('ret_msg') != 'ok':
+        response = await self.call(Priority.ORDER, method, params={'symbol': self.symbol, 'leverage': leverage})
+        if int(response.get('leverage', 0)) != leverage:
             raise AssertionError('Got error message while setting leverage')
 
         return response
@@ -107,17 +141,24 @@ class BitmexTrader(BaseTrader):
         method_name = 'privatePostOrder'
 
         method = getattr(self.client, method_name)
-        order = method(
-            params={
-                'side': side,
-                'symbol': self.symbol,
-                'ordType': 'Limit',
-                'orderQty': str(amount),
-                'price': str(price),
-                'timeInForce': 'GoodTillCancel',
-                'execInst': 'ReduceOnly' if reduce_only else 'LastPrice',
-            }
-        )
+
+        async def create(client_id: str) -> dict:
+            return await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'side': side,
+                    'symbol': self.symbol,
+                    'ordType': 'Limit',
+                    'orderQty': str(amount),
+                    'price': str(price),
+                    'timeInForce': 'GoodTillCancel',
+                    'execInst': 'ReduceOnly' if reduce_only else 'LastPrice',
+                    'clOrdID': client_id,
+                },
+            )
+
+        order = await self.submit_order(tag='l', create=create)
         order.update({'id': order.get('orderID')})
 
         return order
@@ -132,18 +173,25 @@ class BitmexTrader(BaseTrader):
         method_name = 'privatePostOrder'
 
         method = getattr(self.client, method_name)
-        order = method(
-            params={
-                'side': side,
-                'symbol': self.symbol,
-                'ordType': 'StopLimit',
-                'orderQty': str(amount),
-                'price': str(price),
-                'stopPx': stop_price,
-                'timeInForce': 'GoodTillCancel',
-                'execInst': 'ReduceOnly',
-            }
-        )
+
+        async def create(client_id: str) -> dict:
+            return await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'side': side,
+                    'symbol': self.symbol,
+                    'ordType': 'StopLimit',
+                    'orderQty': str(amount),
+                    'price': str(price),
+                    'stopPx': stop_price,
+                    'timeInForce': 'GoodTillCancel',
+                    'execInst': 'ReduceOnly',
+                    'clOrdID': client_id,
+                },
+            )
+
+        order = await self.submit_order(tag='s', create=create)
         order.update({'id': order.get('orderID')})
 
         return order
@@ -158,17 +206,24 @@ class BitmexTrader(BaseTrader):
         method_name = 'privatePostOrder'
 
         method = getattr(self.client, method_name)
-        order = method(
-            params={
-                'side': side,
-                'symbol': self.symbol,
-                'ordType': 'Stop',
-                'orderQty': str(amount),
-                'stopPx': stop_price,
-                'timeInForce': 'GoodTillCancel',
-                'execInst': 'ReduceOnly',
-            }
-        )
+
+        async def create(client_id: str) -> dict:
+            return await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'side': side,
+                    'symbol': self.symbol,
+                    'ordType': 'Stop',
+                    'orderQty': str(amount),
+                    'stopPx': stop_price,
+                    'timeInForce': 'GoodTillCancel',
+                    'execInst': 'ReduceOnly',
+                    'clOrdID': client_id,
+                },
+            )
+
+        order = await self.submit_order(tag='m', create=create)
         order.update({'id': order.get('orderID')})
 
         return order
@@ -179,40 +234,88 @@ class BitmexTrader(BaseTrader):
     async def market_stop_sell_order(self, quantity, stop_price):
         return await self.market_stop_order(side='Sell', amount=quantity, stop_price=stop_price)
 
-    async def trailing_stop(self, side, trail_by, quantity):
-        method_name = 'privatePostOrder'
-        trail_by = Decimal(trail_by) if side == 'Sell' else Decimal(-1) * Decimal(trail_by)
+    async def amend_stop(self, stop_price: float) -> bool:
+        method_name = 'privatePutOrder'
 
+        # Keep the same distance between trigger and limit price as the original stop limit
+        offset = self.stop_trigger_ticks - self.stop_limit_ticks
+        stop_ticks = self.prices.parse(stop_price)
         method = getattr(self.client, method_name)
-        order = method(
-            params={
+        try:
+            await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'orderID': self.exit_stop_limit_order.get('id'),
+                    'stopPx': self.prices.format(stop_ticks),
+                    'price': self.prices.format(stop_ticks - offset),
+                },
+            )
+        except (ccxt.OrderNotFound, ccxt.InvalidOrder):
+            return False
+
+        return True
+
+    async def place_tp_legs(self, legs: list):
+        method_name = 'privatePostOrderBulk'
+
+        side = 'Sell' if self.action == Actions.LONG else 'Buy'
+        orders = [
+            {
                 'side': side,
                 'symbol': self.symbol,
-                'ordType': 'MarketIfTouched',
-                'pegPriceType': 'TrailingStopPeg',
-                'pegOffsetValue': trail_by,
-                'orderQty': quantity,
-                'execInst': 'LastPrice',
+                'ordType': 'Limit',
+                'orderQty': str(leg.get('quantity')),
+                'price': str(leg.get('price')),
+                'timeInForce': 'GoodTillCancel',
+                'execInst': 'ReduceOnly',
+                'clOrdID': self.client_order_id('t'),
             }
-        )
-        order.update({'id': order.get('orderID')})
+            for leg in legs
+        ]
+        method = getattr(self.client, method_name)
+        try:
+            response = await self.call(Priority.ORDER, method, params={'orders': ujson.dumps(orders)})
+        except UNKNOWN_OUTCOME as exc:
+            # Keep the legs that made it and send the others one by one
+            self.logger.info(f'{self.__name__} - {self.action} - Bulk TP outcome unknown ({exc!r}), checking legs')
+            response = list()
+            for order in orders:
+                found = await self.find_order(order.get('clOrdID'))
+                if not found:
+                    found = await self.call(Priority.ORDER, getattr(self.client, 'privatePostOrder'), params=order)
+                response.append(found)
+        for leg, order in zip(legs, response):
+            leg['order_id'] = order.get('orderID')
+
+    async def amend_stop_quantity(self, quantity) -> bool:
+        method_name = 'privatePutOrder'
+        method = getattr(self.client, method_name)
+        try:
+            params = {'orderID': self.exit_stop_limit_order.get('id'), 'orderQty': str(quantity)}
+            await self.call(Priority.ORDER, method, params=params)
+        except (ccxt.OrderNotFound, ccxt.InvalidOrder):
+            return False
 
-        return order
+        return True
 
-    async def trailing_stop_buy(self, trail_by, quantity):
-        return await self.trailing_stop(side='Buy', trail_by=trail_by, quantity=quantity)
+    async def find_order(self, client_id: str) -> dict | None:
+        method_name = 'privateGetOrder'
+        method = getattr(self.client, method_name)
+        params = {'symbol': self.symbol, 'filter': ujson.dumps({'clOrdID': client_id})}
+        response = await self.call(Priority.ORDER, method, params=params)
 
-    async def trailing_stop_sell(self, trail_by, quantity):
-        return await self.trailing_stop(side='Sell', trail_by=trail_by, quantity=quantity)
+        return response[0] if response else None
 
     async def has_position(self):
         method_name = 'privateGetPosition'
         method = getattr(self.client, method_name)
-        response = method(params={'filter': ujson.dumps({'filter': self.symbol})})
+        params = {'filter': ujson.dumps({'symbol': self.symbol})}
+        response = await self.call(Priority.MONITOR, method, params=params)
 
-        return len(response) == 0
+        return any(p.get('currentQty') for p in response)
 
     async def cancel_all_orders(self):
         method_name = 'privateDeleteOrderAll'
         method = getattr(self.client, method_name)
-        method(params={'symbol': self.symbol})
+        await self.call(Priority.ORDER, method, params={'symbol': self.symbol})
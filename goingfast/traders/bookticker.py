@@ -0,0 +1,149 @@
+"""
+Best bid/ask cache fed by Binance `bookTicker` streams.
+
+The market data hub keeps the top of book of every symbol in memory, waiters are woken on every change so engines
+reacting to the book never touch REST. Venues the bot only reaches through ccxt get the same cache fed by polling.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Dict
+
+import ccxt
+from sanic.log import logger
+
+from goingfast.traders.health import record
+from goingfast.traders.marketdata import get_hub
+from goingfast.traders.ratelimit import Priority, get_scheduler
+
+BOOK_TICKER_POLL_INTERVAL = float(environ.get('BOOK_TICKER_POLL_INTERVAL', '1'))
+
+
+class BookTicker:
+    def __init__(self, symbol: str, market: str = 'binance-futures'):
+        self.symbol = symbol.upper()
+        self.market = market
+        self.bid = None
+        self.bid_qty = None
+        self.ask = None
+        self.ask_qty = None
+        self.updated_at = 0.0
+
+        self.changed = asyncio.Event()
+        self.subscribed = False
+
+    @property
+    def is_ready(self) -> bool:
+        return self.bid is not None and self.ask is not None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at
+
+    def to_dict(self) -> dict:
+        return {
+            'symbol': self.symbol,
+            'bid': self.bid,
+            'ask': self.ask,
+            'age': round(self.age, 1) if self.is_ready else None,
+        }
+
+    def on_message(self, data: dict):
+        self.update(
+            bid=float(data.get('b')),
+            ask=float(data.get('a')),
+            bid_qty=float(data.get('B')),
+            ask_qty=float(data.get('A')),
+        )
+
+    def update(self, bid: float, ask: float, bid_qty: float, ask_qty: float):
+        self.bid_qty, self.ask_qty = bid_qty, ask_qty
+        self.updated_at = time.monotonic()
+
+        if bid != self.bid or ask != self.ask:
+            self.bid, self.ask = bid, ask
+            # Wake everyone waiting on the previous state
+            self.changed.set()
+            self.changed = asyncio.Event()
+
+    async def wait_change(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def wait_ready(self, timeout: float = 5) -> bool:
+        self.start()
+        deadline = time.monotonic() + timeout
+        while not self.is_ready:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await self.wait_change(timeout=remaining)
+        return True
+
+    def start(self):
+        if not self.subscribed:
+            get_hub(self.market).subscribe(f'{self.symbol.lower()}@bookTicker', self.on_message)
+            self.subscribed = True
+
+
+class CcxtBookTicker(BookTicker):
+    """
+    Polls the public ticker in an executor, the poll's round trip and errors feed the exchange's health
+    """
+
+    def __init__(self, symbol: str, exchange: str, interval: float = BOOK_TICKER_POLL_INTERVAL):
+        super().__init__(symbol)
+        self.symbol = symbol
+        self.exchange = exchange
+        self.client = getattr(ccxt, exchange)({'enableRateLimit': True})
+        self.interval = interval
+        self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        scheduler = get_scheduler(self.exchange)
+        while True:
+            await scheduler.acquire(Priority.INFO, {'rest': 1})
+            started = time.monotonic()
+            try:
+                ticker = await loop.run_in_executor(None, self.client.fetch_ticker, self.symbol)
+                record(self.exchange, 'info', ok=True, latency=time.monotonic() - started)
+                self.update(
+                    bid=float(ticker.get('bid')),
+                    ask=float(ticker.get('ask')),
+                    bid_qty=float(ticker.get('bidVolume') or 0),
+                    ask_qty=float(ticker.get('askVolume') or 0),
+                )
+            except (ccxt.BaseError, TypeError) as exc:
+                record(self.exchange, 'info', ok=False, latency=time.monotonic() - started, error=str(exc))
+                logger.info(f'Book ticker poll for {self.exchange} {self.symbol} failed: {exc}')
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+
+_tickers: Dict[str, BookTicker] = dict()
+
+
+def get_book_ticker(symbol: str, market: str = 'binance-futures') -> BookTicker:
+    symbol = symbol.upper()
+    key = symbol if market == 'binance-futures' else f'{market}:{symbol}'
+    if key not in _tickers:
+        _tickers[key] = BookTicker(symbol=symbol, market=market)
+    return _tickers[key]
+
+
+def get_ccxt_book_ticker(exchange: str, symbol: str) -> BookTicker:
+    key = f'{exchange}:{symbol}'
+    if key not in _tickers:
+        _tickers[key] = CcxtBookTicker(symbol=symbol, exchange=exchange)
+    return _tickers[key]
+
+
+def snapshot() -> Dict[str, dict]:
+    return {key: ticker.to_dict() for key, ticker in sorted(_tickers.items())}
@@ -1,7 +1,9 @@
+from goingfast import profiling
 from goingfast.traders.base import BaseTrader, Actions
+from goingfast.traders.ratelimit import Priority
 from logging import Logger
 from os import environ
-from decimal import Decimal
+import ccxt
 
 LEVERAGE = int(environ.get('LEVERAGE'))
 
@@ -11,30 +13,19 @@ class BybitTrader(BaseTrader):
     symbol = 'BTCUSD'
     normalized_symbol = 'BTC/USD'
 
-    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None):
-        super().__init__(action, quantity, logger, metadata)
+    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None, account=None):
+        super().__init__(action, quantity, logger, metadata, account)
 
-        self.leverage = LEVERAGE
-
-    @property
-    def trailing_stop_trigger_price(self):
-        if self.metadata and self.metadata.get('trailing_stop_trigger_price'):
-            return Decimal(self.metadata.get('trailing_stop_trigger_price'))
-
-        return self.entry_price + self.tp_delta
-
-    @property
-    def trailing_stop_by(self):
-        if self.metadata and self.metadata.get('trailing_stop_by'):
-            return Decimal(self.metadata.get('trailing_stop_by'))
-
-        return None
+        self.leverage = self.account_leverage(LEVERAGE)
 
     async def pre_entry(self):
+        profiling.mark('pre_entry')
         self.logger.debug('Got long entry command')
 
         self.logger.debug('Checking if there is a running position')
-        has_position = await self.has_position()
+        has_position = await self.has_open_trade(with_orders=False)
+        if has_position is None:
+            has_position = await self.has_position()
         if has_position:
             self.logger.info('There is a running position, bailing..')
             raise AssertionError('Can only trade if there is no running position')
@@ -48,76 +39,92 @@ class BybitTrader(BaseTrader):
         await self.set_leverage(leverage=self.leverage)
 
     async def long_entry(self):
-        await self.pre_entry()
+        async with self.entry_lock():
+            await self.pre_entry()
 
-        self.logger.debug('Going to market buy to bybit')
-        self.entry_order = await self.market_buy_order(quantity=self.quantity)
-        self.logger.info(f'Successfully bought {self.quantity} contracts with order id: {self.entry_order.get("id")}')
+            self.logger.debug('Going to market buy to bybit')
+            self.entry_order = await self.execute_entry(quantity=self.quantity)
+        self.logger.info(
+            f'Successfully bought {self.entry_filled_quantity} contracts with order id: {self.entry_order.get("id")}'
+        )
 
         self.client.verbose = True
 
         await self.long_exit()
 
     async def long_exit(self):
+        profiling.mark('exit')
         self.logger.debug('Got exit from long entry command')
 
-        self.logger.debug('Going to send limit sell order')
-        self.exit_order = await self.limit_sell_order(amount=self.quantity, price=self.tp_price)
-        self.logger.info(
-            f'Sucessfully sent limit sell order for {self.quantity} contracts '
-            + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
-        )
+        if self.tp_ladder:
+            await self.place_tp_ladder(stop_price=self.stop_limit_trigger_price)
+        else:
+            self.logger.debug('Going to send limit sell order')
+            self.exit_order = await self.limit_sell_order(amount=self.entry_filled_quantity, price=self.tp_price)
+            self.logger.info(
+                f'Sucessfully sent limit sell order for {self.entry_filled_quantity} contracts '
+                + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
+            )
 
         self.logger.debug('Going to send stop limit sell order')
         self.exit_stop_limit_order = await self.limit_stop_sell_order(
-            amount=self.quantity,
-            stop_price=self.format_number(number=self.stop_limit_trigger_price, precision=0),
+            amount=self.entry_filled_quantity,
+            stop_price=self.stop_limit_trigger_price,
             stop_action_price=self.stop_limit_price,
         )
         self.logger.info(
-            f'Successfully sent limit stop sell order for {self.quantity} contracts at trigger '
+            f'Successfully sent limit stop sell order for {self.entry_filled_quantity} contracts at trigger '
             + f'{self.stop_limit_trigger_price} selling at {self.stop_limit_price}'
         )
 
-        use_trailing_stop = self.trailing_stop_by is not None
-        if use_trailing_stop:
-            self.logger.info('Trailing stop variables are set, going to send trailing stop order')
-            await self.trailing_stop(trail_by=self.trailing_stop_by, activation_price=self.trailing_stop_trigger_price)
-            self.logger.debug('Trailing stop order sent')
+        self.start_trailing_stop(stop_price=self.stop_limit_trigger_price)
+        if self.tp_legs:
+            self.spawn_monitor(self.monitor_tp_ladder())
+        elif self.trailing_stop:
+            self.spawn_monitor(self.monitor_trailing_stop())
 
     async def short_entry(self):
-        await self.pre_entry()
+        async with self.entry_lock():
+            await self.pre_entry()
 
-        self.logger.debug('Going to market sell to bybit')
-        self.entry_order = await self.market_sell_order(quantity=self.quantity)
-        self.logger.info(f'Successfully sold {self.quantity} contracts with order id: {self.entry_order.get("id")}')
+            self.logger.debug('Going to market sell to bybit')
+            self.entry_order = await self.execute_entry(quantity=self.quantity)
+        self.logger.info(
+            f'Successfully sold {self.entry_filled_quantity} contracts with order id: {self.entry_order.get("id")}'
+        )
 
         await self.short_exit()
 
     async def short_exit(self):
+        profiling.mark('exit')
         self.logger.debug('Got exit from short entry command')
 
-        self.logger.debug('Going to send limit buy order')
-        self.exit_order = await self.limit_buy_order(amount=self.quantity, price=str(self.tp_price))
-        self.logger.info(
-            f'Sucessfully sent limit buy order for {self.quantity} contracts '
-            + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
-        )
+        if self.tp_ladder:
+            await self.place_tp_ladder(stop_price=self.stop_limit_trigger_price)
+        else:
+            self.logger.debug('Going to send limit buy order')
+            self.exit_order = await self.limit_buy_order(amount=self.entry_filled_quantity, price=self.tp_price)
+            self.logger.info(
+                f'Sucessfully sent limit buy order for {self.entry_filled_quantity} contracts '
+                + f'at {self.tp_price} with order id: {self.exit_order.get("id")}'
+            )
 
         self.logger.debug('Going to send stop limit buy order')
         self.exit_stop_limit_order = await self.limit_stop_buy_order(
-            amount=self.quantity, stop_price=self.stop_limit_trigger_price, stop_action_price=self.stop_limit_price
+            amount=self.entry_filled_quantity,
+            stop_price=self.stop_limit_trigger_price,
+            stop_action_price=self.stop_limit_price,
         )
         self.logger.info(
-            f'Successfully sent limit buy sell order for {self.quantity} contracts at trigger '
+            f'Successfully sent limit buy sell order for {self.entry_filled_quantity} contracts at trigger '
             + f'{self.stop_limit_trigger_price} selling at {self.stop_limit_price}'
         )
 
-        use_trailing_stop = self.trailing_stop_by is not None
-        if use_trailing_stop:
-            self.logger.info('Trailing stop variables are set, going to send trailing stop order')
-            await self.trailing_stop(trail_by=self.trailing_stop_by, activation_price=self.trailing_stop_trigger_price)
-            self.logger.debug('Trailing stop order sent')
+        self.start_trailing_stop(stop_price=self.stop_limit_trigger_price)
+        if self.tp_legs:
+            self.spawn_monitor(self.monitor_tp_ladder())
+        elif self.trailing_stop:
+            self.spawn_monitor(self.monitor_trailing_stop())
 
     async def set_leverage(self, leverage: int):
         post_name = 'userPostLeverageSave'
@@ -126,7 +133,7 @@ class BybitTrader(BaseTrader):
         # Get Leverage
         self.logger.debug('Checking current leverage')
         method = getattr(self.client, get_name)
-        response = method()
+        response = await self.call(Priority.ORDER, method)
         if int(response.get('result').get(self.symbol).get('leverage')) == leverage:
             self.logger.debug(f'Current leverage is just as configured: {self.leverage}x')
             return response
@@ -134,7 +141,7 @@ class BybitTrader(BaseTrader):
         # Set Leverage
         self.logger.debug(f'Setting leverage to {self.leverage}x')
         method = getattr(self.client, post_name)
-        response = method(params={'symbol': self.symbol, 'leverage': leverage})
+        response = await self.call(Priority.ORDER, method, params={'symbol': self.symbol, 'leverage': leverage})
         if response.get('ret_code') != 0 or response.get('ret_msg') != 'ok':
             raise AssertionError('Got error message while setting leverage')
 
@@ -144,18 +151,26 @@ class BybitTrader(BaseTrader):
         method_name = 'privatePostOrderCreate'
 
         method = getattr(self.client, method_name)
-        order = method(
-            params={
-                'side': side,
-                'symbol': self.symbol,
-                'order_type': 'Limit',
-                'qty': str(amount),
-                'price': str(price),
-                'time_in_force': 'GoodTillCancel',
-                'reduce_only': reduce_only,
-            }
-        )
-        order.update({'id': order.get('result').get('stop_order_id'), 'price': order.get('result').get('price')})
+
+        async def create(client_id: str) -> dict:
+            response = await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'side': side,
+                    'symbol': self.symbol,
+                    'order_type': 'Limit',
+                    'qty': str(amount),
+                    'price': str(price),
+                    'time_in_force': 'GoodTillCancel',
+                    'reduce_only': reduce_only,
+                    'order_link_id': client_id,
+                },
+            )
+            return response.get('result')
+
+        order = await self.submit_order(tag='l', create=create)
+        order.update({'id': order.get('order_id')})
 
         return order
 
@@ -169,20 +184,28 @@ class BybitTrader(BaseTrader):
         method_name = 'openapiPostStopOrderCreate'
 
         method = getattr(self.client, method_name)
-        order = method(
-            params={
-                'side': side,
-                'symbol': self.symbol,
-                'order_type': 'Limit',
-                'qty': str(amount),
-                'price': str(price),
-                'stop_px': str(stop_price),
-                'base_price': str(self.entry_price),
-                'close_on_trigger': True,
-                'time_in_force': 'GoodTillCancel',
-            }
-        )
-        order.update({'id': order.get('result').get('stop_order_id'), 'price': order.get('result').get('price')})
+
+        async def create(client_id: str) -> dict:
+            response = await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'side': side,
+                    'symbol': self.symbol,
+                    'order_type': 'Limit',
+                    'qty': str(amount),
+                    'price': str(price),
+                    'stop_px': str(stop_price),
+                    'base_price': str(self.entry_price),
+                    'close_on_trigger': True,
+                    'time_in_force': 'GoodTillCancel',
+                    'order_link_id': client_id,
+                },
+            )
+            return response.get('result')
+
+        order = await self.submit_order(tag='s', create=create, lookup=self.find_stop_order)
+        order.update({'id': order.get('stop_order_id')})
 
         return order
 
@@ -192,19 +215,75 @@ class BybitTrader(BaseTrader):
     async def limit_stop_buy_order(self, amount, stop_price, stop_action_price):
         return await self.limit_stop_order(side='Buy', amount=amount, stop_price=stop_price, price=stop_action_price)
 
-    async def trailing_stop(self, trail_by, activation_price):
-        method_name = 'privateLinear_post_position_trading_stop'
+    async def amend_stop(self, stop_price: float) -> bool:
+        method_name = 'privatePostStopOrderReplace'
+
+        # Keep the same distance between trigger and limit price as the original stop limit
+        offset = self.stop_trigger_ticks - self.stop_limit_ticks
+        stop_ticks = self.prices.parse(stop_price)
         method = getattr(self.client, method_name)
-        order = method(
-            params={'symbol': self.symbol, 'trailing_stop': trail_by, 'new_trailing_active': activation_price}
-        )
+        try:
+            await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'symbol': self.symbol,
+                    'stop_order_id': self.exit_stop_limit_order.get('id'),
+                    'p_r_trigger_price': self.prices.format(stop_ticks),
+                    'p_r_price': self.prices.format(stop_ticks - offset),
+                },
+            )
+        except (ccxt.OrderNotFound, ccxt.InvalidOrder):
+            return False
 
-        return order
+        return True
+
+    async def amend_stop_quantity(self, quantity) -> bool:
+        method_name = 'privatePostStopOrderReplace'
+        method = getattr(self.client, method_name)
+        try:
+            await self.call(
+                Priority.ORDER,
+                method,
+                params={
+                    'symbol': self.symbol,
+                    'stop_order_id': self.exit_stop_limit_order.get('id'),
+                    'p_r_qty': str(quantity),
+                },
+            )
+        except (ccxt.OrderNotFound, ccxt.InvalidOrder):
+            return False
+
+        return True
+
+    async def find_order(self, client_id: str) -> dict | None:
+        method_name = 'privateGetOrder'
+        method = getattr(self.client, method_name)
+        try:
+            response = await self.call(
+                Priority.ORDER, method, params={'symbol': self.symbol, 'order_link_id': client_id}
+            )
+        except ccxt.OrderNotFound:
+            return None
+
+        return response.get('result') or None
+
+    async def find_stop_order(self, client_id: str) -> dict | None:
+        method_name = 'privateGetStopOrder'
+        method = getattr(self.client, method_name)
+        try:
+            response = await self.call(
+                Priority.ORDER, method, params={'symbol': self.symbol, 'order_link_id': client_id}
+            )
+        except ccxt.OrderNotFound:
+            return None
+
+        return response.get('result') or None
 
     async def has_position(self):
         method_name = 'private_get_position_list'
         method = getattr(self.client, method_name)
-        response = method(params={'symbol': self.symbol})
+        response = await self.call(Priority.MONITOR, method, params={'symbol': self.symbol})
         position_info = response.get('result')
         if not position_info:
             return False
@@ -216,9 +295,9 @@ class BybitTrader(BaseTrader):
     async def cancel_all_stop_orders(self):
         method_name = 'privatePostStopOrderCancelAll'
         method = getattr(self.client, method_name)
-        method(params={'symbol': self.symbol})
+        await self.call(Priority.ORDER, method, params={'symbol': self.symbol})
 
     async def cancel_all_orders(self):
         method_name = 'privatePostOrderCancelAll'
         method = getattr(self.client, method_name)
-        method(params={'symbol': self.symbol})
+        await self.call(Priority.ORDER, method, params={'symbol': self.symbol})
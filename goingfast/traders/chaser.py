@@ -0,0 +1,153 @@
+"""
+Post-only limit entries that chase the touch.
+
+The entry rests as a maker-only (`GTX`) limit order at the best bid for longs or best ask for shorts. Every book
+change from the local `BookTicker` re-prices the order, until it fills, the touch runs further than
+`ENTRY_CHASE_MAX_BPS` from where the chase started, or `ENTRY_CHASE_TIMEOUT` passes. Whatever is left then goes out
+as a market order.
+"""
+import time
+from os import environ
+from typing import Awaitable, Callable, List
+
+from binance.enums import FUTURE_ORDER_TYPE_LIMIT, FUTURE_ORDER_TYPE_MARKET, SIDE_BUY
+from binance.exceptions import BinanceAPIException
+
+from goingfast.traders.bookticker import BookTicker
+
+ENTRY_CHASE_MAX_BPS = float(environ.get('ENTRY_CHASE_MAX_BPS', '10'))
+ENTRY_CHASE_TIMEOUT = float(environ.get('ENTRY_CHASE_TIMEOUT', '10'))
+ENTRY_CHASE_MIN_INTERVAL = float(environ.get('ENTRY_CHASE_MIN_INTERVAL', '0.1'))
+ENTRY_CHASE_POLL_INTERVAL = float(environ.get('ENTRY_CHASE_POLL_INTERVAL', '1'))
+
+TIME_IN_FORCE_GTX = 'GTX'
+FINAL_STATUSES = ['FILLED', 'CANCELED', 'EXPIRED', 'REJECTED']
+
+
+class PostOnlyChaser:
+    def __init__(
+        self,
+        binance_client,
+        create_order: Callable[..., Awaitable[dict]],
+        ticker: BookTicker,
+        symbol: str,
+        side: str,
+        price_precision: int,
+        qty_precision: int,
+        logger,
+        max_bps: float = ENTRY_CHASE_MAX_BPS,
+        timeout: float = ENTRY_CHASE_TIMEOUT,
+        min_interval: float = ENTRY_CHASE_MIN_INTERVAL,
+        poll_interval: float = ENTRY_CHASE_POLL_INTERVAL,
+    ):
+        self.binance_client = binance_client
+        self.create_order = create_order
+        self.ticker = ticker
+        self.symbol = symbol
+        self.side = side
+        self.price_precision = price_precision
+        self.qty_precision = qty_precision
+        self.logger = logger
+        self.max_bps = max_bps
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.poll_interval = poll_interval
+
+        self.children: List[dict] = list()
+
+    @property
+    def is_buy(self) -> bool:
+        return self.side == SIDE_BUY
+
+    @property
+    def touch(self) -> float:
+        return self.ticker.bid if self.is_buy else self.ticker.ask
+
+    def format(self, number: float, precision: int) -> str:
+        return '{:0.0{}f}'.format(number, precision)
+
+    def within_chase(self, price: float, start: float) -> bool:
+        moved_bps = (price - start) / start * 10000
+        return (moved_bps if self.is_buy else -moved_bps) <= self.max_bps
+
+    def filled(self) -> float:
+        return sum(float(o.get('executedQty')) for o in self.children)
+
+    async def place(self, quantity: float, price: float) -> dict:
+        return await self.create_order(
+            tag='c',
+            side=self.side,
+            type=FUTURE_ORDER_TYPE_LIMIT,
+            timeInForce=TIME_IN_FORCE_GTX,
+            quantity=self.format(quantity, self.qty_precision),
+            price=self.format(price, self.price_precision),
+        )
+
+    async def cancel(self, order: dict) -> dict:
+        try:
+            return await self.binance_client.futures_cancel_order(symbol=self.symbol, orderId=order.get('orderId'))
+        except BinanceAPIException:
+            # Filled in the meantime, the order is final either way
+            return await self.binance_client.futures_get_order(symbol=self.symbol, orderId=order.get('orderId'))
+
+    async def market(self, quantity: float) -> dict:
+        return await self.create_order(
+            tag='e', side=self.side, type=FUTURE_ORDER_TYPE_MARKET, quantity=self.format(quantity, self.qty_precision)
+        )
+
+    async def execute(self, quantity: float) -> List[dict]:
+        if not await self.ticker.wait_ready():
+            self.logger.info(f'No book for {self.symbol}, entering at market')
+            self.children.append(await self.market(quantity))
+            return self.children
+
+        start = self.touch
+        deadline = time.monotonic() + self.timeout
+        order = None
+        amended_at = 0.0
+        polled_at = time.monotonic()
+        amendments = 0
+
+        while True:
+            remaining = round(quantity - self.filled(), self.qty_precision)
+            now = time.monotonic()
+            if remaining <= 0 or now >= deadline or not self.within_chase(self.touch, start):
+                break
+
+            if order is None:
+                order = await self.place(remaining, self.touch)
+                amended_at = time.monotonic()
+            elif float(order.get('price')) != self.touch and now - amended_at >= self.min_interval:
+                # The touch moved away, cancel and re-post the remainder at the new price
+                self.children.append(await self.cancel(order))
+                order = None
+                amendments += 1
+                continue
+            else:
+                wait = min(polled_at + self.poll_interval - now, deadline - now)
+                if float(order.get('price')) != self.touch:
+                    wait = min(wait, amended_at + self.min_interval - now)
+                await self.ticker.wait_change(timeout=max(wait, 0))
+                if time.monotonic() - polled_at >= self.poll_interval:
+                    # The book moving says nothing about our fills, the far side alone may tick on a busy book
+                    order = await self.binance_client.futures_get_order(
+                        symbol=self.symbol, orderId=order.get('orderId')
+                    )
+                    polled_at = time.monotonic()
+
+            # Filled, or a post-only expired because the touch moved while it was in flight
+            if order.get('status') in FINAL_STATUSES:
+                self.children.append(order)
+                order = None
+
+        if order is not None:
+            self.children.append(await self.cancel(order))
+
+        remaining = round(quantity - self.filled(), self.qty_precision)
+        self.logger.info(
+            f'Chased {self.symbol} with {amendments} amendments, maker filled {self.filled()}, market {remaining}'
+        )
+        if remaining > 0:
+            self.children.append(await self.market(remaining))
+
+        return self.children
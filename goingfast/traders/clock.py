@@ -0,0 +1,120 @@
+"""
+Exchange clock offsets estimated in the background.
+
+Signed requests carry a timestamp the exchange rejects once our clock drifts out of its receive window (`-1021` on
+Binance). Every `CLOCK_SYNC_INTERVAL` seconds the exchange's time is sampled a few times and the offset is taken from
+the sample with the fastest round trip, assuming the server stamped it halfway through. Signed requests then use
+`now_ms()` instead of the local clock.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Awaitable, Callable, Dict
+
+import ccxt
+from sanic.log import logger
+
+from goingfast.traders.ratelimit import Priority, Scheduler
+
+CLOCK_SYNC_INTERVAL = float(environ.get('CLOCK_SYNC_INTERVAL', '60'))
+CLOCK_SYNC_SAMPLES = int(environ.get('CLOCK_SYNC_SAMPLES', '5'))
+
+
+class Clock:
+    def __init__(
+        self, name: str, server_time: Callable[[], Awaitable[int]] | None = None, scheduler: Scheduler | None = None
+    ):
+        self.name = name
+        self.server_time = server_time
+        self.scheduler = scheduler
+
+        self.offset_ms = 0.0
+        self.rtt_ms = None
+        self.synced_at = 0.0
+        self.task = None
+
+    @property
+    def is_synced(self) -> bool:
+        return self.synced_at > 0
+
+    def to_dict(self) -> dict:
+        return {
+            'is_synced': self.is_synced,
+            'offset_ms': round(self.offset_ms, 1),
+            'rtt_ms': round(self.rtt_ms, 1) if self.rtt_ms is not None else None,
+            'age': round(time.monotonic() - self.synced_at, 1) if self.is_synced else None,
+        }
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000 + self.offset_ms)
+
+    async def sample(self) -> tuple[float, float]:
+        """
+        Offset and round trip of a single server time request, in milliseconds
+        """
+        if self.scheduler:
+            await self.scheduler.acquire(Priority.INFO, {'weight': 1, 'rest': 1})
+        sent = time.time() * 1000
+        server = await self.server_time()
+        received = time.time() * 1000
+        return server - (sent + received) / 2, received - sent
+
+    async def sync(self):
+        samples = list()
+        for _ in range(CLOCK_SYNC_SAMPLES):
+            try:
+                samples.append(await self.sample())
+            except Exception as exc:
+                logger.info(f'{self.name} - Sampling the server time failed: {exc!r}')
+        if not samples:
+            return
+
+        # The midpoint of the fastest round trip is the closest to when the server read its clock
+        offset, rtt = min(samples, key=lambda sample: sample[1])
+        self.offset_ms, self.rtt_ms, self.synced_at = offset, rtt, time.monotonic()
+        logger.debug(f'{self.name} - Clock offset {offset:.1f} ms, round trip {rtt:.1f} ms')
+
+    async def run(self):
+        while True:
+            await self.sync()
+            await asyncio.sleep(CLOCK_SYNC_INTERVAL)
+
+    def start(self):
+        if self.task is None and self.server_time:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def resync(self):
+        """
+        Sample again right away, e.g. after the exchange rejected a timestamp
+        """
+        if self.server_time:
+            asyncio.get_running_loop().create_task(self.sync())
+
+
+_clocks: Dict[str, Clock] = dict()
+
+
+def get_clock(
+    name: str, server_time: Callable[[], Awaitable[int]] | None = None, scheduler: Scheduler | None = None
+) -> Clock:
+    if name not in _clocks:
+        _clocks[name] = Clock(name=name)
+    clock = _clocks[name]
+    if server_time:
+        clock.server_time = server_time
+    if scheduler:
+        clock.scheduler = scheduler
+    return clock
+
+
+def snapshot() -> Dict[str, dict]:
+    return {name: clock.to_dict() for name, clock in sorted(_clocks.items())}
+
+
+def ccxt_server_time(exchange: str) -> Callable[[], Awaitable[int]]:
+    client = getattr(ccxt, exchange)()
+
+    async def server_time() -> int:
+        return await asyncio.get_running_loop().run_in_executor(None, client.fetch_time)
+
+    return server_time
@@ -0,0 +1,237 @@
+"""
+Execution algorithms for entries.
+
+A slicer splits the entry quantity into child market orders and returns their fills. Children go through a rate
+limit budget shared by every trade on the same exchange, and the trader aggregates the fills back into one
+`entry_order` so exits are sized from what was actually filled. A child that fails ends the entry short: the
+children that filled are still returned so the position they opened gets its exit legs.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Awaitable, Callable, Dict, List
+
+from sanic.log import logger
+
+ENTRY_EXECUTION = environ.get('ENTRY_EXECUTION', 'market')
+EXECUTION_SLICES = int(environ.get('EXECUTION_SLICES', '5'))
+EXECUTION_DURATION = float(environ.get('EXECUTION_DURATION', '30'))
+EXECUTION_CLIP_SIZE = float(environ.get('EXECUTION_CLIP_SIZE', '0.2'))
+EXECUTION_PARTICIPATION = float(environ.get('EXECUTION_PARTICIPATION', '0.1'))
+EXECUTION_INTERVAL = float(environ.get('EXECUTION_INTERVAL', '2'))
+EXECUTION_MAX_CONCURRENCY = int(environ.get('EXECUTION_MAX_CONCURRENCY', '2'))
+EXECUTION_REQUESTS_PER_SECOND = float(environ.get('EXECUTION_REQUESTS_PER_SECOND', '5'))
+
+PlaceChild = Callable[[float], Awaitable[Dict]]
+RoundQuantity = Callable[[float], float]
+MarketVolume = Callable[[], Awaitable[float | None]]
+
+
+class RateBudget:
+    """
+    Caps in-flight child orders and spaces their submission to a maximum request rate
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = EXECUTION_MAX_CONCURRENCY,
+        requests_per_second: float = EXECUTION_REQUESTS_PER_SECOND,
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.spacing = 1 / requests_per_second if requests_per_second > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def run(self, place: PlaceChild, quantity: float) -> Dict:
+        async with self.semaphore:
+            async with self.lock:
+                now = time.monotonic()
+                wait = self.next_slot - now
+                self.next_slot = max(now, self.next_slot) + self.spacing
+            if wait > 0:
+                await asyncio.sleep(wait)
+            return await place(quantity)
+
+
+_budgets: Dict[str, RateBudget] = dict()
+
+
+def get_budget(exchange: str) -> RateBudget:
+    if exchange not in _budgets:
+        _budgets[exchange] = RateBudget()
+    return _budgets[exchange]
+
+
+def split(quantity: float, parts: int, round_quantity: RoundQuantity) -> List[float]:
+    """
+    Even slices rounded to the exchange's step, the last slice carries the remainder
+    """
+    parts = max(parts, 1)
+    slice_quantity = round_quantity(quantity / parts)
+    if slice_quantity <= 0:
+        return [quantity]
+
+    slices = [slice_quantity] * (parts - 1)
+    slices.append(round_quantity(quantity - slice_quantity * (parts - 1)))
+    return [s for s in slices if s > 0]
+
+
+def settle(results: list) -> List[Dict]:
+    """
+    Fills of the children that went through, the first error is raised only when none did
+    """
+    fills = [r for r in results if isinstance(r, dict)]
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors and not fills:
+        raise errors[0]
+    if errors:
+        logger.error(f'{len(errors)} entry children failed ({errors[0]!r}), going on with the {len(fills)} that filled')
+    return fills
+
+
+class Slicer:
+    name = 'base'
+
+    def __init__(self, budget: RateBudget):
+        self.budget = budget
+
+    async def execute(
+        self, place: PlaceChild, quantity: float, round_quantity: RoundQuantity, market_volume: MarketVolume
+    ) -> List[Dict]:
+        raise NotImplementedError()
+
+
+class TWAPSlicer(Slicer):
+    """
+    `EXECUTION_SLICES` children evenly spaced over `EXECUTION_DURATION` seconds
+    """
+
+    name = 'twap'
+
+    def __init__(self, budget: RateBudget, slices: int = EXECUTION_SLICES, duration: float = EXECUTION_DURATION):
+        super().__init__(budget)
+        self.slices = slices
+        self.duration = duration
+
+    async def execute(
+        self, place: PlaceChild, quantity: float, round_quantity: RoundQuantity, market_volume: MarketVolume
+    ) -> List[Dict]:
+        slices = split(quantity, self.slices, round_quantity)
+        interval = self.duration / len(slices)
+
+        waiting = set()
+
+        async def scheduled(index: int, child_quantity: float) -> Dict:
+            await asyncio.sleep(index * interval)
+            waiting.discard(asyncio.current_task())
+            try:
+                return await self.budget.run(place, child_quantity)
+            except Exception as exc:
+                # Children not sent yet stay home, those on their way finish so their fills are known
+                for task in waiting:
+                    task.cancel()
+                raise exc
+
+        tasks = [asyncio.ensure_future(scheduled(i, q)) for i, q in enumerate(slices)]
+        waiting.update(tasks)
+        return settle(await asyncio.gather(*tasks, return_exceptions=True))
+
+
+class IcebergSlicer(Slicer):
+    """
+    Only a clip of `EXECUTION_CLIP_SIZE` of the total is shown at a time, the next clip goes out once the last filled
+    """
+
+    name = 'iceberg'
+
+    def __init__(
+        self, budget: RateBudget, clip_size: float = EXECUTION_CLIP_SIZE, interval: float = EXECUTION_INTERVAL
+    ):
+        super().__init__(budget)
+        self.clip_size = clip_size
+        self.interval = interval
+
+    async def execute(
+        self, place: PlaceChild, quantity: float, round_quantity: RoundQuantity, market_volume: MarketVolume
+    ) -> List[Dict]:
+        clips = split(quantity, round(1 / self.clip_size), round_quantity)
+
+        fills = list()
+        for index, clip in enumerate(clips):
+            if index:
+                await asyncio.sleep(self.interval)
+            try:
+                fills.append(await self.budget.run(place, clip))
+            except Exception as exc:
+                return settle(fills + [exc])
+        return fills
+
+
+class ParticipationSlicer(Slicer):
+    """
+    Each child is sized to `EXECUTION_PARTICIPATION` of the market volume traded so far in the current one minute
+    candle, read again before every child
+    """
+
+    name = 'pov'
+
+    def __init__(
+        self,
+        budget: RateBudget,
+        participation: float = EXECUTION_PARTICIPATION,
+        interval: float = EXECUTION_INTERVAL,
+        duration: float = EXECUTION_DURATION,
+    ):
+        super().__init__(budget)
+        self.participation = participation
+        self.interval = interval
+        self.duration = duration
+
+    async def execute(
+        self, place: PlaceChild, quantity: float, round_quantity: RoundQuantity, market_volume: MarketVolume
+    ) -> List[Dict]:
+        deadline = time.monotonic() + self.duration
+        remaining = quantity
+
+        fills = list()
+        while remaining > 0:
+            volume = await market_volume()
+            if time.monotonic() >= deadline or volume is None:
+                # Out of time or no volume source, finish the rest in one go
+                child = remaining
+            else:
+                child = min(remaining, round_quantity(volume * self.participation))
+
+            if child > 0:
+                try:
+                    fills.append(await self.budget.run(place, child))
+                except Exception as exc:
+                    return settle(fills + [exc])
+                remaining = round_quantity(remaining - child)
+            if remaining > 0:
+                await asyncio.sleep(self.interval)
+
+        return fills
+
+
+SLICERS = {
+    TWAPSlicer.name: TWAPSlicer,
+    IcebergSlicer.name: IcebergSlicer,
+    ParticipationSlicer.name: ParticipationSlicer,
+}
+
+
+def get_slicer(name: str, exchange: str) -> Slicer:
+    slicer_class = SLICERS.get(name)
+    if not slicer_class:
+        raise NotImplementedError(f'Execution algorithm {name} is not implemented')
+    return slicer_class(budget=get_budget(exchange))
+
+
+def aggregate(fills: List[Dict]) -> Dict:
+    """
+    Total filled quantity and volume weighted average price of `{'quantity', 'price'}` fills
+    """
+    total = sum(f.get('quantity') for f in fills)
+    notional = sum(f.get('quantity') * f.get('price') for f in fills)
+    return {'quantity': total, 'price': notional / total if total else 0.0}
@@ -0,0 +1,181 @@
+"""
+Per exchange and per endpoint health kept in memory: rolling latency, error rate and a circuit breaker.
+
+Anything talking to an exchange records its outcome here, readers such as the router only look at the numbers and
+never make a request themselves. The breaker opens after too many failures in the rolling window, then lets a single
+probe through once `BREAKER_COOLDOWN` has passed (half-open) and closes again when the probe succeeds. New trades aimed
+at an open breaker fail fast instead of waiting out timeouts.
+"""
+import asyncio
+import time
+from collections import deque
+from os import environ
+from typing import Dict
+
+import numpy as np
+
+HEALTH_EWMA_ALPHA = float(environ.get('HEALTH_EWMA_ALPHA', '0.2'))
+HEALTH_WINDOW = int(environ.get('HEALTH_WINDOW', '100'))
+HEALTH_WINDOW_SECONDS = float(environ.get('HEALTH_WINDOW_SECONDS', '60'))
+BREAKER_ERROR_RATE = float(environ.get('BREAKER_ERROR_RATE', '0.5'))
+BREAKER_MIN_REQUESTS = int(environ.get('BREAKER_MIN_REQUESTS', '5'))
+BREAKER_CONSECUTIVE_FAILURES = int(environ.get('BREAKER_CONSECUTIVE_FAILURES', '3'))
+BREAKER_COOLDOWN = float(environ.get('BREAKER_COOLDOWN', '30'))
+BREAKER_QUEUE_TIMEOUT = float(environ.get('BREAKER_QUEUE_TIMEOUT', '0'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class Health:
+    def __init__(self, name: str, alpha: float = HEALTH_EWMA_ALPHA):
+        self.name = name
+        self.alpha = alpha
+
+        self.latency = None
+        self.samples = deque(maxlen=HEALTH_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.updated_at = 0.0
+
+        self.breaker = CLOSED
+        self.opened_at = 0.0
+        self.probed_at = 0.0
+
+    def window(self) -> list:
+        horizon = time.monotonic() - HEALTH_WINDOW_SECONDS
+        return [sample for sample in self.samples if sample[0] >= horizon]
+
+    @property
+    def error_rate(self) -> float:
+        window = self.window()
+        if not window:
+            return 0.0
+        return sum(1 for _, ok, _ in window if not ok) / len(window)
+
+    def latency_percentiles(self) -> Dict[str, float | None]:
+        latencies = [latency for _, _, latency in self.window() if latency is not None]
+        if not latencies:
+            return {'p50_ms': None, 'p95_ms': None}
+        p50, p95 = np.percentile(latencies, [50, 95])
+        return {'p50_ms': round(float(p50) * 1000, 1), 'p95_ms': round(float(p95) * 1000, 1)}
+
+    @property
+    def state(self) -> str:
+        if self.breaker == OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+            return HALF_OPEN
+        return self.breaker
+
+    @property
+    def is_available(self) -> bool:
+        state = self.state
+        # A probe that never reported back does not hold the breaker half-open forever
+        return state == CLOSED or (state == HALF_OPEN and time.monotonic() - self.probed_at >= BREAKER_COOLDOWN)
+
+    def allows(self) -> bool:
+        """
+        Whether a new trade may go out, half-open lets a single probe through at a time
+        """
+        if not self.is_available:
+            return False
+        if self.state == HALF_OPEN:
+            self.probed_at = time.monotonic()
+        return True
+
+    def check(self):
+        """
+        Raised from inside a trade that has not entered yet, once its own requests tripped the breaker
+        """
+        if self.state == OPEN:
+            raise CircuitOpenError(f'{self.name} circuit is open, last error: {self.last_error}')
+
+    def record(self, ok: bool, latency: float | None = None, error: str | None = None):
+        now = time.monotonic()
+        self.requests += 1
+        self.updated_at = now
+        self.samples.append((now, ok, latency))
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+
+        if ok:
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self.close()
+            return
+
+        self.errors += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN or self.should_trip():
+            self.open()
+
+    def should_trip(self) -> bool:
+        if self.breaker != CLOSED:
+            return False
+        if self.consecutive_failures >= BREAKER_CONSECUTIVE_FAILURES:
+            return True
+        window = self.window()
+        return len(window) >= BREAKER_MIN_REQUESTS and self.error_rate >= BREAKER_ERROR_RATE
+
+    def open(self):
+        self.breaker = OPEN
+        self.opened_at = time.monotonic()
+
+    def close(self):
+        self.breaker = CLOSED
+        self.consecutive_failures = 0
+        self.samples.clear()
+
+    async def wait_allowed(self, timeout: float) -> bool:
+        """
+        Queue a trade behind an open breaker for up to `timeout` seconds
+        """
+        deadline = time.monotonic() + timeout
+        while not self.allows():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(remaining, max(BREAKER_COOLDOWN - (time.monotonic() - self.opened_at), 0.1)))
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'state': self.state,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            **self.latency_percentiles(),
+            'error_rate': round(self.error_rate, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+        }
+
+
+_health: Dict[str, Health] = dict()
+
+
+def get_health(exchange: str, endpoint: str | None = None) -> Health:
+    name = f'{exchange}:{endpoint}' if endpoint else exchange
+    if name not in _health:
+        _health[name] = Health(name=name)
+    return _health[name]
+
+
+def record(exchange: str, endpoint: str, ok: bool, latency: float | None = None, error: str | None = None):
+    """
+    Count the outcome against both the endpoint and the exchange as a whole
+    """
+    get_health(exchange, endpoint).record(ok=ok, latency=latency, error=error)
+    get_health(exchange).record(ok=ok, latency=latency, error=error)
+
+
+def snapshot() -> Dict[str, dict]:
+    return {name: health.to_dict() for name, health in sorted(_health.items())}
@@ -1,5 +1,6 @@
+from functools import partial
 from os import environ
-from typing import List
+from typing import Dict, List
 
 import binance
 from binance.enums import HistoricalKlinesType
@@ -7,19 +8,55 @@ from functional import seq
 from talib import ATR
 import numpy as np
 
+from goingfast.traders.clock import Clock, get_clock
+from goingfast.traders.marketdata import MARKET_DATA_CANDLES, CandleCache, get_candle_cache, interval_ms
+from goingfast.traders.ratelimit import ScheduledBinanceClient, get_scheduler
+
 API_KEY = environ.get('API_KEY')
 API_SECRET = environ.get('API_SECRET')
 IS_TESTNET = True if environ.get('IS_TESTNET') == '1' else False
+CANDLE_HISTORY = '2 days ago utc'
+CANDLE_HISTORY_MS = 2 * 86400 * 1000
 
 
 def get_binance_client(
-    api_key: str = API_KEY, api_secret: str = API_SECRET, is_testnet: bool = IS_TESTNET
-) -> binance.AsyncClient:
+    api_key: str = API_KEY, api_secret: str = API_SECRET, is_testnet: bool = IS_TESTNET, name: str = 'binance-futures'
+) -> ScheduledBinanceClient:
     """
-    Get a Binance client
+    Get a Binance client, its calls go through the scheduler and clock shared by every client of the `name` market
     """
     client = binance.AsyncClient(api_key=api_key, api_secret=api_secret, testnet=is_testnet)
-    return client
+    return ScheduledBinanceClient(client=client, scheduler=get_scheduler(name), clock=get_binance_clock(name))
+
+
+_spot_clients: Dict[str, ScheduledBinanceClient] = dict()
+
+
+def get_binance_spot_client(api_key: str = API_KEY, api_secret: str = API_SECRET) -> ScheduledBinanceClient:
+    """
+    One spot client per key for the life of the process, its HTTP session and user data stream outlive the trades
+    """
+    if api_key not in _spot_clients:
+        _spot_clients[api_key] = get_binance_client(api_key=api_key, api_secret=api_secret, name='binance')
+    return _spot_clients[api_key]
+
+
+_time_client: binance.AsyncClient | None = None
+
+
+async def binance_server_time(name: str = 'binance-futures') -> int:
+    global _time_client
+    if _time_client is None:
+        _time_client = binance.AsyncClient(testnet=IS_TESTNET)
+    if name == 'binance':
+        response = await _time_client.get_server_time()
+    else:
+        response = await _time_client.futures_time()
+    return response.get('serverTime')
+
+
+def get_binance_clock(name: str = 'binance-futures') -> Clock:
+    return get_clock(name, server_time=partial(binance_server_time, name), scheduler=get_scheduler(name))
 
 
 async def get_aggregated_data(client: binance.AsyncClient, symbol: str) -> List[str | float]:
@@ -44,12 +81,45 @@ async def get_aggregated_data(client: binance.AsyncClient, symbol: str) -> List[
     return [symbol, *sorted_volume[0]]
 
 
-async def get_candles(client: binance.AsyncClient, symbol: str, timeframe: str) -> List:
-    start_str = '2 days ago utc'
-    klines = await client.get_historical_klines(
-        symbol=symbol, interval=timeframe, start_str=start_str, klines_type=HistoricalKlinesType.FUTURES
-    )
-    ohlcv = seq(klines).map(lambda x: [float(x[1]), float(x[2]), float(x[3]), float(x[4]), float(x[5])])
+def get_market_candles(name: str, symbol: str, timeframe: str) -> CandleCache:
+    """
+    Candles of the `name` market kept current by the market data hub, loaded with a public client of their own
+    """
+    klines_type = HistoricalKlinesType.SPOT if name == 'binance' else HistoricalKlinesType.FUTURES
+
+    async def load() -> list:
+        client = get_binance_client(api_key=None, api_secret=None, name=name)
+        try:
+            return await client.get_historical_klines(
+                symbol=symbol, interval=timeframe, start_str=CANDLE_HISTORY, klines_type=klines_type
+            )
+        finally:
+            await client.close_connection()
+
+    return get_candle_cache(name=name, symbol=symbol, timeframe=timeframe, load=load)
+
+
+async def get_candles(
+    client: binance.AsyncClient,
+    symbol: str,
+    timeframe: str,
+    klines_type: HistoricalKlinesType = HistoricalKlinesType.FUTURES,
+) -> List:
+    ohlcv = None
+    interval = interval_ms(timeframe)
+    count = CANDLE_HISTORY_MS // interval + 1 if interval else None
+    if count and count <= MARKET_DATA_CANDLES:
+        # Loaded over REST once per symbol and timeframe, after that the stream keeps them current in memory
+        name = 'binance' if klines_type == HistoricalKlinesType.SPOT else 'binance-futures'
+        cache = get_market_candles(name=name, symbol=symbol, timeframe=timeframe)
+        if await cache.wait_ready():
+            ohlcv = seq(cache.window(count).tolist())
+
+    if ohlcv is None:
+        klines = await client.get_historical_klines(
+            symbol=symbol, interval=timeframe, start_str=CANDLE_HISTORY, klines_type=klines_type
+        )
+        ohlcv = seq(klines).map(lambda x: [float(x[1]), float(x[2]), float(x[3]), float(x[4]), float(x[5])])
     hl2 = seq(ohlcv).map(lambda x: (x[1] + x[2]) / 2).to_list()
     return [ohlcv, hl2]
 
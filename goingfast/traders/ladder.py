@@ -0,0 +1,116 @@
+"""
+Multi-level take profit ladders.
+
+A ladder is a list of legs, each closing a `fraction` of the filled quantity at a price given either by a risk reward
+ratio `rr` against the stop or by a fixed `tp_delta` from the entry:
+
+    [{"fraction": 0.5, "rr": 1}, {"fraction": 0.3, "rr": 2}, {"fraction": 0.2, "tp_delta": 400}]
+
+Ladders come from the alert's `metadata.tp_ladder` or from the `TP_LADDER` env var.
+"""
+from os import environ
+from typing import Callable, Dict, List
+
+import ujson
+
+TP_LADDER = environ.get('TP_LADDER')
+TP_LADDER_POLL_INTERVAL = float(environ.get('TP_LADDER_POLL_INTERVAL', '5'))
+
+LEG_OPEN = 'open'
+LEG_FILLED = 'filled'
+LEG_CANCELED = 'canceled'
+
+# Final order statuses, unified ccxt ones and Binance's. A leg's order in neither is still on its way.
+FILLED_STATUSES = ('closed', 'FILLED')
+CANCELED_STATUSES = ('canceled', 'expired', 'rejected', 'CANCELED', 'EXPIRED', 'EXPIRED_IN_MATCH', 'REJECTED')
+
+
+def parse_ladder(raw) -> List[dict] | None:
+    if not raw:
+        return None
+    ladder = ujson.loads(raw) if isinstance(raw, str) else raw
+
+    for leg in ladder:
+        if float(leg.get('fraction', 0)) <= 0:
+            raise ValueError(f'TP ladder leg needs a positive fraction: {leg}')
+        if leg.get('rr') is None and leg.get('tp_delta') is None:
+            raise ValueError(f'TP ladder leg needs either rr or tp_delta: {leg}')
+    if sum(float(leg.get('fraction')) for leg in ladder) > 1 + 1e-9:
+        raise ValueError('TP ladder fractions add up to more than 1')
+
+    return ladder
+
+
+def build_legs(
+    ladder: List[dict],
+    is_long: bool,
+    entry_price: float,
+    stop_price: float,
+    quantity: float,
+    round_price: Callable[[float], float],
+    round_quantity: Callable[[float], float],
+) -> List[dict]:
+    """
+    Price and size every leg. When the fractions cover the whole position the last leg takes the rounding remainder.
+    """
+    direction = 1 if is_long else -1
+    risk = abs(entry_price - stop_price)
+    covers_all = abs(sum(float(leg.get('fraction')) for leg in ladder) - 1) < 1e-9
+
+    legs = list()
+    allocated = 0.0
+    for index, leg in enumerate(ladder):
+        if leg.get('rr') is not None:
+            distance = risk * float(leg.get('rr'))
+        else:
+            distance = float(leg.get('tp_delta'))
+
+        if covers_all and index == len(ladder) - 1:
+            leg_quantity = round_quantity(quantity - allocated)
+        else:
+            leg_quantity = round_quantity(quantity * float(leg.get('fraction')))
+        allocated += leg_quantity
+
+        if leg_quantity <= 0:
+            continue
+        legs.append(
+            {
+                'price': round_price(entry_price + direction * distance),
+                'quantity': leg_quantity,
+                'order_id': None,
+                'status': LEG_OPEN,
+            }
+        )
+
+    return legs
+
+
+def missing_legs(legs: List[dict], open_ids: set) -> List[dict]:
+    """
+    Open legs whose order left the open orders, filled or cancelled, their status tells which
+    """
+    return [leg for leg in open_legs(legs) if leg.get('order_id') not in open_ids]
+
+
+def update_legs(legs: List[dict], statuses: Dict) -> List[dict]:
+    """
+    Settle the legs by the status of their order, `statuses` maps order ids to it. Returns the legs filled by this
+    update, a leg without a final status stays open.
+    """
+    filled = list()
+    for leg in open_legs(legs):
+        status = statuses.get(leg.get('order_id'))
+        if status in FILLED_STATUSES:
+            leg['status'] = LEG_FILLED
+            filled.append(leg)
+        elif status in CANCELED_STATUSES:
+            leg['status'] = LEG_CANCELED
+    return filled
+
+
+def open_legs(legs: List[dict]) -> List[dict]:
+    return [leg for leg in legs if leg.get('status') == LEG_OPEN]
+
+
+def filled_quantity(legs: List[dict]) -> float:
+    return sum(leg.get('quantity') for leg in legs if leg.get('status') == LEG_FILLED)
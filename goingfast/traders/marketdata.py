@@ -0,0 +1,331 @@
+"""
+Shared Binance market data over combined WebSocket streams.
+
+Every public stream the bot follows, book tickers, depth diffs, mark prices, klines and trades of any symbol, goes
+through one hub per market. The hub packs the streams onto a few combined-stream connections, adds and drops streams
+with SUBSCRIBE/UNSUBSCRIBE on the live socket and reconnects with the whole set when a connection drops. A message is
+decoded once and the same object is handed to every subscriber of its stream. Candles are kept in a NumPy buffer whose
+latest rows are always one contiguous slice, readers get views instead of copies.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Awaitable, Callable, Dict, List, Set
+
+import numpy as np
+import ujson
+import websockets
+from sanic.log import logger
+
+IS_TESTNET = True if environ.get('IS_TESTNET') == '1' else False
+FUTURES_STREAM_URL = environ.get(
+    'FUTURES_STREAM_URL', 'wss://stream.binancefuture.com/ws/' if IS_TESTNET else 'wss://fstream.binance.com/ws/'
+)
+SPOT_STREAM_URL = environ.get(
+    'SPOT_STREAM_URL', 'wss://testnet.binance.vision/ws/' if IS_TESTNET else 'wss://stream.binance.com:9443/ws/'
+)
+RECONNECT_DELAY = 1
+MARKET_DATA_STREAMS_PER_CONNECTION = int(environ.get('MARKET_DATA_STREAMS_PER_CONNECTION', '200'))
+MARKET_DATA_CANDLES = int(environ.get('MARKET_DATA_CANDLES', '1000'))
+MARKET_DATA_MAX_AGE = float(environ.get('MARKET_DATA_MAX_AGE', '10'))
+
+MARKETS = {'binance-futures': FUTURES_STREAM_URL, 'binance': SPOT_STREAM_URL}
+INTERVAL_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+Handler = Callable[[dict], None]
+
+
+def combined_url(url: str) -> str:
+    """
+    The combined-stream endpoint next to a raw `/ws/` one
+    """
+    return url.rstrip('/').rpartition('/ws')[0] + '/stream'
+
+
+def interval_ms(timeframe: str) -> int | None:
+    unit = INTERVAL_SECONDS.get(timeframe[-1])
+    return int(timeframe[:-1]) * unit * 1000 if unit else None
+
+
+class Connection:
+    """
+    One combined-stream socket carrying up to `MARKET_DATA_STREAMS_PER_CONNECTION` streams
+    """
+
+    def __init__(self, hub: 'MarketDataHub'):
+        self.hub = hub
+        self.streams: Set[str] = set()
+        self.subscribed: Set[str] = set()
+        self.ws = None
+        self.task = None
+        self.sync_task = None
+        self.request_id = 0
+
+    @property
+    def has_room(self) -> bool:
+        return len(self.streams) < MARKET_DATA_STREAMS_PER_CONNECTION
+
+    def add(self, stream: str):
+        self.streams.add(stream)
+        self.changed()
+
+    def remove(self, stream: str):
+        self.streams.discard(stream)
+        self.changed()
+
+    def changed(self):
+        if self.task is None or self.task.done():
+            if self.streams:
+                self.task = asyncio.get_running_loop().create_task(self.run())
+            return
+        # Changes made before the sync gets to run go out together, one request each way
+        if self.ws is not None and (self.sync_task is None or self.sync_task.done()):
+            self.sync_task = asyncio.get_running_loop().create_task(self.sync())
+
+    async def send(self, method: str, streams: Set[str]):
+        self.request_id += 1
+        await self.ws.send(ujson.dumps({'method': method, 'params': sorted(streams), 'id': self.request_id}))
+
+    async def sync(self):
+        try:
+            while self.ws is not None and self.streams != self.subscribed:
+                if not self.streams:
+                    await self.ws.close()
+                    return
+                added, removed = self.streams - self.subscribed, self.subscribed - self.streams
+                if added:
+                    await self.send('SUBSCRIBE', added)
+                if removed:
+                    await self.send('UNSUBSCRIBE', removed)
+                self.subscribed = (self.subscribed | added) - removed
+        except websockets.WebSocketException as exc:
+            # The reconnect subscribes to everything again
+            logger.info(f'{self.hub.name} market data subscription failed: {exc}')
+
+    async def run(self):
+        while self.streams:
+            streams = sorted(self.streams)
+            try:
+                async with websockets.connect(f'{self.hub.url}?streams={"/".join(streams)}') as ws:
+                    self.ws, self.subscribed = ws, set(streams)
+                    logger.debug(f'{self.hub.name} market data connected with {len(streams)} streams')
+                    # Anything subscribed while connecting
+                    self.changed()
+                    async for raw in ws:
+                        self.hub.dispatch(ujson.loads(raw))
+            except (websockets.WebSocketException, OSError) as exc:
+                logger.info(f'{self.hub.name} market data stream dropped: {exc}, reconnecting')
+            except Exception as exc:
+                # Whatever went wrong, the streams of every subscriber ride on this task
+                logger.error(f'{self.hub.name} market data connection failed: {exc!r}, reconnecting')
+            finally:
+                self.ws = None
+                self.subscribed = set()
+
+            if self.streams:
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+class MarketDataHub:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = combined_url(url)
+        self.handlers: Dict[str, List[Handler]] = dict()
+        self.connections: List[Connection] = list()
+
+    def subscribe(self, stream: str, handler: Handler):
+        """
+        Call `handler` with the payload of every message on `stream`, e.g. `btcusdt@bookTicker`
+        """
+        handlers = self.handlers.setdefault(stream, list())
+        handlers.append(handler)
+        if len(handlers) > 1:
+            return
+
+        connection = next((c for c in self.connections if c.has_room), None)
+        if connection is None:
+            connection = Connection(hub=self)
+            self.connections.append(connection)
+        connection.add(stream)
+
+    def unsubscribe(self, stream: str, handler: Handler):
+        handlers = self.handlers.get(stream, list())
+        if handler in handlers:
+            handlers.remove(handler)
+        if handlers or stream not in self.handlers:
+            return
+
+        del self.handlers[stream]
+        for connection in self.connections:
+            if stream in connection.streams:
+                connection.remove(stream)
+
+    def to_dict(self) -> dict:
+        return {
+            'streams': len(self.handlers),
+            'connections': len(self.connections),
+            'connected': sum(1 for c in self.connections if c.ws is not None),
+        }
+
+    def dispatch(self, message: dict):
+        handlers = self.handlers.get(message.get('stream'))
+        if handlers is None:
+            if message.get('error'):
+                logger.error(f'{self.name} market data request {message.get("id")} failed: {message.get("error")}')
+            return
+
+        # Subscribers share the decoded payload, none of them may modify it
+        data = message.get('data')
+        for handler in tuple(handlers):
+            try:
+                handler(data)
+            except Exception as exc:
+                # One broken subscriber must not take the stream from the others
+                logger.error(f'{self.name} market data handler of {message.get("stream")} failed: {exc!r}')
+
+
+class CandleCache:
+    """
+    Klines of one symbol and timeframe, loaded once over REST and kept current from the kline stream.
+    Rows are written twice into a buffer of twice the capacity, so the latest candles are always one contiguous slice.
+    """
+
+    def __init__(
+        self,
+        hub: MarketDataHub,
+        symbol: str,
+        timeframe: str,
+        load: Callable[[], Awaitable[list]],
+        capacity: int = MARKET_DATA_CANDLES,
+    ):
+        self.hub = hub
+        self.symbol = symbol.upper()
+        self.timeframe = timeframe
+        self.interval = interval_ms(timeframe)
+        self.load = load
+        self.capacity = capacity
+
+        # Open, high, low, close and volume
+        self.rows = np.zeros((2 * capacity, 5), dtype=np.float64)
+        self.count = 0
+        self.last_open = None
+        self.updated_at = 0.0
+
+        self.pending = list()
+        self.loaded = asyncio.Event()
+        self.task = None
+
+    @property
+    def stream(self) -> str:
+        return f'{self.symbol.lower()}@kline_{self.timeframe}'
+
+    @property
+    def is_ready(self) -> bool:
+        return self.loaded.is_set() and time.monotonic() - self.updated_at < MARKET_DATA_MAX_AGE
+
+    def window(self, count: int | None = None) -> np.ndarray:
+        """
+        The latest `count` candles oldest first, a view into the buffer that follows its updates
+        """
+        size = min(self.count, self.capacity)
+        count = size if count is None else min(count, size)
+        end = (self.count - 1) % self.capacity + self.capacity + 1
+        return self.rows[end - count : end]
+
+    def to_dict(self) -> dict:
+        return {
+            'is_ready': self.is_ready,
+            'candles': min(self.count, self.capacity),
+            'age': round(time.monotonic() - self.updated_at, 1) if self.updated_at else None,
+        }
+
+    def write(self, open_time: int, values: tuple):
+        if open_time != self.last_open:
+            self.count += 1
+            self.last_open = open_time
+        slot = (self.count - 1) % self.capacity
+        self.rows[slot] = values
+        self.rows[slot + self.capacity] = values
+        self.updated_at = time.monotonic()
+
+    def on_message(self, data: dict):
+        kline = data.get('k')
+        if not self.loaded.is_set():
+            self.pending.append(kline)
+            return
+        self.apply(kline)
+
+    def apply(self, kline: dict):
+        open_time = kline.get('t')
+        if self.last_open is not None:
+            if open_time < self.last_open:
+                return
+            if open_time > self.last_open + self.interval:
+                logger.info(f'Candles of {self.symbol} {self.timeframe} missed a candle, reloading')
+                self.reload()
+                return
+
+        values = tuple(float(kline.get(key)) for key in ('o', 'h', 'l', 'c', 'v'))
+        self.write(open_time, values)
+
+    async def run(self):
+        while True:
+            try:
+                klines = await self.load()
+                break
+            except Exception as exc:
+                logger.info(f'Candles of {self.symbol} {self.timeframe} failed to load: {exc}, retrying')
+                await asyncio.sleep(RECONNECT_DELAY)
+
+        self.count, self.last_open = 0, None
+        for kline in klines[-self.capacity :]:
+            self.write(int(kline[0]), tuple(float(value) for value in kline[1:6]))
+
+        # Stream updates that came in while loading, the ones the load already covers are overwritten or dropped
+        pending, self.pending = self.pending, list()
+        self.loaded.set()
+        for kline in pending:
+            if self.loaded.is_set():
+                self.apply(kline)
+
+    def reload(self):
+        self.loaded.clear()
+        self.pending = list()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def start(self):
+        if self.task is None:
+            self.hub.subscribe(self.stream, self.on_message)
+            self.reload()
+
+    async def wait_ready(self, timeout: float = 5) -> bool:
+        self.start()
+        try:
+            await asyncio.wait_for(self.loaded.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.is_ready
+
+
+_hubs: Dict[str, MarketDataHub] = dict()
+_candles: Dict[str, CandleCache] = dict()
+
+
+def get_hub(name: str = 'binance-futures') -> MarketDataHub:
+    if name not in _hubs:
+        _hubs[name] = MarketDataHub(name=name, url=MARKETS[name])
+    return _hubs[name]
+
+
+def get_candle_cache(name: str, symbol: str, timeframe: str, load: Callable[[], Awaitable[list]]) -> CandleCache:
+    key = f'{name}:{symbol.upper()}:{timeframe}'
+    if key not in _candles:
+        _candles[key] = CandleCache(hub=get_hub(name), symbol=symbol, timeframe=timeframe, load=load)
+    return _candles[key]
+
+
+def snapshot() -> dict:
+    return {
+        'hubs': {name: hub.to_dict() for name, hub in sorted(_hubs.items())},
+        'candles': {key: cache.to_dict() for key, cache in sorted(_candles.items())},
+    }
@@ -0,0 +1,247 @@
+"""
+Local L2 order book for Binance futures, maintained from the `depth@100ms` diff stream of the market data hub.
+
+Price levels live in sorted NumPy arrays (bids are keyed by negated price so both sides sort ascending), updates are a
+binary search plus an in-place shift. The book follows Binance's sync rules: buffer the diff stream, load a REST
+snapshot, drop stale events and resync whenever an event's `pu` does not chain onto the previous `u`, which is also
+how a reconnect of the hub is noticed.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Dict, Tuple
+
+import numpy as np
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+from sanic.log import logger
+
+from goingfast.traders.helpers import get_binance_client
+from goingfast.traders.marketdata import RECONNECT_DELAY, get_hub
+
+ORDER_BOOK_DEPTH = int(environ.get('ORDER_BOOK_DEPTH', '1000'))
+ORDER_BOOK_MAX_AGE = float(environ.get('ORDER_BOOK_MAX_AGE', '5'))
+
+
+class BookSide:
+    def __init__(self, is_bid: bool, capacity: int = ORDER_BOOK_DEPTH * 2):
+        self.is_bid = is_bid
+        self.keys = np.empty(capacity, dtype=np.float64)
+        self.quantities = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    @property
+    def prices(self) -> np.ndarray:
+        keys = self.keys[: self.size]
+        return -keys if self.is_bid else keys
+
+    @property
+    def depth(self) -> np.ndarray:
+        return self.quantities[: self.size]
+
+    def clear(self):
+        self.size = 0
+
+    def load(self, levels: list):
+        prices = np.array([float(p) for p, _ in levels], dtype=np.float64)
+        quantities = np.array([float(q) for _, q in levels], dtype=np.float64)
+        keys = -prices if self.is_bid else prices
+        order = np.argsort(keys)
+        self.size = min(len(order), len(self.keys))
+        self.keys[: self.size] = keys[order][: self.size]
+        self.quantities[: self.size] = quantities[order][: self.size]
+
+    def update(self, price: float, quantity: float):
+        key = -price if self.is_bid else price
+        index = int(np.searchsorted(self.keys[: self.size], key))
+        exists = index < self.size and self.keys[index] == key
+
+        if exists and quantity == 0:
+            self.keys[index : self.size - 1] = self.keys[index + 1 : self.size]
+            self.quantities[index : self.size - 1] = self.quantities[index + 1 : self.size]
+            self.size -= 1
+        elif exists:
+            self.quantities[index] = quantity
+        elif quantity > 0:
+            if self.size == len(self.keys):
+                # Full, only levels better than the worst one are worth keeping
+                if index == self.size:
+                    return
+                self.size -= 1
+            self.keys[index + 1 : self.size + 1] = self.keys[index : self.size]
+            self.quantities[index + 1 : self.size + 1] = self.quantities[index : self.size]
+            self.keys[index] = key
+            self.quantities[index] = quantity
+            self.size += 1
+
+
+class LocalOrderBook:
+    def __init__(self, symbol: str):
+        self.symbol = symbol.upper()
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.last_update_id = None
+        self.chained = False
+        self.updated_at = 0.0
+        self.events = asyncio.Queue()
+        self.task = None
+
+    @property
+    def is_ready(self) -> bool:
+        return (
+            self.last_update_id is not None
+            and self.bids.size > 0
+            and self.asks.size > 0
+            and time.monotonic() - self.updated_at < ORDER_BOOK_MAX_AGE
+        )
+
+    @property
+    def best_bid(self) -> float | None:
+        return float(-self.bids.keys[0]) if self.bids.size else None
+
+    @property
+    def best_ask(self) -> float | None:
+        return float(self.asks.keys[0]) if self.asks.size else None
+
+    def to_dict(self) -> dict:
+        return {
+            'is_ready': self.is_ready,
+            'best_bid': self.best_bid,
+            'best_ask': self.best_ask,
+            'age': round(time.monotonic() - self.updated_at, 1) if self.updated_at else None,
+            'queued_events': self.events.qsize(),
+        }
+
+    def apply(self, event: dict):
+        for price, quantity in event.get('b'):
+            self.bids.update(float(price), float(quantity))
+        for price, quantity in event.get('a'):
+            self.asks.update(float(price), float(quantity))
+        self.last_update_id = event.get('u')
+        self.updated_at = time.monotonic()
+
+    def accept(self, event: dict) -> bool:
+        """
+        Apply a diff event, False when it does not chain onto the book and a resync is needed
+        """
+        if self.chained:
+            if event.get('pu') != self.last_update_id:
+                return False
+        else:
+            # The first event after a snapshot must straddle the snapshot's update id
+            if event.get('u') < self.last_update_id:
+                return True
+            if event.get('U') > self.last_update_id:
+                return False
+            self.chained = True
+
+        self.apply(event)
+        return True
+
+    def estimate_fill(self, is_buy: bool, notional: float) -> Tuple[float | None, float]:
+        """
+        Average fill price for a market order of `notional` quote currency and how much of it the book can absorb.
+        Single pass over the levels on the taking side.
+        """
+        side = self.asks if is_buy else self.bids
+        prices, depth = side.prices, side.depth
+        if not len(prices):
+            return None, 0.0
+
+        cumulative = np.cumsum(prices * depth)
+        index = int(np.searchsorted(cumulative, notional))
+        if index >= len(prices):
+            quantity = depth.sum()
+            return float(cumulative[-1] / quantity), float(cumulative[-1])
+
+        before_notional = cumulative[index - 1] if index else 0.0
+        before_quantity = depth[:index].sum()
+        partial = (notional - before_notional) / prices[index]
+        return float(notional / (before_quantity + partial)), float(notional)
+
+    def slippage_bps(self, is_buy: bool, notional: float) -> float | None:
+        """
+        Estimated average fill against the touch, in basis points
+        """
+        touch = self.best_ask if is_buy else self.best_bid
+        average, filled = self.estimate_fill(is_buy=is_buy, notional=notional)
+        if average is None or filled < notional:
+            return None
+        return abs(average - touch) / touch * 10000
+
+    def max_notional_within(self, is_buy: bool, max_bps: float) -> float:
+        """
+        Largest notional whose estimated average fill stays within `max_bps` of the touch
+        """
+        side = self.asks if is_buy else self.bids
+        prices, depth = side.prices, side.depth
+        if not len(prices):
+            return 0.0
+
+        touch = prices[0]
+        limit = touch * (1 + max_bps / 10000) if is_buy else touch * (1 - max_bps / 10000)
+        quantity, notional = 0.0, 0.0
+        for price, level in zip(prices, depth):
+            average = (notional + price * level) / (quantity + level)
+            if (average > limit) if is_buy else (average < limit):
+                # Only part of this level fits, solve (notional + price * q) / (quantity + q) == limit
+                partial = (limit * quantity - notional) / (price - limit)
+                return float(notional + price * max(partial, 0.0))
+            quantity += level
+            notional += price * level
+        return float(notional)
+
+    async def sync(self, client) -> bool:
+        # Diff events keep queueing up while the snapshot loads
+        snapshot = await client.futures_order_book(symbol=self.symbol, limit=ORDER_BOOK_DEPTH)
+
+        self.bids.load(snapshot.get('bids'))
+        self.asks.load(snapshot.get('asks'))
+        self.last_update_id = snapshot.get('lastUpdateId')
+        self.chained = False
+        self.updated_at = time.monotonic()
+
+        while not self.events.empty():
+            if not self.accept(self.events.get_nowait()):
+                return False
+        return True
+
+    async def run(self):
+        client = get_binance_client(api_key=None, api_secret=None)
+        hub, stream = get_hub(), f'{self.symbol.lower()}@depth@100ms'
+        hub.subscribe(stream, self.events.put_nowait)
+        try:
+            while True:
+                try:
+                    if await self.sync(client):
+                        logger.debug(f'Order book synced for {self.symbol} at {self.last_update_id}')
+                        while self.accept(await self.events.get()):
+                            pass
+                    logger.info(f'Order book for {self.symbol} missed an update, resyncing')
+                except (BinanceAPIException, BinanceRequestException, OSError) as exc:
+                    logger.info(f'Order book snapshot for {self.symbol} failed: {exc}, retrying')
+
+                self.last_update_id = None
+                self.chained = False
+                self.bids.clear()
+                self.asks.clear()
+                await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            hub.unsubscribe(stream, self.events.put_nowait)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+
+_books: Dict[str, LocalOrderBook] = dict()
+
+
+def get_order_book(symbol: str) -> LocalOrderBook:
+    symbol = symbol.upper()
+    if symbol not in _books:
+        _books[symbol] = LocalOrderBook(symbol=symbol)
+    return _books[symbol]
+
+
+def snapshot() -> Dict[str, dict]:
+    return {symbol: book.to_dict() for symbol, book in sorted(_books.items())}
@@ -0,0 +1,111 @@
+"""
+Idempotent order submission.
+
+Every order carries a client order id derived from the alert, so the same alert always names its orders the same way.
+When a request times out or the connection drops, the order is looked up by that id before it is sent again: it is
+either already on the book and returned as is, or it is not there yet. A request lost on the way can still land after
+that answer, so a miss is only trusted once the request is older than `ORDER_RECV_WINDOW` and the exchange has to
+reject it as stale. Only then is the order sent again, and resubmitting cannot double the position. That makes short
+timeouts safe, which bounds how long an entry can hang on a slow exchange.
+"""
+import asyncio
+import hashlib
+import time
+from os import environ
+from typing import Awaitable, Callable
+
+import aiohttp
+import ccxt
+import ujson
+from binance.exceptions import BinanceRequestException
+from sanic.log import logger
+
+ORDER_TIMEOUT = float(environ.get('ORDER_TIMEOUT', '3'))
+ORDER_RETRIES = int(environ.get('ORDER_RETRIES', '2'))
+ORDER_RETRY_DELAY = float(environ.get('ORDER_RETRY_DELAY', '0.2'))
+# Seconds after signing an exchange still accepts a request, Binance's recvWindow and the expiry of signed ccxt calls
+ORDER_RECV_WINDOW = float(environ.get('ORDER_RECV_WINDOW', int(environ.get('BINANCE_RECV_WINDOW', '5000')) / 1000))
+# Slack for the exchange's clock running behind ours
+RECV_WINDOW_MARGIN = 0.5
+
+CLIENT_ORDER_ID_PREFIX = 'gf'
+# TradingView's `{{timenow}}`, the time the alert fired, the same for every retransmit
+ALERT_TIME_FIELD = 'timenow'
+
+# The request may or may not have reached the matching engine
+UNKNOWN_OUTCOME = (asyncio.TimeoutError, aiohttp.ClientError, BinanceRequestException, ccxt.NetworkError)
+
+
+def is_stamped(message: dict) -> bool:
+    """
+    Whether the alert carries the time TradingView fired it, which tells a new alert from a retransmit
+    """
+    return bool(message.get(ALERT_TIME_FIELD))
+
+
+def alert_id(message: dict, received_at: float | None = None) -> str:
+    """
+    Short stable hash of the alert, identical alerts map to the same id. `received_at` tells apart alerts with the
+    same payload when they are not stamped with their fire time.
+    """
+    canonical = ujson.dumps(message if received_at is None else dict(message, received_at=received_at), sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:12]
+
+
+def client_order_id(trade_id: str, tag: str) -> str:
+    # Exchanges cap client ids at 36 characters of [A-Za-z0-9_-]
+    return f'{CLIENT_ORDER_ID_PREFIX}{trade_id}-{tag}'[:36]
+
+
+def parse_client_order_id(client_id: str) -> tuple[str, str] | None:
+    """
+    Trade id and tag of one of our orders, None for orders placed by anything else
+    """
+    if not client_id or not client_id.startswith(CLIENT_ORDER_ID_PREFIX):
+        return None
+    trade_id, _, tag = client_id[len(CLIENT_ORDER_ID_PREFIX) :].partition('-')
+    return (trade_id, tag) if tag else None
+
+
+async def submit(
+    name: str,
+    client_id: str,
+    create: Callable[[], Awaitable[dict]],
+    lookup: Callable[[], Awaitable[dict | None]],
+    timeout: float = ORDER_TIMEOUT,
+    retries: int = ORDER_RETRIES,
+) -> dict:
+    attempt = 0
+    should_create = True
+    sent_at = time.monotonic()
+    while True:
+        if should_create:
+            sent_at = time.monotonic()
+            try:
+                return await asyncio.wait_for(create(), timeout=timeout)
+            except UNKNOWN_OUTCOME as exc:
+                logger.info(f'{name} - Order {client_id} outcome unknown ({exc!r}), looking it up')
+
+        attempt += 1
+        if attempt > retries:
+            raise asyncio.TimeoutError(f'Order {client_id} could not be placed after {attempt} attempts')
+        await asyncio.sleep(ORDER_RETRY_DELAY)
+
+        try:
+            existing = await asyncio.wait_for(lookup(), timeout=timeout)
+            expires_in = sent_at + ORDER_RECV_WINDOW + RECV_WINDOW_MARGIN - time.monotonic()
+            if not existing and expires_in > 0:
+                # The lost request may still land, once it is too old for the exchange a miss means it never will
+                logger.info(f'{name} - Order {client_id} not found yet, waiting {expires_in:.1f}s for it to expire')
+                await asyncio.sleep(expires_in)
+                existing = await asyncio.wait_for(lookup(), timeout=timeout)
+        except UNKNOWN_OUTCOME as exc:
+            # Still unknown, only a definite answer makes it safe to send the order again
+            logger.info(f'{name} - Looking up order {client_id} failed ({exc!r})')
+            should_create = False
+            continue
+
+        if existing:
+            logger.info(f'{name} - Order {client_id} did reach the exchange')
+            return existing
+        should_create = True
@@ -0,0 +1,768 @@
+"""
+Paper trading backends.
+
+`PaperExchange` is an in-process matching simulator holding orders, positions and leverage per venue. The paper
+clients below expose the exact client surface each trader already calls, python-binance's futures methods for
+`BinanceFutures` and the ccxt unified/implicit methods for `BybitTrader` and `BitmexTrader`, so the traders run
+end-to-end unchanged. Prices come from the live public market data or from a cached price file replayed in a loop.
+"""
+import asyncio
+import itertools
+import time
+from logging import Logger
+from os import environ
+from typing import Awaitable, Callable, Dict, List
+
+import ccxt
+import ujson
+from binance.exceptions import BinanceAPIException
+
+from goingfast.traders.base import Actions
+from goingfast.traders.binancefutures import BinanceFutures
+from goingfast.traders.bitmex import BitmexTrader
+from goingfast.traders.bybit import BybitTrader
+from goingfast.traders.helpers import get_binance_client
+from goingfast.traders.trailing import PriceFeed, get_feed
+
+PAPER_LATENCY_MS = float(environ.get('PAPER_LATENCY_MS', '0'))
+PAPER_SLIPPAGE_BPS = float(environ.get('PAPER_SLIPPAGE_BPS', '0'))
+PAPER_PRICE_FILE = environ.get('PAPER_PRICE_FILE')
+PAPER_PRICE_INTERVAL = float(environ.get('PAPER_PRICE_INTERVAL', '1'))
+
+BUY = 'BUY'
+SELL = 'SELL'
+OPEN_STATUSES = ['NEW', 'PARTIALLY_FILLED']
+# python-binance methods that touch an account, the paper client has to answer them itself
+PRIVATE_BINANCE_METHODS = (
+    'futures_create',
+    'futures_place',
+    'futures_cancel',
+    'futures_change',
+    'futures_get_',
+    'futures_account',
+    'futures_position',
+    'futures_income',
+    'futures_leverage',
+    'futures_stream',
+    'create_',
+    'cancel_',
+    'get_account',
+    'get_asset',
+    'get_open_orders',
+    'get_order',
+    'get_all_orders',
+    'get_my_trades',
+    'order_',
+    'stream_',
+)
+
+
+class PaperSession:
+    """
+    Per trader bookkeeping, used to split the bot's own overhead from the simulated exchange latency
+    """
+
+    def __init__(self, on_entry: Callable[[], None] | None = None):
+        self.started = time.perf_counter()
+        self.simulated_latency = 0.0
+        self.overhead = 0.0
+        self.entered = False
+        self.on_entry = on_entry
+
+
+class PaperExchange:
+    def __init__(self, name: str, latency_ms: float = PAPER_LATENCY_MS, slippage_bps: float = PAPER_SLIPPAGE_BPS):
+        self.name = name
+        self.latency = latency_ms / 1000
+        self.slippage = slippage_bps / 10000
+
+        self.prices: Dict[str, float] = dict()
+        self.orders: Dict[int, dict] = dict()
+        self.positions: Dict[str, List[float]] = dict()
+        self.leverage: Dict[str, int] = dict()
+        self.ids = itertools.count(1)
+        self.listeners: List[Callable[[str, float], None]] = list()
+        self.stats = {'orders': 0, 'fills': 0, 'entries': 0, 'overhead': 0.0, 'simulated_latency': 0.0}
+
+    def last_price(self, symbol: str) -> float:
+        price = self.prices.get(symbol)
+        if price is None:
+            raise ValueError(f'Paper exchange {self.name} has no price for {symbol}, is the price stream running?')
+        return price
+
+    def position(self, symbol: str) -> List[float]:
+        return self.positions.setdefault(symbol, [0.0, 0.0])
+
+    def record_latency(self, session: PaperSession):
+        session.simulated_latency += self.latency
+        self.stats['simulated_latency'] += self.latency
+
+    def create_order(
+        self,
+        session: PaperSession,
+        symbol: str,
+        side: str,
+        order_type: str,
+        quantity: float = 0.0,
+        price: float | None = None,
+        stop_price: float | None = None,
+        close_position: bool = False,
+        reduce_only: bool = False,
+        time_in_force: str = 'GTC',
+        client_order_id: str | None = None,
+    ) -> dict:
+        order_id = next(self.ids)
+        order = {
+            'orderId': order_id,
+            'clientOrderId': client_order_id or f'paper-{order_id}',
+            'symbol': symbol,
+            'side': side,
+            'type': order_type,
+            'origQty': float(quantity),
+            'price': float(price) if price is not None else 0.0,
+            'stopPrice': float(stop_price) if stop_price is not None else 0.0,
+            'closePosition': close_position,
+            'reduceOnly': reduce_only or close_position,
+            'timeInForce': time_in_force,
+            'status': 'NEW',
+            'triggered': order_type in ['MARKET', 'LIMIT'],
+            'executedQty': 0.0,
+            'avgPrice': 0.0,
+            'updateTime': int(time.time() * 1000),
+        }
+        self.orders[order_id] = order
+        self.stats['orders'] += 1
+
+        last_price = self.last_price(symbol)
+        if order_type == 'MARKET':
+            self.fill(order, last_price)
+            if not session.entered and not order['reduceOnly']:
+                session.entered = True
+                session.overhead = time.perf_counter() - session.started - session.simulated_latency
+                self.stats['entries'] += 1
+                self.stats['overhead'] += session.overhead
+                if session.on_entry:
+                    session.on_entry()
+        elif order_type == 'LIMIT' and time_in_force == 'GTX' and self.is_marketable(order, last_price):
+            # Post-only orders that would take liquidity are expired, just like the exchange does
+            order['status'] = 'EXPIRED'
+        else:
+            self.match(order, last_price)
+
+        return order
+
+    def is_marketable(self, order: dict, price: float) -> bool:
+        if order['side'] == BUY:
+            return price <= order['price']
+        return price >= order['price']
+
+    def is_triggered(self, order: dict, price: float) -> bool:
+        # Stops trigger against the position, take profits with it
+        if order['type'] in ['STOP', 'STOP_MARKET']:
+            return price >= order['stopPrice'] if order['side'] == BUY else price <= order['stopPrice']
+        return price <= order['stopPrice'] if order['side'] == BUY else price >= order['stopPrice']
+
+    def match(self, order: dict, price: float):
+        if order['status'] not in OPEN_STATUSES:
+            return
+
+        if not order['triggered']:
+            if not self.is_triggered(order, price):
+                return
+            order['triggered'] = True
+
+        if order['type'] in ['MARKET', 'STOP_MARKET', 'TAKE_PROFIT_MARKET']:
+            self.fill(order, price)
+        elif self.is_marketable(order, price):
+            self.fill(order, order['price'], slippage=False)
+
+    def fill(self, order: dict, price: float, slippage: bool = True):
+        position = self.position(order['symbol'])
+        quantity = order['origQty']
+        if order['reduceOnly']:
+            closing = (order['side'] == SELL and position[0] > 0) or (order['side'] == BUY and position[0] < 0)
+            if not closing:
+                order['status'] = 'EXPIRED'
+                return
+            quantity = abs(position[0]) if order['closePosition'] else min(quantity, abs(position[0]))
+        if quantity <= 0:
+            order['status'] = 'REJECTED'
+            return
+
+        if slippage:
+            price = price * (1 + self.slippage) if order['side'] == BUY else price * (1 - self.slippage)
+
+        signed = quantity if order['side'] == BUY else -quantity
+        size, entry = position
+        if size == 0 or (size > 0) == (signed > 0):
+            position[1] = (abs(size) * entry + quantity * price) / (abs(size) + quantity)
+        position[0] = size + signed
+        if position[0] == 0:
+            position[1] = 0.0
+
+        order.update(
+            {
+                'status': 'FILLED',
+                'executedQty': quantity,
+                'avgPrice': price,
+                'origQty': quantity,
+                'updateTime': int(time.time() * 1000),
+            }
+        )
+        self.stats['fills'] += 1
+
+    def on_price(self, symbol: str, price: float):
+        self.prices[symbol] = price
+        for order in self.open_orders(symbol):
+            self.match(order, price)
+        for listener in self.listeners:
+            listener(symbol, price)
+
+    def amend_order(
+        self, order_id: int, stop_price: float | None = None, price: float | None = None, quantity: float | None = None
+    ) -> dict:
+        order = self.orders[int(order_id)]
+        if order['status'] not in OPEN_STATUSES:
+            raise ValueError(f'Order {order_id} is {order["status"]}')
+        if quantity is not None:
+            order['origQty'] = float(quantity)
+        if stop_price is not None:
+            order['stopPrice'] = float(stop_price)
+        if price is not None:
+            order['price'] = float(price)
+        self.match(order, self.last_price(order['symbol']))
+        return order
+
+    def get_order(self, order_id: int | None = None, client_order_id: str | None = None) -> dict | None:
+        if order_id is not None:
+            return self.orders.get(int(order_id))
+        return next((o for o in self.orders.values() if o['clientOrderId'] == client_order_id), None)
+
+    def open_orders(self, symbol: str | None = None) -> List[dict]:
+        return [
+            o
+            for o in self.orders.values()
+            if o['status'] in OPEN_STATUSES and (symbol is None or o['symbol'] == symbol)
+        ]
+
+    def cancel_order(self, order_id: int) -> dict:
+        order = self.orders[int(order_id)]
+        if order['status'] in OPEN_STATUSES:
+            order['status'] = 'CANCELED'
+        return order
+
+    def cancel_all(self, symbol: str, stops_only: bool = False):
+        for order in self.open_orders(symbol):
+            if not stops_only or not order['triggered']:
+                order['status'] = 'CANCELED'
+
+
+_exchanges: Dict[str, PaperExchange] = dict()
+
+
+def get_paper_exchange(name: str, account=None) -> PaperExchange:
+    """
+    Fan-out accounts each get their own orders and positions, fed with the prices of the venue's exchange
+    """
+    if account is not None:
+        venue = get_paper_exchange(name)
+        name = f'{name}:{account.name}'
+        if name not in _exchanges:
+            _exchanges[name] = PaperExchange(name=name)
+            venue.listeners.append(_exchanges[name].on_price)
+        return _exchanges[name]
+
+    if name not in _exchanges:
+        _exchanges[name] = PaperExchange(name=name)
+    return _exchanges[name]
+
+
+async def replay_prices(exchange: PaperExchange, symbol: str, path: str, interval: float = PAPER_PRICE_INTERVAL):
+    """
+    Replay a cached price stream in a loop, one price per line or a candle CSV where the close is the 4th column
+    """
+    with open(path) as f:
+        rows = [line.strip().split(',') for line in f if line.strip()]
+    prices = [float(row[3] if len(row) > 3 else row[0]) for row in rows]
+
+    for price in itertools.cycle(prices):
+        exchange.on_price(symbol, price)
+        await asyncio.sleep(interval)
+
+
+async def poll_prices(
+    exchange: PaperExchange, symbol: str, fetch: Callable[[], Awaitable[float]], interval: float = PAPER_PRICE_INTERVAL
+):
+    """
+    Follow the live price with a public market data call
+    """
+    while True:
+        exchange.on_price(symbol, await fetch())
+        await asyncio.sleep(interval)
+
+
+class PaperBinanceClient:
+    """
+    The subset of `binance.AsyncClient` used by `BinanceFutures`. Market data goes to a client without keys, any other
+    account endpoint is refused so a paper trade can never reach a live account.
+    """
+
+    def __init__(self, exchange: PaperExchange, market_client, session: PaperSession):
+        self.exchange = exchange
+        self.market_client = market_client
+        self.session = session
+
+    def __getattr__(self, item):
+        if item.startswith(PRIVATE_BINANCE_METHODS):
+            raise NotImplementedError(f'Paper trading does not simulate {item}')
+        return getattr(self.market_client, item)
+
+    async def latency(self):
+        self.exchange.record_latency(self.session)
+        await asyncio.sleep(self.exchange.latency)
+
+    @staticmethod
+    def to_response(order: dict) -> dict:
+        response = dict(order)
+        for key in ['origQty', 'executedQty', 'price', 'stopPrice', 'avgPrice']:
+            response[key] = str(order[key])
+        return response
+
+    async def get_historical_klines(self, **kwargs):
+        klines = await self.market_client.get_historical_klines(**kwargs)
+        if klines and kwargs.get('symbol') not in self.exchange.prices:
+            self.exchange.on_price(kwargs.get('symbol'), float(klines[-1][4]))
+        return klines
+
+    async def futures_create_order(self, **params):
+        await self.latency()
+        return self.create(params)
+
+    def create(self, params: dict) -> dict:
+        price = params.get('price')
+        stop_price = params.get('stopPrice')
+        order = self.exchange.create_order(
+            session=self.session,
+            symbol=params.get('symbol'),
+            side=params.get('side'),
+            order_type=params.get('type'),
+            quantity=float(params.get('quantity') or 0),
+            price=float(price) if price is not None else None,
+            stop_price=float(stop_price) if stop_price is not None else None,
+            close_position=bool(params.get('closePosition')),
+            reduce_only=params.get('reduceOnly') in [True, 'true'],
+            time_in_force=params.get('timeInForce', 'GTC'),
+            client_order_id=params.get('newClientOrderId'),
+        )
+        return self.to_response(order)
+
+    async def futures_place_batch_order(self, **params):
+        await self.latency()
+        return [self.create(order) for order in params.get('batchOrders')]
+
+    async def futures_get_order(self, **params):
+        await self.latency()
+        order = self.exchange.get_order(order_id=params.get('orderId'), client_order_id=params.get('origClientOrderId'))
+        if order is None:
+            raise BinanceAPIException(None, 400, ujson.dumps({'code': -2013, 'msg': 'Order does not exist.'}))
+        return self.to_response(order)
+
+    async def futures_get_open_orders(self, **params):
+        await self.latency()
+        return [self.to_response(o) for o in self.exchange.open_orders(params.get('symbol'))]
+
+    async def futures_position_information(self, **params):
+        await self.latency()
+        size, entry = self.exchange.position(params.get('symbol'))
+        return [{'symbol': params.get('symbol'), 'positionAmt': str(size), 'entryPrice': str(entry)}]
+
+    async def futures_cancel_order(self, **params):
+        await self.latency()
+        return self.to_response(self.exchange.cancel_order(params.get('orderId')))
+
+    async def futures_change_leverage(self, **params):
+        await self.latency()
+        self.exchange.leverage[params.get('symbol')] = int(params.get('leverage'))
+        return {'symbol': params.get('symbol'), 'leverage': int(params.get('leverage'))}
+
+    async def futures_change_margin_type(self, **params):
+        await self.latency()
+        return {'code': 200, 'msg': 'success'}
+
+    async def close_connection(self):
+        await self.market_client.close_connection()
+
+
+class PaperCcxtClient:
+    """
+    ccxt unified methods shared by the Bybit and Bitmex paper clients. Calls return at once, the trader waits out the
+    simulated latency on the event loop.
+    """
+
+    has = {'createMarketOrder': True}
+    verbose = False
+
+    def __init__(self, exchange: PaperExchange, session: PaperSession, symbol: str, normalized_symbol: str):
+        self.exchange = exchange
+        self.session = session
+        self.symbol = symbol
+        self.normalized_symbol = normalized_symbol
+
+    def latency(self):
+        self.exchange.record_latency(self.session)
+
+    def to_symbol(self, symbol: str) -> str:
+        return self.symbol if symbol == self.normalized_symbol else symbol
+
+    def create(
+        self, side: str, order_type: str, amount, price=None, stop_price=None, reduce_only=False, client_order_id=None
+    ) -> dict:
+        self.latency()
+        return self.exchange.create_order(
+            session=self.session,
+            symbol=self.symbol,
+            side=side,
+            order_type=order_type,
+            quantity=float(amount),
+            price=float(price) if price is not None else None,
+            stop_price=float(stop_price) if stop_price is not None else None,
+            reduce_only=reduce_only,
+            client_order_id=client_order_id,
+        )
+
+    @staticmethod
+    def to_unified(order: dict) -> dict:
+        statuses = {'NEW': 'open', 'FILLED': 'closed', 'CANCELED': 'canceled', 'EXPIRED': 'canceled'}
+        return {
+            'id': str(order['orderId']),
+            'symbol': order['symbol'],
+            'side': order['side'].lower(),
+            'type': order['type'].lower(),
+            'amount': order['origQty'],
+            'filled': order['executedQty'],
+            'price': order['avgPrice'] or order['price'],
+            'status': statuses.get(order['status'], 'open'),
+            'info': order,
+        }
+
+    def create_market_buy_order(self, symbol: str, amount, params: dict = None):
+        client_order_id = (params or dict()).get('clientOrderId')
+        order = self.create(side=BUY, order_type='MARKET', amount=amount, client_order_id=client_order_id)
+        return self.to_unified(order)
+
+    def create_market_sell_order(self, symbol: str, amount, params: dict = None):
+        client_order_id = (params or dict()).get('clientOrderId')
+        order = self.create(side=SELL, order_type='MARKET', amount=amount, client_order_id=client_order_id)
+        return self.to_unified(order)
+
+    def create_limit_buy_order(self, symbol: str, amount, price, params: dict = None):
+        client_order_id = (params or dict()).get('clientOrderId')
+        order = self.create(side=BUY, order_type='LIMIT', amount=amount, price=price, client_order_id=client_order_id)
+        return self.to_unified(order)
+
+    def create_limit_sell_order(self, symbol: str, amount, price, params: dict = None):
+        client_order_id = (params or dict()).get('clientOrderId')
+        order = self.create(side=SELL, order_type='LIMIT', amount=amount, price=price, client_order_id=client_order_id)
+        return self.to_unified(order)
+
+    def parse_order(self, order: dict) -> dict:
+        order_id = order.get('order_id') or order.get('stop_order_id') or order.get('orderID')
+        return self.to_unified(self.exchange.get_order(order_id=order_id))
+
+    def fetch_open_orders(self, symbol: str):
+        self.latency()
+        return [self.to_unified(o) for o in self.exchange.open_orders(self.to_symbol(symbol))]
+
+    def fetch_order(self, order_id: str, symbol: str):
+        self.latency()
+        order = self.exchange.get_order(order_id=order_id)
+        if order is None:
+            raise ccxt.OrderNotFound(f'Order {order_id} does not exist')
+        return self.to_unified(order)
+
+    def cancel_order(self, order_id: str, symbol: str):
+        self.latency()
+        return self.to_unified(self.exchange.cancel_order(order_id))
+
+
+class PaperBybitClient(PaperCcxtClient):
+    """
+    Responses mirror Bybit's inverse v2 API
+    """
+
+    def userGetLeverage(self, params: dict = None):
+        self.latency()
+        return {'ret_code': 0, 'result': {self.symbol: {'leverage': self.exchange.leverage.get(self.symbol, 0)}}}
+
+    def userPostLeverageSave(self, params: dict):
+        self.latency()
+        self.exchange.leverage[params.get('symbol')] = int(params.get('leverage'))
+        return {'ret_code': 0, 'ret_msg': 'ok', 'result': int(params.get('leverage'))}
+
+    def privatePostOrderCreate(self, params: dict):
+        order = self.create(
+            side=params.get('side').upper(),
+            order_type=params.get('order_type').upper(),
+            amount=params.get('qty'),
+            price=params.get('price'),
+            reduce_only=params.get('reduce_only', False),
+            client_order_id=params.get('order_link_id'),
+        )
+        return {'ret_code': 0, 'ret_msg': 'OK', 'result': {'order_id': str(order['orderId']), 'price': order['price']}}
+
+    def privateGetOrder(self, params: dict):
+        self.latency()
+        order = self.exchange.get_order(client_order_id=params.get('order_link_id'))
+        if order is None:
+            raise ccxt.OrderNotFound('order not exists or too late to cancel')
+        return {'ret_code': 0, 'result': {'order_id': str(order['orderId']), 'price': order['price']}}
+
+    def privateGetStopOrder(self, params: dict):
+        self.latency()
+        order = self.exchange.get_order(client_order_id=params.get('order_link_id'))
+        if order is None:
+            raise ccxt.OrderNotFound('order not exists or too late to cancel')
+        return {'ret_code': 0, 'result': {'stop_order_id': str(order['orderId']), 'price': order['price']}}
+
+    def openapiPostStopOrderCreate(self, params: dict):
+        order = self.create(
+            side=params.get('side').upper(),
+            order_type='STOP',
+            amount=params.get('qty'),
+            price=params.get('price'),
+            stop_price=params.get('stop_px'),
+            reduce_only=params.get('close_on_trigger', False),
+            client_order_id=params.get('order_link_id'),
+        )
+        return {
+            'ret_code': 0,
+            'ret_msg': 'OK',
+            'result': {'stop_order_id': str(order['orderId']), 'price': order['price']},
+        }
+
+    def privatePostStopOrderReplace(self, params: dict):
+        self.latency()
+        try:
+            order = self.exchange.amend_order(
+                order_id=params.get('stop_order_id'),
+                stop_price=params.get('p_r_trigger_price'),
+                price=params.get('p_r_price'),
+                quantity=params.get('p_r_qty'),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ccxt.OrderNotFound(str(exc))
+        return {'ret_code': 0, 'ret_msg': 'OK', 'result': {'stop_order_id': str(order['orderId'])}}
+
+    def private_get_position_list(self, params: dict):
+        self.latency()
+        size, entry = self.exchange.position(params.get('symbol'))
+        side = 'None' if size == 0 else ('Buy' if size > 0 else 'Sell')
+        return {'ret_code': 0, 'result': {'symbol': params.get('symbol'), 'side': side, 'size': abs(size)}}
+
+    def privatePostStopOrderCancelAll(self, params: dict):
+        self.latency()
+        self.exchange.cancel_all(params.get('symbol'), stops_only=True)
+        return {'ret_code': 0, 'result': []}
+
+    def privatePostOrderCancelAll(self, params: dict):
+        self.latency()
+        self.exchange.cancel_all(params.get('symbol'))
+        return {'ret_code': 0, 'result': []}
+
+
+class PaperBitmexClient(PaperCcxtClient):
+    """
+    Responses mirror BitMEX's REST API
+    """
+
+    order_types = {
+        'Limit': 'LIMIT',
+        'StopLimit': 'STOP',
+        'Stop': 'STOP_MARKET',
+        'MarketIfTouched': 'TAKE_PROFIT_MARKET',
+    }
+
+    def privatePostPositionLeverage(self, params: dict):
+        self.latency()
+        self.exchange.leverage[params.get('symbol')] = int(params.get('leverage'))
+        return {'symbol': params.get('symbol'), 'leverage': int(params.get('leverage'))}
+
+    def privatePostOrder(self, params: dict):
+        order = self.create(
+            side=params.get('side').upper(),
+            order_type=self.order_types.get(params.get('ordType'), 'LIMIT'),
+            amount=params.get('orderQty'),
+            price=params.get('price'),
+            stop_price=params.get('stopPx'),
+            reduce_only=params.get('execInst') == 'ReduceOnly',
+            client_order_id=params.get('clOrdID'),
+        )
+        return {'orderID': str(order['orderId']), 'price': order['price'], 'ordStatus': order['status'].title()}
+
+    def privateGetOrder(self, params: dict):
+        self.latency()
+        client_order_id = ujson.loads(params.get('filter')).get('clOrdID')
+        order = self.exchange.get_order(client_order_id=client_order_id)
+        if order is None:
+            return []
+        return [{'orderID': str(order['orderId']), 'price': order['price'], 'ordStatus': order['status'].title()}]
+
+    def privatePostOrderBulk(self, params: dict):
+        return [self.privatePostOrder(order) for order in ujson.loads(params.get('orders'))]
+
+    def privatePutOrder(self, params: dict):
+        self.latency()
+        try:
+            order = self.exchange.amend_order(
+                order_id=params.get('orderID'),
+                stop_price=params.get('stopPx'),
+                price=params.get('price'),
+                quantity=params.get('orderQty'),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ccxt.OrderNotFound(str(exc))
+        return {'orderID': str(order['orderId']), 'price': order['price'], 'ordStatus': order['status'].title()}
+
+    def privateGetPosition(self, params: dict):
+        self.latency()
+        size, entry = self.exchange.position(self.symbol)
+        if size == 0:
+            return []
+        return [{'symbol': self.symbol, 'currentQty': size, 'avgEntryPrice': entry, 'isOpen': True}]
+
+    def privateDeleteOrderAll(self, params: dict):
+        self.latency()
+        self.exchange.cancel_all(params.get('symbol'))
+        return []
+
+
+class PaperPriceFeed(PriceFeed):
+    """
+    Follows the paper exchange's own prices so trailing stops move with what the simulator matches against
+    """
+
+    def __init__(self, symbol: str, exchange: PaperExchange):
+        super().__init__(symbol)
+        self.exchange = exchange
+
+    def on_exchange_price(self, symbol: str, price: float):
+        if symbol == self.symbol:
+            self.publish(price)
+
+    async def run(self):
+        self.exchange.listeners.append(self.on_exchange_price)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self.exchange.listeners.remove(self.on_exchange_price)
+
+
+class PaperTrader:
+    """
+    Mixed into the paper traders, reports the bot's overhead from construction to the entry fill
+    """
+
+    def start_paper_session(self) -> PaperSession:
+        self.paper_session = PaperSession(on_entry=self.log_paper_overhead)
+        return self.paper_session
+
+    async def run_blocking(self, method, *args, **kwargs):
+        # The paper ccxt clients answer from memory, the round trip they simulate is waited out here
+        await asyncio.sleep(get_paper_exchange(self.__name__, self.account).latency)
+        return method(*args, **kwargs)
+
+    def price_feed(self) -> PriceFeed:
+        exchange = get_paper_exchange(self.__name__)
+        return get_feed(
+            key=f'{self.__name__}:{self.symbol}', factory=lambda: PaperPriceFeed(symbol=self.symbol, exchange=exchange)
+        )
+
+    def log_paper_overhead(self):
+        stats = get_paper_exchange(self.__name__, self.account).stats
+        average = stats['overhead'] / stats['entries'] * 1000
+        self.logger.info(
+            f'{self.__name__} - {self.action} - Bot overhead to entry: {self.paper_session.overhead * 1000:.1f} ms, '
+            + f'simulated exchange latency: {self.paper_session.simulated_latency * 1000:.1f} ms, '
+            + f'average overhead over {stats["entries"]} entries: {average:.1f} ms'
+        )
+
+
+class PaperBinanceFutures(PaperTrader, BinanceFutures):
+    __name__ = 'paper-binance-futures'
+
+    def make_binance_client(self) -> PaperBinanceClient:
+        # Only public market data is asked of Binance, with a client that holds no keys
+        return PaperBinanceClient(
+            exchange=get_paper_exchange(self.__name__, self.account),
+            market_client=get_binance_client(api_key=None, api_secret=None),
+            session=self.start_paper_session(),
+        )
+
+    async def close_client(self):
+        await self.binance_client.close_connection()
+
+
+class PaperBybitTrader(PaperTrader, BybitTrader):
+    __name__ = 'paper-bybit'
+
+    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None, account=None):
+        super().__init__(action, quantity, logger, metadata, account)
+
+        self.paper_client = PaperBybitClient(
+            exchange=get_paper_exchange(self.__name__, account),
+            session=self.start_paper_session(),
+            symbol=self.symbol,
+            normalized_symbol=self.normalized_symbol,
+        )
+
+    @property
+    def client(self):
+        return self.paper_client
+
+
+class PaperBitmexTrader(PaperTrader, BitmexTrader):
+    __name__ = 'paper-bitmex'
+
+    def __init__(self, action: Actions, quantity: int, logger: Logger, metadata: dict = None, account=None):
+        super().__init__(action, quantity, logger, metadata, account)
+
+        self.paper_client = PaperBitmexClient(
+            exchange=get_paper_exchange(self.__name__, account),
+            session=self.start_paper_session(),
+            symbol=self.symbol,
+            normalized_symbol=self.normalized_symbol,
+        )
+
+    @property
+    def client(self):
+        return self.paper_client
+
+
+def price_stream(trader_class) -> Awaitable:
+    """
+    The background task feeding prices into the paper exchange of `trader_class`
+    """
+    exchange = get_paper_exchange(trader_class.__name__)
+
+    if trader_class is PaperBinanceFutures:
+        from goingfast.traders.binancefutures import SYMBOL
+
+        symbol = SYMBOL
+        market_client = get_binance_client(api_key=None, api_secret=None)
+
+        async def fetch() -> float:
+            ticker = await market_client.futures_symbol_ticker(symbol=symbol)
+            return float(ticker.get('price'))
+
+    else:
+        symbol = trader_class.symbol
+        venue = getattr(ccxt, trader_class.__name__.replace('paper-', ''))({'enableRateLimit': True})
+
+        async def fetch() -> float:
+            loop = asyncio.get_running_loop()
+            ticker = await loop.run_in_executor(None, venue.fetch_ticker, trader_class.normalized_symbol)
+            return float(ticker.get('last'))
+
+    if PAPER_PRICE_FILE:
+        return replay_prices(exchange=exchange, symbol=symbol, path=PAPER_PRICE_FILE)
+    return poll_prices(exchange=exchange, symbol=symbol, fetch=fetch)
@@ -0,0 +1,247 @@
+"""
+Rate limit aware scheduling of exchange requests.
+
+Every exchange gets one `Scheduler` shared by all trades, holding a token bucket per endpoint class (Binance's request
+weight and order count, a plain request budget elsewhere). Requests take tokens before they go out and the buckets
+are corrected from the weight the exchange reports back in its response headers. Lower priorities leave a reserve
+untouched, so monitoring and market data queue up as the limit nears while order placement still goes through, and a
+429/418 pauses the whole exchange for its `Retry-After` instead of getting the IP banned.
+"""
+import asyncio
+import enum
+import time
+from functools import partial
+from os import environ
+from typing import Dict, Tuple
+
+import binance
+import ujson
+from binance.exceptions import BinanceAPIException
+from sanic.log import logger
+
+from goingfast.traders.health import record
+from goingfast.traders.signing import ORDER_PATHS, SIGNED_ORDER_PATH, SignedOrderPath
+
+RATE_LIMITS = environ.get('RATE_LIMITS')
+RATE_LIMIT_MONITOR_RESERVE = float(environ.get('RATE_LIMIT_MONITOR_RESERVE', '0.2'))
+RATE_LIMIT_INFO_RESERVE = float(environ.get('RATE_LIMIT_INFO_RESERVE', '0.4'))
+RATE_LIMIT_BACKOFF = float(environ.get('RATE_LIMIT_BACKOFF', '60'))
+RATE_LIMIT_QUEUE_INTERVAL = 0.05
+
+# Capacity and window in seconds of every endpoint class
+DEFAULT_LIMITS = {
+    'binance-futures': {'weight': (2400, 60), 'orders': (300, 10)},
+    'binance': {'weight': (6000, 60), 'orders': (100, 10)},
+    'bybit': {'rest': (600, 5), 'orders': (100, 60)},
+    'bitmex': {'rest': (120, 60)},
+}
+PAPER_LIMITS = {'rest': (600, 1)}
+
+
+class Priority(enum.IntEnum):
+    ORDER = 0
+    MONITOR = 1
+    INFO = 2
+
+
+# Share of every bucket a priority may not dip into, kept for the priorities above it
+RESERVES = {Priority.ORDER: 0.0, Priority.MONITOR: RATE_LIMIT_MONITOR_RESERVE, Priority.INFO: RATE_LIMIT_INFO_RESERVE}
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, window: float):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def available(self) -> float:
+        return min(self.capacity, self.tokens + (time.monotonic() - self.updated_at) * self.rate)
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, cost: float, reserve: float) -> float:
+        self.refill()
+        missing = cost + self.capacity * reserve - self.tokens
+        return max(missing, 0.0) / self.rate
+
+    def observe(self, used: float):
+        """
+        The exchange's count wins when it saw more usage than we did, e.g. other processes on the same IP
+        """
+        self.refill()
+        self.tokens = min(self.tokens, self.capacity - used)
+
+
+class Scheduler:
+    def __init__(self, name: str, limits: Dict[str, Tuple[float, float]]):
+        self.name = name
+        self.buckets = {endpoint: TokenBucket(*limit) for endpoint, limit in limits.items()}
+        self.waiting = {priority: 0 for priority in Priority}
+        self.paused_until = 0.0
+
+    def ahead(self, priority: Priority) -> bool:
+        return any(self.waiting[p] for p in Priority if p < priority)
+
+    async def acquire(self, priority: Priority, costs: Dict[str, float]):
+        self.waiting[priority] += 1
+        try:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.ahead(priority):
+                    wait = RATE_LIMIT_QUEUE_INTERVAL
+                elif wait <= 0:
+                    buckets = [(self.buckets[e], c) for e, c in costs.items() if e in self.buckets and c]
+                    wait = max([b.wait_time(c, RESERVES[priority]) for b, c in buckets], default=0.0)
+                    if wait <= 0:
+                        for bucket, cost in buckets:
+                            bucket.tokens -= cost
+                        return
+
+                await asyncio.sleep(wait)
+        finally:
+            self.waiting[priority] -= 1
+
+    def to_dict(self) -> dict:
+        return {
+            'waiting': {priority.name.lower(): count for priority, count in self.waiting.items()},
+            'paused_for': round(max(self.paused_until - time.monotonic(), 0.0), 1),
+            'tokens': {endpoint: round(bucket.available, 1) for endpoint, bucket in self.buckets.items()},
+        }
+
+    def observe(self, endpoint: str, used: float):
+        if endpoint in self.buckets:
+            self.buckets[endpoint].observe(used)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        for bucket in self.buckets.values():
+            bucket.tokens = 0.0
+        logger.error(f'{self.name} - Rate limited, pausing every request for {seconds}s')
+
+    def observe_ccxt(self, headers: dict | None):
+        """
+        BitMEX reports `x-ratelimit-remaining`, Bybit `x-bapi-limit-status` next to the limit itself
+        """
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+        for remaining_key, limit_key in [
+            ('x-ratelimit-remaining', 'x-ratelimit-limit'),
+            ('x-bapi-limit-status', 'x-bapi-limit'),
+        ]:
+            if headers.get(remaining_key) is not None and headers.get(limit_key) is not None:
+                bucket = self.buckets.get('rest')
+                if bucket:
+                    used = float(headers.get(limit_key)) - float(headers.get(remaining_key))
+                    bucket.observe(used * bucket.capacity / float(headers.get(limit_key)))
+                return
+
+
+_schedulers: Dict[str, Scheduler] = dict()
+
+
+def get_scheduler(name: str) -> Scheduler:
+    if name not in _schedulers:
+        limits = ujson.loads(RATE_LIMITS) if RATE_LIMITS else dict()
+        default = PAPER_LIMITS if name.startswith('paper-') else DEFAULT_LIMITS.get(name, PAPER_LIMITS)
+        _schedulers[name] = Scheduler(name=name, limits=limits.get(name) or default)
+    return _schedulers[name]
+
+
+def snapshot() -> Dict[str, dict]:
+    return {name: scheduler.to_dict() for name, scheduler in sorted(_schedulers.items())}
+
+
+# Priority and cost of the python-binance calls the bot makes, anything else counts as one weight of market data
+BINANCE_ENDPOINTS = {
+    'futures_create_order': (Priority.ORDER, {'weight': 1, 'orders': 1}),
+    'futures_place_batch_order': (Priority.ORDER, {'weight': 5, 'orders': 5}),
+    'futures_cancel_order': (Priority.ORDER, {'weight': 1}),
+    'futures_change_leverage': (Priority.ORDER, {'weight': 1}),
+    'futures_change_margin_type': (Priority.ORDER, {'weight': 1}),
+    'futures_get_order': (Priority.MONITOR, {'weight': 1}),
+    'futures_get_open_orders': (Priority.MONITOR, {'weight': 1}),
+    'futures_position_information': (Priority.MONITOR, {'weight': 5}),
+    'futures_order_book': (Priority.INFO, {'weight': 20}),
+    'futures_klines': (Priority.INFO, {'weight': 5}),
+    'get_historical_klines': (Priority.INFO, {'weight': 10}),
+    'futures_aggregate_trades': (Priority.INFO, {'weight': 20}),
+    'futures_symbol_ticker': (Priority.INFO, {'weight': 1}),
+    'create_order': (Priority.ORDER, {'weight': 1, 'orders': 1}),
+    'create_oco_order': (Priority.ORDER, {'weight': 1, 'orders': 2}),
+    'cancel_order': (Priority.ORDER, {'weight': 1}),
+    'get_order': (Priority.MONITOR, {'weight': 4}),
+    'get_open_orders': (Priority.MONITOR, {'weight': 6}),
+    'stream_get_listen_key': (Priority.MONITOR, {'weight': 2}),
+    'stream_keepalive': (Priority.MONITOR, {'weight': 2}),
+    'get_symbol_info': (Priority.INFO, {'weight': 20}),
+    'get_server_time': (Priority.INFO, {'weight': 1}),
+    'get_klines': (Priority.INFO, {'weight': 2}),
+}
+BINANCE_WEIGHT_HEADERS = {'weight': 'X-MBX-USED-WEIGHT-1M', 'orders': 'X-MBX-ORDER-COUNT-10S'}
+TIMESTAMP_OUTSIDE_RECV_WINDOW = -1021
+
+
+class ScheduledBinanceClient:
+    """
+    Wraps `binance.AsyncClient` so every REST call waits for its turn and feeds the used weight back. With a clock,
+    signed requests are stamped with the exchange's time and order calls take the lean signed path.
+    """
+
+    def __init__(self, client: binance.AsyncClient, scheduler: Scheduler, clock=None):
+        self.client = client
+        self.scheduler = scheduler
+        self.clock = clock
+        self.orders = SignedOrderPath(client, clock) if clock and client.API_SECRET and SIGNED_ORDER_PATH else None
+
+    def __getattr__(self, item):
+        attribute = getattr(self.client, item)
+        if item not in BINANCE_ENDPOINTS and not item.startswith('futures_'):
+            return attribute
+
+        priority, costs = BINANCE_ENDPOINTS.get(item, (Priority.INFO, {'weight': 1}))
+        if self.orders and item in ORDER_PATHS:
+            attribute = partial(self.orders.request, item)
+
+        async def call(*args, **kwargs):
+            await self.scheduler.acquire(priority, costs)
+            if self.clock:
+                self.client.timestamp_offset = int(self.clock.offset_ms)
+            name, endpoint = self.scheduler.name, priority.name.lower()
+            started = time.monotonic()
+            try:
+                response = await attribute(*args, **kwargs)
+            except BinanceAPIException as exc:
+                if exc.code == TIMESTAMP_OUTSIDE_RECV_WINDOW and self.clock:
+                    self.clock.resync()
+                if exc.status_code in [418, 429]:
+                    retry_after = exc.response.headers.get('Retry-After') if exc.response is not None else None
+                    self.scheduler.pause(float(retry_after) if retry_after else RATE_LIMIT_BACKOFF)
+                # Rejections of the request itself say nothing about the exchange's health
+                is_healthy = exc.status_code < 500 and exc.status_code not in [418, 429]
+                record(name, endpoint, ok=is_healthy, latency=time.monotonic() - started, error=str(exc))
+                raise exc
+            except Exception as exc:
+                record(name, endpoint, ok=False, latency=time.monotonic() - started, error=str(exc))
+                raise exc
+            finally:
+                self.observe()
+
+            record(name, endpoint, ok=True, latency=time.monotonic() - started)
+            return response
+
+        return call
+
+    def observe(self):
+        response = getattr(self.client, 'response', None)
+        if response is None:
+            return
+        for endpoint, header in BINANCE_WEIGHT_HEADERS.items():
+            used = response.headers.get(header)
+            if used is not None:
+                self.scheduler.observe(endpoint, float(used))
@@ -0,0 +1,143 @@
+"""
+Periodic reconciliation of the bot's trades against the exchange.
+
+Every `RECONCILE_INTERVAL` seconds each account is asked for its position and its open orders on the traded symbol,
+one request each however many trades are open. Exit legs of trades the bot no longer knows of are cancelled once the
+position they guarded is gone, registry entries of trades with neither a position nor an order left are dropped, and
+positions no trade accounts for are reported. The last answer of every account is kept: for as long as it is younger
+than `RECONCILE_MAX_AGE`, a pre-entry check that finds the symbol free there and in the registry enters without asking
+the exchange. Only a symbol seen taken, which may have freed up since, costs the alert a request.
+"""
+import asyncio
+import time
+from os import environ
+from typing import Callable, Dict, List
+
+from sanic.log import logger
+
+from goingfast.analytics import ENTRY_TAGS
+from goingfast.coordination import get_coordinator
+from goingfast.handover import get_handover
+from goingfast.traders.orderids import parse_client_order_id
+
+RECONCILE_INTERVAL = float(environ.get('RECONCILE_INTERVAL', '15'))
+RECONCILE_MAX_AGE = float(environ.get('RECONCILE_MAX_AGE', '30'))
+
+
+class ExchangeState:
+    """
+    Position and open orders of one account on one symbol, as the exchange answered at `fetched_at`
+    """
+
+    def __init__(self, position: bool | None, orders: List[dict], fetched_at: float):
+        # None on spot, where holding the asset says nothing about an open trade
+        self.position = position
+        self.orders = orders
+        self.fetched_at = fetched_at
+        self.untracked = False
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @property
+    def is_taken(self) -> bool:
+        return bool(self.position) or len(self.orders) > 0
+
+    def trade_orders(self, trade_id: str) -> List[dict]:
+        return [o for o in self.orders if (parse_client_order_id(o.get('client_id')) or (None,))[0] == trade_id]
+
+    def to_dict(self) -> dict:
+        return {
+            'position': self.position,
+            'orders': [o.get('client_id') or o.get('order_id') for o in self.orders],
+            'untracked': self.untracked,
+            'age': round(self.age, 3),
+        }
+
+
+def open_order(order_id, client_id: str | None) -> dict:
+    return {'order_id': order_id, 'client_id': client_id}
+
+
+# Keyed like the open trade registry, trader, account and symbol
+_states: Dict[str, ExchangeState] = dict()
+
+
+def get_exchange_state(key: str, max_age: float = RECONCILE_MAX_AGE) -> ExchangeState | None:
+    """
+    The last reconciliation of `key`, None when there is none recent enough to go by
+    """
+    state = _states.get(key)
+    if state is None or state.age > max_age:
+        return None
+    return state
+
+
+async def reconcile(trader) -> dict:
+    """
+    One pass over the account of `trader`, a trader built for no trade in particular
+    """
+    key = trader.trade_key
+    fetched_at = time.time()
+    state = ExchangeState(fetched_at=fetched_at, **await trader.exchange_state())
+
+    # Read after the exchange answered, every order it showed belongs to a trade that is known by now
+    coordinator = get_coordinator()
+    record = (await coordinator.open_trades()).get(key)
+    live = {t.trade_id for t in get_handover().traders() if t.trade_key == key}
+    known = live | ({record.get('trade_id')} if record else set())
+
+    cancelled = list()
+    for order in list(state.orders):
+        parsed = parse_client_order_id(order.get('client_id'))
+        # Entries of another process may rest on the book before their trade is registered
+        if not parsed or parsed[0] in known or parsed[1].startswith(ENTRY_TAGS):
+            continue
+        # With a position open the leg may be all that protects it, spot always counts as open
+        if state.position is not False:
+            continue
+        try:
+            await trader.cancel_order(order.get('order_id'))
+        except Exception as exc:
+            logger.error(f'{key} - Cancelling orphaned order {order.get("client_id")} failed: {exc!r}')
+            continue
+        logger.info(f'{key} - Cancelled orphaned order {order.get("client_id")}')
+        state.orders.remove(order)
+        cancelled.append(order.get('client_id'))
+
+    dropped = None
+    if record and state.position is False and not record.get('handover') and record.get('trade_id') not in live:
+        # Registered after the exchange answered, the position may not have been there yet
+        is_settled = record.get('opened_at', 0) < fetched_at
+        if is_settled and not state.trade_orders(record.get('trade_id')):
+            await coordinator.close_trade(key)
+            logger.info(f'{key} - Dropped trade {record.get("trade_id")}, nothing of it is left on the exchange')
+            dropped = record.get('trade_id')
+
+    state.untracked = bool(state.position) and not known
+    if state.untracked and not (_states.get(key) and _states.get(key).untracked):
+        logger.error(f'{key} - There is a position no trade of the bot accounts for, it is left alone')
+
+    _states[key] = state
+    return {'cancelled': cancelled, 'dropped': dropped, 'untracked': state.untracked}
+
+
+async def run(probes: Callable[[], list], interval: float = RECONCILE_INTERVAL):
+    """
+    Reconcile every account `probes` makes a trader for until the process starts handing its trades over
+    """
+    handover = get_handover()
+    while not handover.draining:
+        for trader in probes():
+            try:
+                await reconcile(trader)
+            except Exception as exc:
+                logger.error(f'{trader.trade_key} - Reconciliation failed: {exc!r}')
+            finally:
+                await trader.close_client()
+        await asyncio.sleep(interval)
+
+
+def snapshot() -> Dict[str, dict]:
+    return {key: state.to_dict() for key, state in _states.items()}
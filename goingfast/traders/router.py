@@ -0,0 +1,106 @@
+"""
+Route each alert to the cheapest healthy venue.
+
+With `TRADER=router` every trader in `ROUTER_TRADERS` stays configured and the router keeps their top of book warm in
+the background. Picking a venue only reads memory: the cost of crossing the spread, the taker fee and penalties for
+the venue's recent latency and error rate, in basis points. Venues with a stale book, too many errors or an open
+circuit breaker are skipped.
+"""
+import time
+from os import environ
+from typing import Dict, List
+
+import ujson
+from sanic.log import logger
+
+from goingfast.traders.base import Actions, BaseTrader
+from goingfast.traders.binancefutures import SYMBOL, BinanceFutures
+from goingfast.traders.binancespot import BinanceSpot
+from goingfast.traders.bookticker import BookTicker, get_book_ticker, get_ccxt_book_ticker
+from goingfast.traders.health import get_health
+
+ROUTER = 'router'
+ROUTER_TRADERS = environ.get('ROUTER_TRADERS', 'binance-futures,bybit,bitmex')
+ROUTER_FEES_BPS = environ.get('ROUTER_FEES_BPS')
+ROUTER_MAX_BOOK_AGE = float(environ.get('ROUTER_MAX_BOOK_AGE', '5'))
+ROUTER_MAX_ERROR_RATE = float(environ.get('ROUTER_MAX_ERROR_RATE', '0.5'))
+ROUTER_LATENCY_PENALTY_BPS = float(environ.get('ROUTER_LATENCY_PENALTY_BPS', '1'))
+ROUTER_ERROR_PENALTY_BPS = float(environ.get('ROUTER_ERROR_PENALTY_BPS', '20'))
+
+DEFAULT_FEES_BPS = {'binance-futures': 4, 'binance': 10, 'bybit': 7.5, 'bitmex': 7.5}
+
+
+def venue(name: str) -> str:
+    return name.replace('paper-', '')
+
+
+class Router:
+    def __init__(self, traders: Dict[str, type], names: List[str], fees_bps: Dict[str, float] | None = None):
+        unknown = [name for name in names if name not in traders]
+        if unknown:
+            raise ValueError(f'Router traders are not implemented: {unknown}')
+
+        self.traders = {name: traders.get(name) for name in names}
+        self.fees_bps = dict(DEFAULT_FEES_BPS, **(fees_bps or dict()))
+        self.tickers: Dict[str, BookTicker] = {name: self.ticker(name) for name in names}
+
+    def ticker(self, name: str) -> BookTicker:
+        trader_class = self.traders.get(name)
+        if issubclass(trader_class, BinanceFutures):
+            return get_book_ticker(SYMBOL)
+        if issubclass(trader_class, BinanceSpot):
+            return get_book_ticker(SYMBOL, market='binance')
+        return get_ccxt_book_ticker(exchange=venue(name), symbol=trader_class.normalized_symbol)
+
+    def start(self):
+        for ticker in self.tickers.values():
+            ticker.start()
+
+    def cost_bps(self, name: str, is_buy: bool) -> float | None:
+        """
+        Expected cost of a market entry on the venue, None when the venue should not be used
+        """
+        if not is_buy and issubclass(self.traders.get(name), BinanceSpot):
+            # Spot is long only
+            return None
+        ticker = self.tickers.get(name)
+        health = get_health(venue(name))
+        if not ticker.is_ready or ticker.age > ROUTER_MAX_BOOK_AGE or health.error_rate > ROUTER_MAX_ERROR_RATE:
+            return None
+        if not health.is_available or not get_health(name).is_available:
+            return None
+
+        mid = (ticker.bid + ticker.ask) / 2
+        spread = (ticker.ask - mid if is_buy else mid - ticker.bid) / mid * 10000
+        # Penalties are per 100 ms of smoothed latency and per unit of error rate
+        latency = (health.latency or 0.0) * 10 * ROUTER_LATENCY_PENALTY_BPS
+        errors = health.error_rate * ROUTER_ERROR_PENALTY_BPS
+        return spread + self.fees_bps.get(venue(name), 0.0) + latency + errors
+
+    def pick(self, action: Actions) -> str | None:
+        started = time.perf_counter()
+        costs = {name: self.cost_bps(name, is_buy=action == Actions.LONG) for name in self.traders}
+        usable = {name: cost for name, cost in costs.items() if cost is not None}
+        if not usable:
+            logger.error(f'Router - No healthy venue with a fresh book: {costs}')
+            return None
+
+        name = min(usable, key=usable.get)
+        elapsed = (time.perf_counter() - started) * 1000000
+        logger.info(f'Router - {action} - Picked {name} in {elapsed:.0f} us, costs in bps: {costs}')
+        return name
+
+    def record(self, trader: BaseTrader, ok: bool, error: str | None = None):
+        get_health(venue(trader.__name__)).record(ok=ok, error=error)
+
+
+_router: Router | None = None
+
+
+def get_router(traders: Dict[str, type]) -> Router:
+    global _router
+    if _router is None:
+        names = [name.strip() for name in ROUTER_TRADERS.split(',') if name.strip()]
+        fees = ujson.loads(ROUTER_FEES_BPS) if ROUTER_FEES_BPS else None
+        _router = Router(traders=traders, names=names, fees_bps=fees)
+    return _router
@@ -0,0 +1,66 @@
+"""
+Lean signed requests for Binance order endpoints, futures and spot.
+
+python-binance rebuilds the HMAC key, filters and sorts the parameters and joins the query string twice for every
+signed call. On the order path the query string is built once in the order given, stamped with the exchange clock and
+signed from a copy of an HMAC whose key schedule was computed when the client was created. Everything else keeps going
+through python-binance.
+"""
+import hashlib
+import hmac
+from os import environ
+from urllib.parse import quote
+
+import binance
+import ujson
+
+SIGNED_ORDER_PATH = environ.get('SIGNED_ORDER_PATH', '1') == '1'
+BINANCE_RECV_WINDOW = int(environ.get('BINANCE_RECV_WINDOW', '5000'))
+
+# API, HTTP method and path of the calls taking the lean path
+ORDER_PATHS = {
+    'futures_create_order': ('futures', 'post', 'order'),
+    'futures_place_batch_order': ('futures', 'post', 'batchOrders'),
+    'futures_cancel_order': ('futures', 'delete', 'order'),
+    'futures_get_order': ('futures', 'get', 'order'),
+    'create_order': ('spot', 'post', 'order'),
+    'create_oco_order': ('spot', 'post', 'order/oco'),
+    'cancel_order': ('spot', 'delete', 'order'),
+    'get_order': ('spot', 'get', 'order'),
+}
+
+
+class Signer:
+    def __init__(self, secret: str):
+        self.mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+    def sign(self, query: str) -> str:
+        mac = self.mac.copy()
+        mac.update(query.encode())
+        return mac.hexdigest()
+
+
+class SignedOrderPath:
+    def __init__(self, client: binance.AsyncClient, clock):
+        self.client = client
+        self.clock = clock
+        self.signer = Signer(client.API_SECRET)
+        self.urls = {'futures': client._create_futures_api_uri(''), 'spot': client._create_api_uri('')}
+
+    def query(self, params: dict) -> str:
+        query = '&'.join(f'{key}={quote(str(value), safe="")}' for key, value in params.items() if value is not None)
+        if 'recvWindow' not in params:
+            query = f'{query}&recvWindow={BINANCE_RECV_WINDOW}'
+        query = f'{query}&timestamp={self.clock.now_ms()}'
+        return f'{query}&signature={self.signer.sign(query)}'
+
+    async def request(self, name: str, **params) -> dict | list:
+        api, method, path = ORDER_PATHS.get(name)
+        if 'batchOrders' in params:
+            params['batchOrders'] = ujson.dumps(params.get('batchOrders'))
+
+        url = f'{self.urls[api]}{path}?{self.query(params)}'
+        async with getattr(self.client.session, method)(url, timeout=self.client.REQUEST_TIMEOUT) as response:
+            # Headers are read from here for the rate limits, same as python-binance's own requests
+            self.client.response = response
+            return await self.client._handle_response(response)
@@ -0,0 +1,137 @@
+"""
+Exact price and quantity arithmetic on integer tick counts.
+
+Every symbol trades on a grid, prices move by its tick size and quantities by its step size. A `Grid` turns exchange
+strings, env vars and floats into integer counts of that increment with an explicit rounding mode, all stop, TP and
+offset math is then plain integer arithmetic, and the wire format is written straight from the integers. Floats within
+`FLOAT_TOLERANCE` of a grid point are taken as that point, so binary noise like `0.30000000000000004` never moves a
+price by a tick.
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Tuple
+
+FLOAT_TOLERANCE = 1e-9
+
+
+# Same names as the `decimal` module, plain strings keep them cheap to hash in the parse cache
+ROUND_FLOOR = 'floor'
+ROUND_CEILING = 'ceiling'
+ROUND_HALF_UP = 'half-up'
+ROUND_HALF_EVEN = 'half-even'
+
+
+def divide(numerator: int, denominator: int, rounding: str) -> int:
+    """
+    `numerator / denominator` rounded to an integer, `denominator` is positive
+    """
+    if numerator % denominator == 0:
+        return numerator // denominator
+    quotient, remainder = divmod(numerator, denominator)
+    if rounding == ROUND_FLOOR:
+        return quotient
+    if rounding == ROUND_CEILING:
+        return quotient + 1
+
+    twice = 2 * remainder
+    if twice > denominator:
+        return quotient + 1
+    if twice < denominator:
+        return quotient
+    if rounding == ROUND_HALF_UP:
+        # Away from zero, `divmod` floors so a negative quotient is already the one further out
+        return quotient + 1 if numerator > 0 else quotient
+    return quotient + (quotient & 1)
+
+
+def fraction(text: str) -> Tuple[int, int]:
+    """
+    Exact value of a decimal string as numerator and a power of ten denominator
+    """
+    if 'e' in text or 'E' in text:
+        mantissa, _, exponent = text.lower().partition('e')
+        numerator, denominator = fraction(mantissa)
+        shift = int(exponent)
+        return (numerator * 10**shift, denominator) if shift >= 0 else (numerator, denominator * 10**-shift)
+
+    whole, _, decimals = text.partition('.')
+    # The sign stays in front of the digits, `int` takes care of it
+    return int(whole + decimals), 10 ** len(decimals)
+
+
+class Grid:
+    """
+    Integer counts of one increment, e.g. the tick size of a symbol's price
+    """
+
+    __slots__ = ('increment', 'units', 'decimals', 'scale', 'float_units')
+
+    def __init__(self, increment: str):
+        _, digits, exponent = Decimal(increment).normalize().as_tuple()
+        self.increment = increment
+        # The increment is `units` of 10 ** -decimals, e.g. 0.5 is 5 units of 0.1
+        self.decimals = max(-exponent, 0)
+        self.scale = 10**self.decimals
+        self.units = int(''.join(map(str, digits))) * 10 ** max(exponent, 0)
+        self.float_units = self.units / self.scale
+
+    def parse(self, value: str | int | float, rounding: str = ROUND_HALF_EVEN) -> int:
+        """
+        Number of increments in `value`
+        """
+        if type(value) is str:
+            return self.parse_text(value, rounding)
+        if isinstance(value, float):
+            return self.parse_float(value, rounding)
+        units = value * self.scale
+        if units % self.units == 0:
+            return units // self.units
+        return divide(units, self.units, rounding)
+
+    @lru_cache(maxsize=4096)
+    def parse_text(self, value: str, rounding: str = ROUND_HALF_EVEN) -> int:
+        # Mostly the same few prices and env vars over and over
+        numerator, denominator = fraction(value)
+        return divide(numerator * self.scale, denominator * self.units, rounding)
+
+    def parse_float(self, value: float, rounding: str = ROUND_HALF_EVEN) -> int:
+        count = value / self.float_units
+        nearest = round(count)
+        if abs(count - nearest) <= FLOAT_TOLERANCE:
+            return nearest
+        # Off the grid by more than binary noise, the float's exact decimal form decides
+        return self.parse_text(repr(value), rounding)
+
+    def scaled(self, count: int, factor: str | int | float, rounding: str = ROUND_HALF_EVEN) -> int:
+        """
+        `count` times an exact decimal `factor`, e.g. a risk reward ratio
+        """
+        numerator, denominator = fraction(str(factor))
+        return divide(count * numerator, denominator, rounding)
+
+    def format(self, count: int) -> str:
+        units = count * self.units
+        if not self.decimals:
+            return str(units)
+        if units < 0:
+            return '-' + self.format(-count)
+        text = str(units)
+        if len(text) <= self.decimals:
+            text = text.rjust(self.decimals + 1, '0')
+        return f'{text[:-self.decimals]}.{text[-self.decimals:]}'
+
+    def to_float(self, count: int) -> float:
+        return count * self.units / self.scale
+
+    def round(self, value: str | int | float, rounding: str = ROUND_HALF_EVEN) -> str:
+        return self.format(self.parse(value, rounding))
+
+
+_grids: Dict[str, Grid] = dict()
+
+
+def get_grid(increment: str | float) -> Grid:
+    key = str(increment)
+    if key not in _grids:
+        _grids[key] = Grid(key)
+    return _grids[key]
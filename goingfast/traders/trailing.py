@@ -0,0 +1,205 @@
+"""
+Exchange agnostic trailing stops.
+
+Each open trade with a trail keeps its high (long) or low (short) watermark from a mark price feed. The resting stop
+is only amended when the trailed price improves by at least one tick, and amends are debounced so a fast market
+costs at most one request per `TRAILING_STOP_MIN_INTERVAL` per trade. The trader supplies the amend call.
+"""
+import asyncio
+import math
+import time
+from os import environ
+from typing import Awaitable, Callable, Dict, Set
+
+import ccxt
+from sanic.log import logger
+
+from goingfast.traders.marketdata import get_hub
+from goingfast.traders.ratelimit import Priority, get_scheduler
+
+TRAILING_STOP_BY = environ.get('TRAILING_STOP_BY')
+TRAILING_STOP_MIN_INTERVAL = float(environ.get('TRAILING_STOP_MIN_INTERVAL', '2'))
+TRAILING_STOP_POLL_INTERVAL = float(environ.get('TRAILING_STOP_POLL_INTERVAL', '1'))
+
+Amend = Callable[[float], Awaitable[bool]]
+
+
+class PriceFeed:
+    """
+    Mark prices for one symbol fanned out to every trailing stop following it
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.subscribers: Set['TrailingStop'] = set()
+        self.task = None
+
+    def subscribe(self, trail: 'TrailingStop'):
+        self.subscribers.add(trail)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def unsubscribe(self, trail: 'TrailingStop'):
+        self.subscribers.discard(trail)
+        if not self.subscribers and self.task:
+            self.task.cancel()
+            self.task = None
+
+    def publish(self, price: float):
+        for trail in list(self.subscribers):
+            trail.on_price(price)
+
+    async def run(self):
+        raise NotImplementedError()
+
+
+class BinanceMarkPriceFeed(PriceFeed):
+    def on_message(self, data: dict):
+        self.publish(float(data.get('p')))
+
+    async def run(self):
+        # Subscribed on the hub for as long as a trail follows the symbol, cancelling the task drops the stream
+        stream = f'{self.symbol.lower()}@markPrice@1s'
+        hub = get_hub()
+        hub.subscribe(stream, self.on_message)
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            hub.unsubscribe(stream, self.on_message)
+
+
+class CcxtMarkPriceFeed(PriceFeed):
+    """
+    Polls the public ticker, for exchanges the bot only talks to through ccxt
+    """
+
+    def __init__(self, symbol: str, exchange: str, interval: float = TRAILING_STOP_POLL_INTERVAL):
+        super().__init__(symbol)
+        self.client = getattr(ccxt, exchange)({'enableRateLimit': True})
+        self.scheduler = get_scheduler(exchange)
+        self.interval = interval
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Trailing reads are monitoring, they give way to order placement near the limit
+            await self.scheduler.acquire(Priority.MONITOR, {'rest': 1})
+            try:
+                ticker = await loop.run_in_executor(None, self.client.fetch_ticker, self.symbol)
+                info = ticker.get('info') or dict()
+                mark = info.get('mark_price') or info.get('markPrice') or ticker.get('last')
+                self.publish(float(mark))
+            except ccxt.BaseError as exc:
+                logger.info(f'Mark price poll for {self.symbol} failed: {exc}')
+            await asyncio.sleep(self.interval)
+
+
+class TrailingStop:
+    def __init__(
+        self,
+        name: str,
+        is_long: bool,
+        stop_price: float,
+        trail_by: float,
+        tick_size: float,
+        amend: Amend,
+        activation_price: float | None = None,
+        min_interval: float = TRAILING_STOP_MIN_INTERVAL,
+    ):
+        self.name = name
+        self.is_long = is_long
+        self.stop_price = stop_price
+        self.trail_by = trail_by
+        self.tick_size = tick_size
+        self.amend = amend
+        self.activation_price = activation_price
+        self.min_interval = min_interval
+
+        self.watermark = None
+        self.amended_at = 0.0
+        self.amends = 0
+        self.pending = None
+        self.feed: PriceFeed | None = None
+
+    @property
+    def is_active(self) -> bool:
+        if self.activation_price is None:
+            return True
+        if self.is_long:
+            return self.watermark >= self.activation_price
+        return self.watermark <= self.activation_price
+
+    def target(self) -> float:
+        # Round away from the market so the stop never sits closer than `trail_by`
+        if self.is_long:
+            return math.floor((self.watermark - self.trail_by) / self.tick_size) * self.tick_size
+        return math.ceil((self.watermark + self.trail_by) / self.tick_size) * self.tick_size
+
+    def improves(self, price: float) -> bool:
+        if self.is_long:
+            return price - self.stop_price >= self.tick_size
+        return self.stop_price - price >= self.tick_size
+
+    def on_price(self, price: float):
+        if self.watermark is None:
+            self.watermark = price
+        self.watermark = max(self.watermark, price) if self.is_long else min(self.watermark, price)
+
+        if not self.is_active or self.pending is not None:
+            return
+
+        if self.improves(self.target()):
+            self.pending = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """
+        One amend at a time, waiting out the debounce window and sending the latest target when it ends
+        """
+        try:
+            wait = self.amended_at + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            target = self.target()
+            if not self.improves(target):
+                return
+
+            try:
+                amended = await self.amend(target)
+            except Exception as exc:
+                # Keep trailing, the next price update retries
+                logger.error(f'{self.name} - Failed amending trailing stop to {target}: {exc}')
+                return
+
+            if amended:
+                logger.info(f'{self.name} - Trailing stop moved from {self.stop_price} to {target}')
+                self.stop_price = target
+                self.amends += 1
+                self.amended_at = time.monotonic()
+            else:
+                # The stop is gone, either filled or cancelled, nothing left to trail
+                stop(self)
+        finally:
+            self.pending = None
+
+
+_feeds: Dict[str, PriceFeed] = dict()
+
+
+def get_feed(key: str, factory: Callable[[], PriceFeed]) -> PriceFeed:
+    if key not in _feeds:
+        _feeds[key] = factory()
+    return _feeds[key]
+
+
+def start(trail: TrailingStop, feed: PriceFeed):
+    trail.feed = feed
+    feed.subscribe(trail)
+    logger.info(f'{trail.name} - Trailing stop by {trail.trail_by} from {trail.stop_price}')
+
+
+def stop(trail: TrailingStop):
+    if trail.feed:
+        trail.feed.unsubscribe(trail)
+        trail.feed = None
+        logger.info(f'{trail.name} - Trailing stop finished after {trail.amends} amends')
@@ -0,0 +1,168 @@
+"""
+Binance spot user data streams.
+
+One WebSocket per API key delivers every order update of the account as it happens. Traders waiting on their exit
+legs are woken by the report that settles them instead of polling the order endpoint, the last report of every order
+is kept so an update that lands before anyone waits on it is not lost. The listen key is kept alive in the
+background and a dropped stream reconnects with a fresh key, traders still check the order endpoint now and then in
+case an update went missing while it was down.
+"""
+import asyncio
+from collections import OrderedDict
+from os import environ
+from typing import Dict, List, Set
+
+import ujson
+import websockets
+from binance.enums import ORDER_STATUS_FILLED
+from sanic.log import logger
+
+from goingfast.traders.marketdata import RECONNECT_DELAY, SPOT_STREAM_URL
+from goingfast.traders.ratelimit import ScheduledBinanceClient
+
+USER_STREAM_KEEPALIVE = float(environ.get('USER_STREAM_KEEPALIVE', '1800'))
+USER_STREAM_POLL_INTERVAL = float(environ.get('USER_STREAM_POLL_INTERVAL', '60'))
+USER_STREAM_REPORTS = 1000
+
+FINAL_ORDER_STATUSES = [ORDER_STATUS_FILLED, 'CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH']
+
+
+def to_order(report: dict) -> dict:
+    """
+    An `executionReport` in the shape the order endpoint answers with
+    """
+    return {
+        'symbol': report.get('s'),
+        'orderId': report.get('i'),
+        'orderListId': report.get('g'),
+        'clientOrderId': report.get('c'),
+        'side': report.get('S'),
+        'type': report.get('o'),
+        'status': report.get('X'),
+        'price': report.get('p'),
+        'stopPrice': report.get('P'),
+        'origQty': report.get('q'),
+        'executedQty': report.get('z'),
+        'cummulativeQuoteQty': report.get('Z'),
+    }
+
+
+class Watch:
+    """
+    Settles on the first of its orders to fill, or once all of them ended without a fill
+    """
+
+    def __init__(self, order_ids: List[int]):
+        self.order_ids = set(order_ids)
+        self.future = asyncio.get_running_loop().create_future()
+
+    def check(self, orders: Dict[int, dict]):
+        if self.future.done():
+            return
+        known = [orders.get(i) for i in self.order_ids]
+        for order in known:
+            if order and order.get('status') == ORDER_STATUS_FILLED:
+                self.future.set_result(order)
+                return
+        if all(order and order.get('status') in FINAL_ORDER_STATUSES for order in known):
+            self.future.set_result(known[0])
+
+
+class UserStream:
+    def __init__(self, client: ScheduledBinanceClient):
+        self.client = client
+        self.orders: OrderedDict = OrderedDict()
+        self.watches: Set[Watch] = set()
+
+        self.connected = asyncio.Event()
+        self.task = None
+
+    def to_dict(self) -> dict:
+        return {'connected': self.connected.is_set(), 'orders': len(self.orders), 'watches': len(self.watches)}
+
+    def on_message(self, data: dict):
+        if data.get('e') == 'executionReport':
+            self.observe(to_order(data))
+
+    def observe(self, order: dict):
+        """
+        Record the latest state of an order, from the stream or from the order endpoint
+        """
+        self.orders[order.get('orderId')] = order
+        self.orders.move_to_end(order.get('orderId'))
+        while len(self.orders) > USER_STREAM_REPORTS:
+            self.orders.popitem(last=False)
+
+        if order.get('status') in FINAL_ORDER_STATUSES:
+            for watch in [w for w in self.watches if order.get('orderId') in w.order_ids]:
+                watch.check(self.orders)
+
+    async def wait_final(self, order_ids: List[int], timeout: float) -> dict | None:
+        """
+        The order that settled the watch, None when nothing settled within `timeout`
+        """
+        watch = Watch(order_ids)
+        watch.check(self.orders)
+        self.watches.add(watch)
+        try:
+            return await asyncio.wait_for(asyncio.shield(watch.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.watches.discard(watch)
+
+    async def keepalive(self, listen_key: str):
+        while True:
+            await asyncio.sleep(USER_STREAM_KEEPALIVE)
+            try:
+                await self.client.stream_keepalive(listenKey=listen_key)
+            except Exception as exc:
+                logger.info(f'User data stream keepalive failed: {exc!r}')
+
+    async def run(self):
+        while True:
+            keepalive = None
+            try:
+                listen_key = await self.client.stream_get_listen_key()
+                keepalive = asyncio.get_running_loop().create_task(self.keepalive(listen_key))
+                async with websockets.connect(f'{SPOT_STREAM_URL}{listen_key}') as ws:
+                    self.connected.set()
+                    logger.debug('User data stream connected')
+                    async for raw in ws:
+                        self.on_message(ujson.loads(raw))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.info(f'User data stream dropped: {exc!r}, reconnecting')
+            finally:
+                self.connected.clear()
+                if keepalive:
+                    keepalive.cancel()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def wait_ready(self, timeout: float = 5) -> bool:
+        self.start()
+        try:
+            await asyncio.wait_for(self.connected.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+_streams: Dict[str, UserStream] = dict()
+
+
+def get_user_stream(client: ScheduledBinanceClient) -> UserStream:
+    key = client.client.API_KEY
+    if key not in _streams:
+        _streams[key] = UserStream(client=client)
+    return _streams[key]
+
+
+def snapshot() -> Dict[str, dict]:
+    # Named after the start of the API key, the rest of it stays out of reports
+    return {f'{(key or "")[:8]}...': stream.to_dict() for key, stream in _streams.items()}
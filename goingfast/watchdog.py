@@ -0,0 +1,157 @@
+"""
+Event loop lag watchdog.
+
+A heartbeat task sleeps `LOOP_WATCHDOG_INTERVAL` seconds at a time and records how late it wakes up into a histogram,
+every webhook and trade on the loop waits at least that long. A thread checks the heartbeat in between: once it is
+overdue by `LOOP_BLOCK_THRESHOLD_MS` the loop is blocked by synchronous work, so the thread captures the loop's stack
+right then, while the offending call is still on it. Blocking call sites are counted by the innermost frame of our own
+code, so a new regression shows up as a new site.
+"""
+import asyncio
+import bisect
+import sys
+import threading
+import time
+from collections import Counter, deque
+from os import environ
+
+from sanic.log import logger
+
+from goingfast.profiling import frame_name
+
+LOOP_WATCHDOG_INTERVAL = float(environ.get('LOOP_WATCHDOG_INTERVAL', '0.1'))
+LOOP_BLOCK_THRESHOLD_MS = float(environ.get('LOOP_BLOCK_THRESHOLD_MS', '100'))
+LOOP_BLOCK_HISTORY = int(environ.get('LOOP_BLOCK_HISTORY', '50'))
+
+LAG_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+STACK_DEPTH = 30
+PACKAGE = 'goingfast'
+
+
+def capture(frame) -> tuple[list, str]:
+    """
+    Innermost first stack with line numbers, and the innermost frame of our own code as the call site
+    """
+    stack = list()
+    site = None
+    while frame is not None and len(stack) < STACK_DEPTH:
+        name = f'{frame_name(frame)}:{frame.f_lineno}'
+        stack.append(name)
+        if site is None and PACKAGE in frame.f_code.co_filename:
+            site = name
+        frame = frame.f_back
+    return stack, site or (stack[0] if stack else 'unknown')
+
+
+class LoopWatchdog:
+    def __init__(self, interval: float = LOOP_WATCHDOG_INTERVAL, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS):
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+        self.blocks = deque(maxlen=LOOP_BLOCK_HISTORY)
+        self.sites = Counter()
+        self.pending = None
+
+        self.loop = None
+        self.thread_id = None
+        self.beat_at = time.monotonic()
+        self.task = None
+        self.thread = None
+
+    def observe(self, lag_ms: float):
+        self.counts[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.count += 1
+        self.sum_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+
+        block, self.pending = self.pending, None
+        if block is not None:
+            # The loop is back, the whole stall is known now
+            block['blocked_ms'] = round(lag_ms, 1)
+            logger.warning(f'Event loop blocked for {lag_ms:.0f} ms at {block["site"]}')
+
+    async def beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.beat_at = now
+            self.observe(max(now - expected, 0.0) * 1000)
+
+    def watch(self):
+        while True:
+            time.sleep(self.interval / 2)
+            overdue_ms = (time.monotonic() - self.beat_at - self.interval) * 1000
+            if overdue_ms < self.threshold_ms or self.pending is not None:
+                continue
+
+            task = asyncio.current_task(self.loop)
+            stack, site = capture(sys._current_frames().get(self.thread_id))
+            block = {
+                'at': time.time(),
+                'blocked_ms': round(overdue_ms, 1),
+                'task': task.get_name() if task else None,
+                'site': site,
+                'stack': stack,
+            }
+            self.sites[site] += 1
+            self.blocks.append(block)
+            self.pending = block
+
+    def start(self):
+        if self.task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.thread_id = threading.get_ident()
+        self.beat_at = time.monotonic()
+        self.task = self.loop.create_task(self.beat())
+        self.thread = threading.Thread(target=self.watch, name='loop-watchdog', daemon=True)
+        self.thread.start()
+
+    def histogram(self) -> dict:
+        cumulative = 0
+        buckets = dict()
+        for bound, count in zip([*LAG_BUCKETS_MS, '+Inf'], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return buckets
+
+    def to_dict(self) -> dict:
+        return {
+            'lag_ms': {
+                'buckets': self.histogram(),
+                'count': self.count,
+                'sum': round(self.sum_ms, 1),
+                'max': round(self.max_ms, 1),
+            },
+            'threshold_ms': self.threshold_ms,
+            'sites': dict(self.sites.most_common()),
+            'blocks': list(self.blocks),
+        }
+
+    def prometheus(self) -> str:
+        lines = ['# TYPE goingfast_loop_lag_seconds histogram']
+        for bound, count in self.histogram().items():
+            le = bound if bound == '+Inf' else f'{float(bound) / 1000:g}'
+            lines.append(f'goingfast_loop_lag_seconds_bucket{{le="{le}"}} {count}')
+        lines.append(f'goingfast_loop_lag_seconds_sum {self.sum_ms / 1000:.6f}')
+        lines.append(f'goingfast_loop_lag_seconds_count {self.count}')
+        lines.append('# TYPE goingfast_loop_blocks_total counter')
+        for site, count in self.sites.most_common():
+            lines.append(f'goingfast_loop_blocks_total{{site="{site}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+_watchdog: LoopWatchdog | None = None
+
+
+def get_watchdog() -> LoopWatchdog:
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = LoopWatchdog()
+    return _watchdog
@@ -0,0 +1,5 @@
+import os
+
+# Read at import by the traders, the package imports all of them
+os.environ.setdefault('LEVERAGE', '10')
+os.environ.setdefault('CAPITAL_IN_USD', '100')
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from goingfast.analytics import Aggregate, Analytics, merge
+
+
+def test_merge_computes_pnl_and_slippage():
+    context = {'action': 'long', 'entry_price': 101.0, 'close': 100.0, 'leverage': 10, 'strategy': 'breakout'}
+    trade = merge(context, {'trade_id': 'abc', 'account': 'main', 'exit_price': 111.1})
+    assert trade.get('pnl_percent') == pytest.approx(100.0)
+    assert trade.get('slippage_bps') == pytest.approx(100.0)
+    assert trade.get('strategy') == 'breakout'
+    assert trade.get('indicator') == 'unknown'
+    assert trade.get('source') == 'bot'
+    assert trade.get('fees') == 0.0
+
+
+def test_merge_short():
+    context = {'action': 'short', 'entry_price': 99.0, 'close': 100.0}
+    trade = merge(context, {'exit_price': 89.1})
+    assert trade.get('pnl_percent') == pytest.approx(10.0)
+    # Sold below the alert's close, worse for a short
+    assert trade.get('slippage_bps') == pytest.approx(100.0)
+
+
+def test_merge_prefers_the_record():
+    context = {'action': 'long', 'entry_price': 100.0}
+    trade = merge(context, {'entry_price': 102.0, 'exit_price': 90.0, 'pnl_percent': -5.0, 'source': 'exchange'})
+    assert trade.get('entry_price') == 102.0
+    assert trade.get('pnl_percent') == -5.0
+    assert trade.get('source') == 'exchange'
+
+
+def test_merge_needs_prices():
+    assert merge({'action': 'long'}, {'exit_price': 100.0}) is None
+
+
+def test_aggregate():
+    aggregate = Aggregate()
+    aggregate.add({'pnl_percent': 10.0, 'fees': 1.0, 'pnl': 5.0, 'slippage_bps': 2.0, 'latency_ms': 40})
+    aggregate.add({'pnl_percent': -4.0, 'fees': 1.0, 'pnl': -2.0, 'latency_ms': 300})
+    report = aggregate.to_dict()
+    assert report.get('trades') == 2
+    assert report.get('win_rate') == 0.5
+    assert report.get('expectancy_percent') == 3.0
+    assert report.get('average_win_percent') == 10.0
+    assert report.get('average_loss_percent') == -4.0
+    assert report.get('pnl') == 3.0
+    assert report.get('fees') == 2.0
+    assert report.get('average_slippage_bps') == 2.0
+    assert report.get('latency_ms') == {'p50': 50, 'p90': 500, 'p99': 500}
+
+
+def test_aggregate_backs_out_a_trade():
+    trade = {'pnl_percent': 10.0, 'fees': 1.0, 'latency_ms': 20000}
+    aggregate = Aggregate()
+    aggregate.add(trade)
+    assert aggregate.percentile(0.5) == '+Inf'
+    aggregate.add(trade, sign=-1)
+    assert aggregate.to_dict().get('trades') == 0
+    assert aggregate.percentile(0.5) is None
+
+
+def test_exchange_record_replaces_the_bot_record():
+    analytics = Analytics(journal=None)
+    analytics.open_trade({'trade_id': 'abc', 'account': 'main', 'action': 'long', 'entry_price': 100.0})
+    assert analytics.close_trade({'trade_id': 'abc', 'account': 'main', 'exit_price': 110.0})
+    assert analytics.close_trade(
+        {'trade_id': 'abc', 'account': 'main', 'entry_price': 100.0, 'exit_price': 105.0, 'source': 'exchange'}
+    )
+    assert not analytics.close_trade({'trade_id': 'abc', 'account': 'main', 'exit_price': 120.0})
+    report = analytics.to_dict()
+    assert report.get('all').get('trades') == 1
+    assert report.get('all').get('expectancy_percent') == 5.0
+
+
+def test_journal_is_replayed(tmp_path):
+    journal = str(tmp_path / 'journal.jsonl')
+    first, second = Analytics(journal=journal), Analytics(journal=journal)
+    first.open_trade({'trade_id': 'abc', 'account': 'main', 'action': 'long', 'entry_price': 100.0})
+    first.close_trade({'trade_id': 'abc', 'account': 'main', 'exit_price': 110.0})
+    second.open_trade({'trade_id': 'def', 'account': 'alt', 'action': 'long', 'entry_price': 100.0})
+    second.close_trade({'trade_id': 'def', 'account': 'alt', 'exit_price': 90.0})
+    second.executor.shutdown(wait=True)
+
+    assert first.to_dict().get('all').get('trades') == 1
+    assert asyncio.run(first.merged()).get('all').get('trades') == 2
+
+    first.executor.shutdown(wait=True)
+    replayed = Analytics(journal=journal)
+    replayed.load()
+    assert replayed.to_dict().get('all').get('trades') == 2
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+
+import pytest
+
+from goingfast.traders import binancefutures
+from goingfast.traders.base import Actions
+from goingfast.traders.binancefutures import BinanceFutures
+from goingfast.traders.ladder import LEG_CANCELED, LEG_FILLED, LEG_OPEN
+
+# A market order placed with `newOrderRespType=RESULT`, filled at `avgPrice` while `price` stays "0"
+ENTRY_RESPONSE = {
+    'orderId': 3358934541,
+    'symbol': 'BTCUSDT',
+    'status': 'FILLED',
+    'clientOrderId': 'gf0123456789ab-e',
+    'price': '0',
+    'avgPrice': '23456.70000',
+    'origQty': '0.004',
+    'executedQty': '0.004',
+    'type': 'MARKET',
+    'side': 'BUY',
+}
+
+
+class Client:
+    def __init__(self, orders: dict):
+        self.orders = orders
+
+    async def futures_get_order(self, symbol: str, orderId: int) -> dict:
+        return self.orders[orderId]
+
+    async def futures_cancel_order(self, symbol: str, orderId: int) -> dict:
+        return dict(self.orders[orderId], status='CANCELED')
+
+    async def close_connection(self):
+        pass
+
+
+@pytest.fixture
+def trader(monkeypatch):
+    monkeypatch.setattr(BinanceFutures, 'make_binance_client', lambda self: None)
+    trader = BinanceFutures(
+        action=Actions.LONG,
+        quantity=100,
+        logger=logging.getLogger('test'),
+        metadata=None,
+        symbol='BTCUSDT',
+        price_precision=1,
+        qty_precision=3,
+        leverage=10,
+    )
+    trader.last_price = 23450.0
+    return trader
+
+
+def test_entry_price_is_the_average_fill(trader):
+    trader.entry_order = dict(ENTRY_RESPONSE)
+    assert trader.entry_price == '23456.7'
+    assert trader.entry_filled_quantity == 0.004
+    assert trader.entry_executed_qty == 0.004
+
+
+def test_partial_fill(trader):
+    trader.entry_order = dict(ENTRY_RESPONSE, status='PARTIALLY_FILLED', avgPrice='23456.75', executedQty='0.002')
+    assert trader.entry_price == '23456.8'
+    assert trader.entry_filled_quantity == 0.002
+
+
+def test_entry_without_a_result_falls_back(trader):
+    # An ACK response has neither the fill price nor the filled quantity yet
+    trader.entry_order = dict(ENTRY_RESPONSE, price='23450.1', avgPrice='0.00000', executedQty='0')
+    assert trader.entry_price == '23450.1'
+    assert trader.entry_filled_quantity == float(trader.quantity_in_asset)
+
+
+def test_no_entry(trader):
+    trader.entry_order = dict()
+    assert trader.entry_ticks == 0
+    assert trader.entry_filled_quantity == float(trader.quantity_in_asset)
+
+
+def test_ladder_counts_only_filled_legs(trader):
+    trader.binance_client = Client({1: {'status': 'FILLED'}, 2: {'status': 'EXPIRED'}, 3: {'status': 'NEW'}})
+    trader.tp_legs = [{'price': 23500.0 + i, 'quantity': 0.001, 'order_id': i, 'status': LEG_OPEN} for i in (1, 2, 3)]
+
+    filled = asyncio.run(trader.settle_legs(open_ids={3}))
+    assert [leg.get('order_id') for leg in filled] == [1]
+    assert [leg.get('status') for leg in trader.tp_legs] == [LEG_FILLED, LEG_CANCELED, LEG_OPEN]
+
+
+@pytest.mark.parametrize(
+    'action, stop_fill, expected',
+    [(Actions.LONG, '23500.00', 1.85), (Actions.LONG, '23400.00', -2.42), (Actions.SHORT, '23400.00', 2.42)],
+)
+def test_stop_exit_pnl_is_signed(trader, monkeypatch, action, stop_fill, expected):
+    async def send_exit_message(**kwargs):
+        pass
+
+    exits = list()
+    monkeypatch.setattr(binancefutures, 'send_exit_message', send_exit_message)
+    monkeypatch.setattr(binancefutures, 'MINIMUM_ATR_VALUE', '50')
+    monkeypatch.setattr(trader, 'record_exit', lambda **kwargs: exits.append(kwargs))
+
+    trader.action = action
+    trader.entry_order = dict(ENTRY_RESPONSE, side='BUY' if action == Actions.LONG else 'SELL')
+    trader.exit_order = {'orderId': 1}
+    trader.stop_order = {'orderId': 2}
+    # A trailed stop may fill on the winning side of the entry
+    trader.binance_client = Client({1: {'status': 'NEW'}, 2: {'status': 'FILLED', 'avgPrice': stop_fill}})
+
+    asyncio.run(trader.post_exit())
+    assert exits[0].get('pnl_percent') == pytest.approx(expected, abs=0.01)
+    assert exits[0].get('exit_price') == float(stop_fill)
+
+
+def test_entry_record_skips_a_zero_average(trader):
+    trader.entry_order = dict(ENTRY_RESPONSE, price='23450.1', avgPrice='0.00000')
+    assert trader.entry_record().get('entry_price') == 23450.1
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import time
+
+from binance.enums import SIDE_BUY
+
+from goingfast.traders.chaser import PostOnlyChaser
+
+
+class BusyTicker:
+    """
+    A book whose ask ticks all the time while the bid stays put
+    """
+
+    bid = 100.0
+    ask = 100.1
+
+    async def wait_ready(self) -> bool:
+        return True
+
+    async def wait_change(self, timeout: float) -> bool:
+        await asyncio.sleep(min(0.005, timeout))
+        self.ask = 100.2 if self.ask == 100.1 else 100.1
+        return True
+
+
+class Client:
+    def __init__(self):
+        self.polls = 0
+
+    async def futures_get_order(self, symbol: str, orderId: int) -> dict:
+        self.polls += 1
+        return {'orderId': orderId, 'price': '100.0', 'status': 'FILLED', 'executedQty': '0.010'}
+
+
+def test_busy_book_does_not_delay_the_fill():
+    client = Client()
+    created = list()
+
+    async def create_order(**params) -> dict:
+        created.append(params)
+        return {'orderId': len(created), 'price': params.get('price'), 'status': 'NEW', 'executedQty': '0'}
+
+    chaser = PostOnlyChaser(
+        binance_client=client,
+        create_order=create_order,
+        ticker=BusyTicker(),
+        symbol='BTCUSDT',
+        side=SIDE_BUY,
+        price_precision=1,
+        qty_precision=3,
+        logger=logging.getLogger('test'),
+        timeout=5,
+        poll_interval=0.05,
+    )
+
+    started = time.monotonic()
+    children = asyncio.run(chaser.execute(quantity=0.01))
+    assert time.monotonic() - started < 1
+    assert client.polls == 1
+    assert [child.get('status') for child in children] == ['FILLED']
+    assert [order.get('tag') for order in created] == ['c']
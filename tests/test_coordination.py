@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from goingfast.coordination import LockTimeout, MemoryCoordinator, SqliteCoordinator
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def coordinator(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCoordinator()
+    return SqliteCoordinator(str(tmp_path / 'state.db'))
+
+
+def test_lock_is_exclusive(coordinator):
+    async def scenario():
+        assert await coordinator.acquire('BTCUSDT', 'a', ttl=10)
+        assert not await coordinator.acquire('BTCUSDT', 'b', ttl=10)
+        assert await coordinator.acquire('ETHUSDT', 'b', ttl=10)
+        # Only the holder releases it
+        await coordinator.release('BTCUSDT', 'b')
+        assert not await coordinator.acquire('BTCUSDT', 'b', ttl=10)
+        await coordinator.release('BTCUSDT', 'a')
+        assert await coordinator.acquire('BTCUSDT', 'b', ttl=10)
+
+    asyncio.run(scenario())
+
+
+def test_lock_expires(coordinator):
+    async def scenario():
+        assert await coordinator.acquire('BTCUSDT', 'a', ttl=0.05)
+        await asyncio.sleep(0.1)
+        assert await coordinator.acquire('BTCUSDT', 'b', ttl=10)
+
+    asyncio.run(scenario())
+
+
+def test_lock_serializes_entries(coordinator):
+    entered = list()
+
+    async def enter(name: str):
+        async with coordinator.lock('BTCUSDT', timeout=5):
+            entered.append(f'{name} in')
+            await asyncio.sleep(0.02)
+            entered.append(f'{name} out')
+
+    async def scenario():
+        await asyncio.gather(enter('a'), enter('b'))
+
+    asyncio.run(scenario())
+    assert entered in (['a in', 'a out', 'b in', 'b out'], ['b in', 'b out', 'a in', 'a out'])
+
+
+def test_lock_times_out(coordinator):
+    async def scenario():
+        await coordinator.acquire('BTCUSDT', 'a', ttl=10)
+        with pytest.raises(LockTimeout):
+            async with coordinator.lock('BTCUSDT', timeout=0.05):
+                pass
+
+    asyncio.run(scenario())
+
+
+def test_claim_once_until_it_expires(coordinator):
+    async def scenario():
+        assert await coordinator.claim('alert:abc', ttl=0.05)
+        assert not await coordinator.claim('alert:abc', ttl=0.05)
+        assert await coordinator.claim('alert:def', ttl=0.05)
+        await asyncio.sleep(0.1)
+        assert await coordinator.claim('alert:abc', ttl=10)
+
+    asyncio.run(scenario())
+
+
+def test_open_trades(coordinator):
+    async def scenario():
+        await coordinator.open_trade('binance-futures:main:BTCUSDT', {'trade_id': 'abc', 'opened_at': time.time()})
+        await coordinator.open_trade('binance-futures:alt:BTCUSDT', {'trade_id': 'def'}, ttl=0.05)
+        await asyncio.sleep(0.1)
+        trades = await coordinator.open_trades()
+        assert list(trades) == ['binance-futures:main:BTCUSDT']
+        assert trades['binance-futures:main:BTCUSDT'].get('trade_id') == 'abc'
+        await coordinator.close_trade('binance-futures:main:BTCUSDT')
+        assert await coordinator.open_trades() == {}
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_is_shared_between_coordinators(tmp_path):
+    path = str(tmp_path / 'state.db')
+    first, second = SqliteCoordinator(path), SqliteCoordinator(path)
+
+    async def scenario():
+        assert await first.claim('alert:abc', ttl=10)
+        assert not await second.claim('alert:abc', ttl=10)
+        assert await first.acquire('BTCUSDT', 'a', ttl=10)
+        assert not await second.acquire('BTCUSDT', 'b', ttl=10)
+        await first.open_trade('key', {'trade_id': 'abc'})
+        assert await second.open_trades() == {'key': {'trade_id': 'abc'}}
+
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+import importlib
+import pkgutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+
+@pytest.mark.parametrize('module', ['goingfast', 'app'])
+def test_entry_points_import_in_a_fresh_interpreter(module):
+    # Every submodule pulls the package in first, a circular import there breaks all of them
+    result = subprocess.run([sys.executable, '-c', f'import {module}'], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_every_module_imports():
+    import goingfast
+
+    for module in pkgutil.walk_packages(goingfast.__path__, 'goingfast.'):
+        importlib.import_module(module.name)
@@ -0,0 +1,98 @@
+import pytest
+
+from goingfast.traders.ladder import (
+    LEG_CANCELED,
+    LEG_FILLED,
+    LEG_OPEN,
+    build_legs,
+    filled_quantity,
+    missing_legs,
+    open_legs,
+    parse_ladder,
+    update_legs,
+)
+
+
+def round_price(price: float) -> float:
+    return round(price, 1)
+
+
+def round_quantity(quantity: float) -> float:
+    return int(quantity * 1000) / 1000
+
+
+def test_parse_ladder_rejects_bad_legs():
+    assert parse_ladder(None) is None
+    assert parse_ladder('[{"fraction": 0.5, "rr": 1}]') == [{'fraction': 0.5, 'rr': 1}]
+    with pytest.raises(ValueError):
+        parse_ladder([{'fraction': 0, 'rr': 1}])
+    with pytest.raises(ValueError):
+        parse_ladder([{'fraction': 0.5}])
+    with pytest.raises(ValueError):
+        parse_ladder([{'fraction': 0.6, 'rr': 1}, {'fraction': 0.6, 'rr': 2}])
+
+
+def test_build_legs_long():
+    ladder = [{'fraction': 0.5, 'rr': 1}, {'fraction': 0.5, 'tp_delta': 300}]
+    legs = build_legs(ladder, True, 1000.0, 900.0, 0.01, round_price, round_quantity)
+    assert [leg.get('price') for leg in legs] == [1100.0, 1300.0]
+    assert [leg.get('quantity') for leg in legs] == [0.005, 0.005]
+    assert all(leg.get('status') == LEG_OPEN and leg.get('order_id') is None for leg in legs)
+
+
+def test_build_legs_short():
+    ladder = [{'fraction': 0.5, 'rr': 2}, {'fraction': 0.5, 'rr': 3}]
+    legs = build_legs(ladder, False, 1000.0, 1050.0, 0.01, round_price, round_quantity)
+    assert [leg.get('price') for leg in legs] == [900.0, 850.0]
+
+
+def test_build_legs_last_leg_takes_the_remainder():
+    ladder = [{'fraction': 1 / 3, 'rr': 1}, {'fraction': 1 / 3, 'rr': 2}, {'fraction': 1 / 3, 'rr': 3}]
+    legs = build_legs(ladder, True, 1000.0, 900.0, 0.01, round_price, round_quantity)
+    assert [leg.get('quantity') for leg in legs] == [0.003, 0.003, 0.004]
+
+
+def test_build_legs_drops_empty_legs():
+    ladder = [{'fraction': 0.01, 'rr': 1}, {'fraction': 0.5, 'rr': 2}]
+    legs = build_legs(ladder, True, 1000.0, 900.0, 0.01, round_price, round_quantity)
+    assert len(legs) == 1
+    assert legs[0].get('price') == 1200.0
+
+
+def make_legs() -> list:
+    return [{'price': 1100.0 + i, 'quantity': 0.005, 'order_id': i, 'status': LEG_OPEN} for i in (1, 2, 3)]
+
+
+def test_missing_legs():
+    legs = make_legs()
+    legs[2]['status'] = LEG_FILLED
+    assert [leg.get('order_id') for leg in missing_legs(legs, {2})] == [1]
+
+
+def test_update_legs_settles_by_status():
+    legs = make_legs()
+    filled = update_legs(legs, {1: 'FILLED', 2: 'EXPIRED'})
+    assert [leg.get('order_id') for leg in filled] == [1]
+    assert [leg.get('status') for leg in legs] == [LEG_FILLED, LEG_CANCELED, LEG_OPEN]
+    assert filled_quantity(legs) == 0.005
+    assert [leg.get('order_id') for leg in open_legs(legs)] == [3]
+
+
+def test_update_legs_takes_ccxt_statuses():
+    legs = make_legs()
+    filled = update_legs(legs, {1: 'closed', 2: 'canceled', 3: 'rejected'})
+    assert [leg.get('order_id') for leg in filled] == [1]
+    assert not open_legs(legs)
+
+
+def test_update_legs_keeps_unknown_legs_open():
+    legs = make_legs()
+    assert update_legs(legs, {1: None, 2: 'NEW', 3: 'PARTIALLY_FILLED'}) == []
+    assert len(open_legs(legs)) == 3
+
+
+def test_update_legs_does_not_fill_twice():
+    legs = make_legs()
+    update_legs(legs, {1: 'FILLED'})
+    assert update_legs(legs, {1: 'FILLED'}) == []
+    assert filled_quantity(legs) == 0.005
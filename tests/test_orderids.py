@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from goingfast.traders import orderids
+from goingfast.traders.orderids import alert_id, client_order_id, parse_client_order_id, submit
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(orderids, 'ORDER_RETRY_DELAY', 0)
+    monkeypatch.setattr(orderids, 'ORDER_RECV_WINDOW', 0)
+    monkeypatch.setattr(orderids, 'RECV_WINDOW_MARGIN', 0)
+
+
+class Exchange:
+    """
+    Answers `create` and `lookup` from scripted outcomes, an exception is raised and anything else returned
+    """
+
+    def __init__(self, creates: list, lookups: list = ()):
+        self.creates = list(creates)
+        self.lookups = list(lookups)
+        self.created = 0
+        self.looked_up = 0
+
+    async def create(self) -> dict:
+        self.created += 1
+        return self.answer(self.creates.pop(0))
+
+    async def lookup(self) -> dict | None:
+        self.looked_up += 1
+        return self.answer(self.lookups.pop(0))
+
+    @staticmethod
+    def answer(outcome):
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def run_submit(exchange: Exchange, retries: int = 2) -> dict:
+    return asyncio.run(submit('test', 'gfabc-e', exchange.create, exchange.lookup, timeout=1, retries=retries))
+
+
+def test_submit_first_try():
+    exchange = Exchange(creates=[{'id': 1}])
+    assert run_submit(exchange) == {'id': 1}
+    assert exchange.looked_up == 0
+
+
+def test_submit_finds_the_order_that_timed_out():
+    exchange = Exchange(creates=[asyncio.TimeoutError()], lookups=[{'id': 1}])
+    assert run_submit(exchange) == {'id': 1}
+    assert exchange.created == 1
+
+
+def test_submit_sends_again_when_the_order_never_landed():
+    exchange = Exchange(creates=[asyncio.TimeoutError(), {'id': 2}], lookups=[None, None])
+    assert run_submit(exchange) == {'id': 2}
+    assert exchange.created == 2
+
+
+def test_submit_waits_out_the_recv_window(monkeypatch):
+    monkeypatch.setattr(orderids, 'ORDER_RECV_WINDOW', 0.05)
+    # Missing at first, the lost request lands before it expires
+    exchange = Exchange(creates=[asyncio.TimeoutError()], lookups=[None, {'id': 1}])
+    assert run_submit(exchange) == {'id': 1}
+    assert exchange.created == 1
+    assert exchange.looked_up == 2
+
+
+def test_submit_does_not_send_again_while_the_lookup_fails():
+    exchange = Exchange(creates=[asyncio.TimeoutError()], lookups=[asyncio.TimeoutError(), {'id': 1}])
+    assert run_submit(exchange) == {'id': 1}
+    assert exchange.created == 1
+
+
+def test_submit_gives_up_after_its_retries():
+    exchange = Exchange(creates=[asyncio.TimeoutError()], lookups=[asyncio.TimeoutError(), asyncio.TimeoutError()])
+    with pytest.raises(asyncio.TimeoutError):
+        run_submit(exchange, retries=2)
+    assert exchange.created == 1
+
+
+def test_submit_raises_rejections_right_away():
+    exchange = Exchange(creates=[ValueError('rejected')])
+    with pytest.raises(ValueError):
+        run_submit(exchange)
+    assert exchange.looked_up == 0
+
+
+def test_client_order_ids_round_trip():
+    client_id = client_order_id('0123456789ab', 'tp1')
+    assert client_id == 'gf0123456789ab-tp1'
+    assert parse_client_order_id(client_id) == ('0123456789ab', 'tp1')
+    assert parse_client_order_id('web_abc') is None
+    assert parse_client_order_id(None) is None
+
+
+def test_alert_ids():
+    message = {'pair': 'BTCUSDT', 'action': 'long', 'close': 100}
+    assert alert_id(message) == alert_id(dict(reversed(message.items())))
+    assert alert_id(message, received_at=1.0) != alert_id(message, received_at=2.0)
+    assert alert_id(dict(message, timenow='2022-08-01T00:00:00Z')) != alert_id(message)
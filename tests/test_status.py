@@ -0,0 +1,30 @@
+from goingfast.status import diff
+
+
+def test_diff_skips_unchanged_sections_and_time():
+    previous = {'time': 1, 'health': {'bybit': 'closed'}, 'plans': []}
+    current = {'time': 2, 'health': {'bybit': 'closed'}, 'plans': []}
+    assert diff(previous, current) == {}
+
+
+def test_diff_sends_changed_entries_only():
+    previous = {'health': {'bybit': 'closed', 'bitmex': 'closed'}}
+    current = {'health': {'bybit': 'open', 'bitmex': 'closed'}}
+    assert diff(previous, current) == {'health': {'bybit': 'open'}}
+
+
+def test_diff_nulls_entries_that_went_away():
+    previous = {'trades': {'abc': {'stage': 'exiting'}, 'def': {'stage': 'entering'}}}
+    current = {'trades': {'def': {'stage': 'exiting'}, 'ghi': {'stage': 'entering'}}}
+    changed = {'trades': {'def': {'stage': 'exiting'}, 'ghi': {'stage': 'entering'}, 'abc': None}}
+    assert diff(previous, current) == changed
+
+
+def test_diff_replaces_sections_that_are_not_dicts():
+    assert diff({'plans': ['a']}, {'plans': ['a', 'b']}) == {'plans': ['a', 'b']}
+    assert diff({'clock': None}, {'clock': {'offset': 1}}) == {'clock': {'offset': 1}}
+
+
+def test_diff_of_a_first_snapshot_is_the_snapshot():
+    current = {'time': 1, 'health': {'bybit': 'closed'}}
+    assert diff(dict(), current) == {'health': {'bybit': 'closed'}}
@@ -0,0 +1,77 @@
+import pytest
+
+from goingfast.traders.ticks import ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_EVEN, ROUND_HALF_UP, Grid, divide, fraction
+
+
+@pytest.mark.parametrize(
+    'numerator, rounding, expected',
+    [
+        (5, ROUND_HALF_EVEN, 2),
+        (7, ROUND_HALF_EVEN, 4),
+        (5, ROUND_HALF_UP, 3),
+        (-5, ROUND_HALF_EVEN, -2),
+        (-5, ROUND_HALF_UP, -3),
+        (-7, ROUND_HALF_EVEN, -4),
+        (5, ROUND_FLOOR, 2),
+        (-5, ROUND_FLOOR, -3),
+        (5, ROUND_CEILING, 3),
+        (-5, ROUND_CEILING, -2),
+    ],
+)
+def test_divide_rounds_halves_by_mode(numerator, rounding, expected):
+    assert divide(numerator, 2, rounding) == expected
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    [('0.5', (5, 10)), ('-1.25', (-125, 100)), ('1e-3', (1, 1000)), ('2.5E2', (2500, 10)), ('-3e0', (-3, 1))],
+)
+def test_fraction_is_exact(text, expected):
+    assert fraction(text) == expected
+
+
+def test_grid_of_a_half_tick():
+    grid = Grid('0.5')
+    assert grid.parse('100.5') == 201
+    assert grid.format(201) == '100.5'
+    assert grid.round('100.25') == '100.0'
+    assert grid.round('100.75') == '101.0'
+    assert grid.round('100.25', ROUND_HALF_UP) == '100.5'
+
+
+def test_grid_keeps_leading_zeros():
+    grid = Grid('0.001')
+    assert grid.format(5) == '0.005'
+    assert grid.format(1234) == '1.234'
+    assert grid.round(0.1 + 0.2) == '0.300'
+
+
+def test_grid_formats_negatives():
+    grid = Grid('0.01')
+    assert grid.parse('-0.05') == -5
+    assert grid.format(-5) == '-0.05'
+    assert grid.format(-105) == '-1.05'
+    assert grid.round('-0.005') == '0.00'
+    assert grid.round('-0.015') == '-0.02'
+    assert grid.round('-0.005', ROUND_HALF_UP) == '-0.01'
+
+
+def test_grid_parses_exponents():
+    grid = Grid('0.0001')
+    assert grid.parse('1e-4') == 1
+    assert grid.parse('1.5E-3') == 15
+    assert grid.round(1e-05) == '0.0000'
+    assert grid.round('5e-05', ROUND_HALF_UP) == '0.0001'
+
+
+def test_grid_of_whole_increments():
+    grid = Grid('10')
+    assert grid.parse(25) == 2
+    assert grid.parse(35) == 4
+    assert grid.format(3) == '30'
+
+
+def test_grid_quantities_round_down():
+    grid = Grid('0.001')
+    assert grid.round('0.0129', ROUND_FLOOR) == '0.012'
+    assert grid.scaled(grid.parse('0.010'), '1.5') == 15